@@ -0,0 +1,255 @@
+"""
+Автодополнение названий произведений из префиксного индекса в памяти
+процесса.
+
+Индекс — отсортированный список ключей «нормализованное название
+с начала слова + id», поиск по префиксу идёт двоичным поиском (bisect).
+Произведение попадает в индекс с начала каждого из первых
+AUTOCOMPLETE_WORDS слов названия, поэтому «godf» находит и
+«The Godfather». Подсказки ранжируются по рейтингу.
+
+Изменения произведений в текущем процессе применяются сигналами после
+фиксации транзакции, изменения из других процессов — по журналу
+изменений (ChangeLogEntry) не чаще раза в AUTOCOMPLETE_SYNC_INTERVAL
+секунд. Число произведений в индексе ограничено AUTOCOMPLETE_MAX_TITLES:
+при переполнении вытесняются произведения с наименьшим рейтингом.
+"""
+import heapq
+import re
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+
+from reviews.models import ChangeLogEntry, ChangeLogHorizon, Title
+
+WORD = re.compile(r'\w+')
+KEY_SEPARATOR = '\0'
+MAX_CHAR = chr(0x10FFFF)
+SYNC_OBJECT_TYPES = (
+    ChangeLogEntry.ObjectType.TITLE,
+    ChangeLogEntry.ObjectType.REVIEW,
+)
+
+index = None
+lock = threading.RLock()
+
+
+def normalize(text):
+    """
+    Приводит строку к виду для сравнения: регистр, диакритика
+    и знаки препинания не учитываются, пробелы схлопываются.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD.findall(text))
+
+
+def make_keys(pk, name):
+    """Ключи индекса произведения: название с начала каждого слова."""
+    normalized = normalize(name)
+    starts = [match.start() for match in WORD.finditer(normalized)]
+    return {
+        normalized[start:start + settings.AUTOCOMPLETE_KEY_LENGTH]
+        + f'{KEY_SEPARATOR}{pk}'
+        for start in starts[:settings.AUTOCOMPLETE_WORDS]
+    }
+
+
+class AutocompleteIndex:
+    """Префиксный индекс названий одной позиции журнала изменений."""
+
+    def __init__(self):
+        self.keys = []
+        self.titles = {}
+        self.memo = {}
+        self.evicted = 0
+        # Позиция журнала читается до произведений: изменения между
+        # двумя чтениями будут применены повторно, но не потеряны.
+        self.position = ChangeLogEntry.objects.aggregate(
+            position=Max('id')
+        )['position'] or 0
+        self.built_at = self.checked_at = time.monotonic()
+        rows = Title.objects.order_by(
+            F('rating').desc(nulls_last=True), 'pk'
+        ).values_list('pk', 'name', 'rating')
+        for pk, name, rating in rows[:settings.AUTOCOMPLETE_MAX_TITLES]:
+            self.titles[pk] = (name, rating)
+            self.keys.extend(make_keys(pk, name))
+        self.keys.sort()
+
+    def rank(self, pk):
+        """Ключ сортировки подсказок: рейтинг по убыванию, затем название."""
+        name, rating = self.titles[pk]
+        return rating is None, -(rating or 0), name, pk
+
+    def remove(self, pk):
+        if pk not in self.titles:
+            return
+        name, _ = self.titles.pop(pk)
+        for key in make_keys(pk, name):
+            position = bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+        self.memo.clear()
+
+    def put(self, pk, name, rating):
+        """Добавляет или обновляет произведение в индексе."""
+        if pk in self.titles:
+            if self.titles[pk][0] == name:
+                self.titles[pk] = (name, rating)
+                self.memo.clear()
+                return
+            self.remove(pk)
+        if len(self.titles) >= settings.AUTOCOMPLETE_MAX_TITLES:
+            self.titles[pk] = (name, rating)
+            worst = max(self.titles, key=self.rank)
+            del self.titles[pk]
+            self.evicted += 1
+            if worst == pk:
+                return
+            self.remove(worst)
+        self.titles[pk] = (name, rating)
+        for key in make_keys(pk, name):
+            insort(self.keys, key)
+        self.memo.clear()
+
+    def reload(self, title_ids):
+        """Перечитывает произведения из базы; удалённые убирает."""
+        rows = {
+            pk: (name, rating)
+            for pk, name, rating in Title.objects.filter(
+                pk__in=title_ids
+            ).values_list('pk', 'name', 'rating')
+        }
+        for pk in title_ids:
+            if pk in rows:
+                self.put(pk, *rows[pk])
+            else:
+                self.remove(pk)
+
+    def sync(self):
+        """
+        Применяет изменения произведений и их рейтинга из журнала.
+        Возвращает False, если журнал отстал настолько, что индекс
+        нужно построить заново.
+        """
+        now = time.monotonic()
+        if now - self.checked_at < settings.AUTOCOMPLETE_SYNC_INTERVAL:
+            return True
+        self.checked_at = now
+        if now - self.built_at > settings.AUTOCOMPLETE_MAX_AGE:
+            return False
+        entries = list(ChangeLogEntry.objects.filter(
+            id__gt=self.position
+        ).values_list('id', 'object_type', 'title_id')[
+            :settings.AUTOCOMPLETE_SYNC_BATCH + 1
+        ])
+        if (
+            len(entries) > settings.AUTOCOMPLETE_SYNC_BATCH
+            or self.position < ChangeLogHorizon.get_seq()
+        ):
+            return False
+        if not entries:
+            return True
+        self.reload({
+            title_id for _, object_type, title_id in entries
+            if object_type in SYNC_OBJECT_TYPES and title_id is not None
+        })
+        self.position = entries[-1][0]
+        return True
+
+    def top(self, prefix):
+        """
+        Лучшие AUTOCOMPLETE_MAX_LIMIT произведений с префиксом. Для
+        коротких префиксов, под которые попадает много ключей, результат
+        запоминается до следующего изменения индекса.
+        """
+        if prefix in self.memo:
+            return self.memo[prefix]
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + MAX_CHAR, start)
+        ids = {
+            int(key.rpartition(KEY_SEPARATOR)[2])
+            for key in self.keys[start:end]
+        }
+        top = heapq.nsmallest(
+            settings.AUTOCOMPLETE_MAX_LIMIT, ids, key=self.rank
+        )
+        if end - start > settings.AUTOCOMPLETE_MEMO_MIN_KEYS:
+            self.memo[prefix] = top
+        return top
+
+    def search(self, query, limit):
+        prefix = normalize(query)[:settings.AUTOCOMPLETE_KEY_LENGTH]
+        if not prefix:
+            return []
+        return [
+            {'id': pk, 'name': name, 'rating': rating}
+            for pk in self.top(prefix)[:limit]
+            for name, rating in (self.titles[pk],)
+        ]
+
+    def memory_usage(self):
+        """Приблизительный объём индекса в памяти, в байтах."""
+        size = sys.getsizeof(self.keys) + sys.getsizeof(self.titles)
+        size += sum(sys.getsizeof(key) for key in self.keys)
+        for name, rating in self.titles.values():
+            size += sys.getsizeof((name, rating)) + sys.getsizeof(name)
+            size += sys.getsizeof(rating)
+        return size
+
+    def stats(self):
+        return {
+            'titles': len(self.titles),
+            'keys': len(self.keys),
+            'evicted': self.evicted,
+            'max_titles': settings.AUTOCOMPLETE_MAX_TITLES,
+            'position': self.position,
+            'memory': self.memory_usage(),
+        }
+
+
+def get_index():
+    """Индекс процесса, при необходимости построенный или обновлённый."""
+    global index
+    with lock:
+        if index is None or not index.sync():
+            index = AutocompleteIndex()
+        return index
+
+
+def search(query, limit):
+    """Подсказки для строки query: не более limit произведений."""
+    with lock:
+        return get_index().search(query, limit)
+
+
+def apply_locally(function, *args):
+    """
+    Применяет изменение к уже построенному индексу процесса после
+    фиксации транзакции.
+    """
+    def apply():
+        with lock:
+            if index is not None:
+                getattr(index, function)(*args)
+    transaction.on_commit(apply)
+
+
+def title_saved(title, created):
+    # Рейтинг изменённого произведения в экземпляре мог устареть,
+    # поэтому оно перечитывается; у нового рейтинга ещё нет.
+    if created:
+        apply_locally('put', title.pk, title.name, None)
+    else:
+        apply_locally('reload', [title.pk])
+
+
+def title_deleted(title):
+    apply_locally('remove', title.pk)
@@ -1,15 +1,498 @@
+import hashlib
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connections, router, transaction
+from django.http import Http404
+from django.db.models import (
+    OuterRef,
+    Prefetch,
+    Subquery,
+    prefetch_related_objects,
+)
+from django.utils import timezone
+from django.utils.encoding import smart_str
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.mixins import (
     CreateModelMixin,
     DestroyModelMixin,
     ListModelMixin,
 )
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
 from rest_framework.viewsets import GenericViewSet
 
+from api.catalogue import CATALOGUE_MODELS, invalidate_catalogue
+from api.constants import (
+    BULK_CHUNK_SIZE,
+    BULK_MAX_OPERATIONS,
+    INCLUDE_DEFAULT_LIMIT,
+    INCLUDE_MAX_LIMIT,
+)
+from api.fields import BulkSlugRelatedField, is_slug
 from api.permissions import IsAdminOrReadOnly
+from api.renderers import MessagePackParser, NDJSONParser
+from api.utils import parse_int_param, parse_list_param
+from reviews.constants import IDEMPOTENCY_KEY_MAX_LENGTH
+from reviews.models import ChangeLogEntry, IdempotencyKey
+from reviews.sharding import fan_out, is_sharded, shard_for, use_shard
+
+BULK_OPERATIONS = ('create', 'update', 'delete')
+BULK_RESULTS = {
+    status.HTTP_201_CREATED: 'created',
+    status.HTTP_200_OK: 'updated',
+    status.HTTP_204_NO_CONTENT: 'deleted',
+}
+
+
+def parent_cache_key(model, *values):
+    """Ключ кэша проверки родителя model с полями parent_lookups values."""
+    return 'parent:{}:{}'.format(
+        model._meta.label_lower, ':'.join(str(value) for value in values)
+    )
+
+
+def forget_parents(model, values_list):
+    """Сбрасывает в кэше процесса проверки удалённых или скрытых родителей."""
+    cache.delete_many([
+        parent_cache_key(model, *values) for values in values_list
+    ])
+
+
+class NestedParentMixin:
+    """
+    Миксин ViewSet вложенного маршрута (titles/{title_id}/reviews/...).
+    Объекты отбираются одним запросом с условием на родителя
+    (get_parent_filter), а существование родителя проверяется отдельно,
+    только когда иначе ответ неотличим от отсутствия родителя: для
+    пустой страницы и при создании. Проверка выполняется не более раза
+    за запрос. Для чтения успешная проверка запоминается в кэше на
+    PARENT_CACHE_TTL секунд (удаление и скрытие родителя сбрасывают
+    её только в своём процессе), при создании кэш не используется.
+    Запрос обрабатывается в шарде произведения (reviews.sharding).
+    """
+    parent_queryset = None
+    parent_lookups = {}
+    shard_kwarg = 'title_id'
+
+    def dispatch(self, request, *args, **kwargs):
+        with use_shard(shard_for(kwargs[self.shard_kwarg])):
+            return super().dispatch(request, *args, **kwargs)
+
+    def get_parent_filter(self):
+        raise NotImplementedError
+
+    def check_parent(self, use_cache=True):
+        if getattr(self, 'parent_checked', False):
+            return
+        lookups = {
+            field: self.kwargs[kwarg]
+            for field, kwarg in self.parent_lookups.items()
+        }
+        key = parent_cache_key(
+            self.parent_queryset.model, *lookups.values()
+        )
+        if not (use_cache and cache.get(key)):
+            if not self.parent_queryset.filter(**lookups).exists():
+                raise Http404
+            cache.set(key, True, settings.PARENT_CACHE_TTL)
+        self.parent_checked = True
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.check_parent()
+        return page
+
+
+class IdempotentCreateMixin:
+    """
+    Миксин ViewSet: POST с заголовком Idempotency-Key выполняется один
+    раз для пользователя и ключа. Успешный ответ сохраняется на
+    IDEMPOTENCY_KEY_TTL_HOURS часов и возвращается на повторы с заголовком
+    Idempotent-Replayed. Повтор, пока первый запрос ещё выполняется,
+    получает 409, тот же ключ с другим телом запроса — 422.
+    """
+    idempotency_header = 'Idempotency-Key'
+
+    def get_request_fingerprint(self, request):
+        data = request.data
+        if hasattr(data, 'lists'):
+            data = dict(data.lists())
+        payload = json.dumps(
+            [request.method, request.path, data],
+            sort_keys=True,
+            cls=DjangoJSONEncoder,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def replay_response(self, record, fingerprint):
+        if record is None or record.status_code is None:
+            return Response(
+                {'detail': 'Запрос с этим ключом ещё выполняется.'},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Retry-After': '1'},
+            )
+        if record.fingerprint != fingerprint:
+            return Response(
+                {'detail': 'Ключ уже использован с другим запросом.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            record.response,
+            status=record.status_code,
+            headers={'Idempotent-Replayed': 'true'},
+        )
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ValidationError({self.idempotency_header: [
+                f'Ожидается строка до {IDEMPOTENCY_KEY_MAX_LENGTH} символов.'
+            ]})
+        fingerprint = self.get_request_fingerprint(request)
+        keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+        keys.filter(created_at__lt=timezone.now() - timedelta(
+            hours=settings.IDEMPOTENCY_KEY_TTL_HOURS
+        )).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=request.user, key=key, fingerprint=fingerprint
+                )
+        except IntegrityError:
+            return self.replay_response(keys.first(), fingerprint)
+        try:
+            response = super().create(request, *args, **kwargs)
+        except BaseException:
+            # Неудачный запрос можно повторить с тем же ключом.
+            record.delete()
+            raise
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=('status_code', 'response'))
+        return response
+
+
+class BulkWriteMixin:
+    """
+    Миксин ViewSet с пакетной записью: POST <список>/bulk/ принимает
+    массив JSON (или поток NDJSON) операций вида
+    {"op": "create" | "update" | "delete", <ключ>: ..., <поля>...},
+    где ключ — поле lookup_field (id для произведений).
+
+    Операции обрабатываются пачками по BULK_CHUNK_SIZE: объекты по
+    ключам и все упомянутые slug связанных объектов загружаются одним
+    запросом на модель, проверка идёт без запросов к базе, запись —
+    bulk_create/bulk_update в одной транзакции на пачку. В пределах
+    пачки один объект упоминается не более одного раза. Ответ содержит
+    результат каждой операции и сводку.
+    """
+    bulk_changelog = False
+    load_shedding_sampled = True
+
+    @property
+    def bulk_key(self):
+        return 'id' if self.lookup_field == 'pk' else self.lookup_field
+
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='bulk',
+        parser_classes=(JSONParser, MessagePackParser, NDJSONParser),
+        load_shedding_sampled=False,
+    )
+    def bulk(self, request):
+        operations = request.data
+        if not isinstance(operations, list):
+            raise ValidationError(
+                {'non_field_errors': ['Ожидается список операций.']}
+            )
+        if len(operations) > BULK_MAX_OPERATIONS:
+            raise ValidationError({'non_field_errors': [
+                f'Не более {BULK_MAX_OPERATIONS} операций в запросе.'
+            ]})
+        results = []
+        for start in range(0, len(operations), BULK_CHUNK_SIZE):
+            results.extend(self.apply_bulk_chunk(
+                operations[start:start + BULK_CHUNK_SIZE], start
+            ))
+        summary = Counter(
+            BULK_RESULTS.get(result['status'], 'failed')
+            for result in results
+        )
+        return Response({
+            'summary': {
+                outcome: summary[outcome]
+                for outcome in (*BULK_RESULTS.values(), 'failed')
+            },
+            'results': results,
+        })
+
+    def bulk_result(self, index, op, key, code, errors=None):
+        result = {'index': index, 'op': op, self.bulk_key: key, 'status': code}
+        if errors is not None:
+            result['errors'] = errors
+        return result
+
+    def get_bulk_prefetched(self, serializer, items):
+        """
+        Загружает одним запросом на модель все связанные объекты,
+        на которые по slug ссылаются операции пачки. Модели, уже
+        переданные в context['prefetched'], не загружаются.
+        """
+        prefetched = dict(serializer.context.get('prefetched', {}))
+        for name, field in serializer.fields.items():
+            relation = getattr(field, 'child_relation', field)
+            if (
+                field.read_only
+                or not isinstance(relation, BulkSlugRelatedField)
+                or relation.get_queryset().model in prefetched
+            ):
+                continue
+            slugs = set()
+            for item in items:
+                values = item.get(name)
+                if not isinstance(values, list):
+                    values = [values]
+                slugs.update(
+                    smart_str(value) for value in values if is_slug(value)
+                )
+            prefetched[relation.get_queryset().model] = (
+                relation.get_queryset().in_bulk(
+                    slugs, field_name=relation.slug_field
+                )
+            )
+        return prefetched
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        """
+        Сериализатор операции. Уникальность ключа проверяется по пачке
+        целиком, поэтому поштучные UniqueValidator отключаются.
+        """
+        serializer = self.get_serializer(*args, **kwargs)
+        for field in serializer.fields.values():
+            field.validators = [
+                validator for validator in field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return serializer
+
+    def parse_bulk_operations(self, operations, offset, results):
+        """Разбирает операции и их ключи, отсеивая некорректные."""
+        model = self.get_serializer_class().Meta.model
+        key_field = (
+            model._meta.pk if self.lookup_field == 'pk'
+            else model._meta.get_field(self.lookup_field)
+        )
+        parsed = {}
+        for index, item in enumerate(operations, offset):
+            op = item.get('op') if isinstance(item, dict) else None
+            key = item.get(self.bulk_key) if op else None
+            if op not in BULK_OPERATIONS:
+                results[index] = self.bulk_result(
+                    index, op, key, status.HTTP_400_BAD_REQUEST,
+                    {'op': [
+                        f'Ожидается одно из: {", ".join(BULK_OPERATIONS)}.'
+                    ]},
+                )
+                continue
+            if key is None and (op != 'create' or not key_field.primary_key):
+                if op == 'create':
+                    # Отсутствие ключа при создании сообщит сериализатор.
+                    parsed[index] = (op, None, item)
+                    continue
+                results[index] = self.bulk_result(
+                    index, op, key, status.HTTP_400_BAD_REQUEST,
+                    {self.bulk_key: ['Обязательное поле.']}
+                )
+                continue
+            if key is not None:
+                try:
+                    key = key_field.to_python(key)
+                except DjangoValidationError as error:
+                    results[index] = self.bulk_result(
+                        index, op, key, status.HTTP_400_BAD_REQUEST,
+                        {self.bulk_key: error.messages}
+                    )
+                    continue
+            parsed[index] = (op, key, item)
+        return parsed
+
+    def apply_bulk_chunk(self, operations, offset):
+        model = self.get_serializer_class().Meta.model
+        results = {}
+        parsed = self.parse_bulk_operations(operations, offset, results)
+        keys = Counter(key for _, key, _ in parsed.values() if key is not None)
+        existing = model.objects.in_bulk(
+            list(keys), field_name=self.lookup_field
+        )
+        context = {
+            **self.get_serializer_context(),
+            'prefetched': self.get_bulk_prefetched(
+                self.get_serializer(),
+                [item for _, _, item in parsed.values()],
+            ),
+        }
+        creates, updates, deletes = {}, {}, {}
+        for index, (op, key, item) in parsed.items():
+            errors, code = None, status.HTTP_400_BAD_REQUEST
+            instance = existing.get(key)
+            if keys[key] > 1:
+                errors = {self.bulk_key: [
+                    'Объект упоминается в пачке операций более одного раза.'
+                ]}
+            elif op == 'create' and instance is not None:
+                errors = {self.bulk_key: ['Объект с таким ключом уже есть.']}
+            elif op != 'create' and instance is None:
+                errors = {'detail': 'Страница не найдена.'}
+                code = status.HTTP_404_NOT_FOUND
+            elif op == 'delete':
+                deletes[index] = instance
+            else:
+                serializer = self.get_bulk_serializer(
+                    instance,
+                    data=item,
+                    partial=op == 'update',
+                    context=context,
+                )
+                if serializer.is_valid():
+                    target = creates if op == 'create' else updates
+                    target[index] = (instance, serializer.validated_data)
+                else:
+                    errors = serializer.errors
+            if errors is not None:
+                results[index] = self.bulk_result(index, op, key, code, errors)
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                created = self.perform_bulk_write(
+                    model, creates, updates, deletes
+                )
+        except IntegrityError as error:
+            for index in (*creates, *updates, *deletes):
+                op, key, _ = parsed[index]
+                results[index] = self.bulk_result(
+                    index, op, key, status.HTTP_409_CONFLICT,
+                    {'detail': f'Пачка не записана: {error}'},
+                )
+        else:
+            for index, instance in created.items():
+                results[index] = self.bulk_result(
+                    index, 'create',
+                    getattr(instance, self.lookup_field),
+                    status.HTTP_201_CREATED,
+                )
+            for index in updates:
+                results[index] = self.bulk_result(
+                    index, 'update', parsed[index][1], status.HTTP_200_OK
+                )
+            for index in deletes:
+                results[index] = self.bulk_result(
+                    index, 'delete', parsed[index][1],
+                    status.HTTP_204_NO_CONTENT,
+                )
+        return [results[index] for index in sorted(results)]
+
+    def bulk_insert(self, model, objects):
+        """
+        Вставляет объекты одним bulk_create, если база возвращает
+        их первичные ключи. Иначе (SQLite на Django 3.2) объекты
+        сохраняются по одному в транзакции пачки, и журнал изменений
+        пишут сигналы сохранения. Возвращает True для пакетной вставки.
+        """
+        connection = connections[router.db_for_write(model)]
+        if (
+            connection.features.can_return_rows_from_bulk_insert
+            or not (model._meta.many_to_many or self.bulk_changelog)
+        ):
+            model.objects.bulk_create(objects, batch_size=BULK_CHUNK_SIZE)
+            return True
+        for obj in objects:
+            obj.save(force_insert=True)
+        return False
+
+    def perform_bulk_write(self, model, creates, updates, deletes):
+        many_to_many = {
+            field.name: field for field in model._meta.many_to_many
+        }
+        created = {}
+        related = {name: {} for name in many_to_many}
+        for index, (_, data) in creates.items():
+            created[index] = model(**{
+                name: value for name, value in data.items()
+                if name not in many_to_many
+            })
+            for name in many_to_many.keys() & data.keys():
+                related[name][index] = (created[index], data[name])
+        inserted_in_bulk = self.bulk_insert(model, list(created.values()))
+        update_fields = set()
+        for index, (instance, data) in updates.items():
+            for name, value in data.items():
+                if name in many_to_many:
+                    related[name][index] = (instance, value)
+                else:
+                    setattr(instance, name, value)
+                    update_fields.add(name)
+        if update_fields:
+            model.objects.bulk_update(
+                [instance for instance, _ in updates.values()],
+                sorted(update_fields),
+                batch_size=BULK_CHUNK_SIZE,
+            )
+        for name, field in many_to_many.items():
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            replaced = [
+                related[name][index][0] for index in updates
+                if index in related[name]
+            ]
+            if replaced:
+                through.objects.filter(**{f'{source}__in': replaced}).delete()
+            through.objects.bulk_create(
+                [
+                    through(**{source: instance, target: value})
+                    for instance, values in related[name].values()
+                    for value in values
+                ],
+                batch_size=BULK_CHUNK_SIZE,
+            )
+        if deletes:
+            model.objects.filter(
+                pk__in=[instance.pk for instance in deletes.values()]
+            ).delete()
+        if self.bulk_changelog:
+            # bulk_create и bulk_update не отправляют сигналы сохранения.
+            entries = ChangeLogEntry.for_objects(
+                [instance for instance, _ in updates.values()],
+                ChangeLogEntry.Action.UPDATED,
+            )
+            if inserted_in_bulk:
+                entries += ChangeLogEntry.for_objects(
+                    created.values(), ChangeLogEntry.Action.CREATED
+                )
+            ChangeLogEntry.objects.bulk_create(entries)
+        if model in CATALOGUE_MODELS:
+            # Справочники изменены пакетом в обход сигналов.
+            invalidate_catalogue()
+        return created
 
 
 class BaseCreateListDestroyViewSet(
+    BulkWriteMixin,
     CreateModelMixin,
     DestroyModelMixin,
     ListModelMixin,
@@ -20,3 +503,94 @@ class BaseCreateListDestroyViewSet(
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+
+
+class IncludeNewestMixin:
+    """
+    Миксин для встраивания в ответ последних связанных объектов
+    (?include=<relation>&include_limit=N). Связанные объекты всех
+    объектов страницы загружаются одним запросом.
+    """
+    include_relation = None
+    include_parent_field = None
+    include_queryset = None
+    include_serializer_class = None
+
+    @property
+    def include_requested(self):
+        return (
+            self.request.method in SAFE_METHODS
+            and self.include_relation in parse_list_param(
+                self.request.query_params.get('include')
+            )
+        )
+
+    def get_include_limit(self):
+        return parse_int_param(
+            self.request.query_params.get('include_limit'),
+            INCLUDE_DEFAULT_LIMIT,
+            INCLUDE_MAX_LIMIT,
+        )
+
+    def get_include_prefetch(self):
+        """
+        Prefetch последних N объектов для каждого родителя: коррелированный
+        подзапрос с LIMIT отбирает их прямо в базе.
+        """
+        parent_field = self.include_queryset.model._meta.get_field(
+            self.include_parent_field
+        ).attname
+        newest = (
+            self.include_queryset
+            .filter(**{parent_field: OuterRef(parent_field)})
+            .order_by('-pub_date', '-id')
+            .values('pk')[:self.get_include_limit()]
+        )
+        return Prefetch(
+            self.include_relation,
+            queryset=(
+                self.include_queryset
+                .filter(pk__in=Subquery(newest))
+                .order_by('-pub_date', '-id')
+            ),
+            to_attr=f'included_{self.include_relation}',
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.include_requested and not is_sharded():
+            queryset = queryset.prefetch_related(self.get_include_prefetch())
+        return queryset
+
+    def prefetch_included(self, objects):
+        """
+        При шардах связанные объекты загружаются параллельно из шарда
+        каждого родителя: одним запросом на шард.
+        """
+        groups = defaultdict(list)
+        for obj in objects:
+            groups[router.db_for_read(
+                self.include_queryset.model, instance=obj
+            )].append(obj)
+        prefetch = self.get_include_prefetch()
+
+        def load(alias):
+            prefetch_related_objects(groups[alias], Prefetch(
+                prefetch.prefetch_through,
+                queryset=prefetch.queryset.using(alias),
+                to_attr=prefetch.to_attr,
+            ))
+
+        fan_out(load, groups)
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self.include_requested and is_sharded():
+            self.prefetch_included(
+                args[0] if kwargs.get('many') else [args[0]]
+            )
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_class(self):
+        if self.include_requested:
+            return self.include_serializer_class
+        return super().get_serializer_class()
@@ -0,0 +1,149 @@
+"""
+Кэш справочников (категории и жанры) в памяти процесса.
+
+Справочники загружаются целиком и хранятся словарями slug → объект и
+id → объект. Актуальность сверяется не чаще раза за запрос с общим для
+процессов счётчиком версии (api.shared_state), который увеличивается
+после каждого изменения справочников: сигналами сохранения и удаления,
+пакетной записью и загрузкой CSV.
+"""
+import sqlite3
+from collections import defaultdict
+
+from django.db import transaction
+
+from api.shared_state import bump_counter, get_counter
+from reviews.models import Category, Genre, Title
+
+CATALOGUE_MODELS = (Category, Genre)
+VERSION_COUNTER = 'catalogue'
+
+cache = None
+
+
+class Catalogue:
+    """Справочники одной версии."""
+
+    def __init__(self, version):
+        self.version = version
+        self.by_slug = {}
+        self.by_id = {}
+        for model in CATALOGUE_MODELS:
+            objects = list(model.objects.all())
+            self.by_slug[model] = {obj.slug: obj for obj in objects}
+            self.by_id[model] = {obj.pk: obj for obj in objects}
+
+    def __len__(self):
+        return sum(len(objects) for objects in self.by_id.values())
+
+
+def get_version():
+    try:
+        return get_counter(VERSION_COUNTER)
+    except sqlite3.Error:
+        return None
+
+
+def get_catalogue(request=None, refresh=False):
+    """
+    Справочники текущей версии. С request версия сверяется один раз
+    за запрос. Если общий счётчик недоступен, справочники каждый раз
+    читаются из базы.
+    """
+    global cache
+    catalogue = getattr(request, '_catalogue', None)
+    if catalogue is not None and not refresh:
+        return catalogue
+    # Версия читается до справочников: изменение между двумя чтениями
+    # даст лишнюю перезагрузку, но не устаревшие данные под новой версией.
+    version = get_version()
+    catalogue = cache
+    if (
+        refresh or version is None or catalogue is None
+        or catalogue.version != version
+    ):
+        catalogue = Catalogue(version)
+        if version is not None:
+            cache = catalogue
+    if request is not None:
+        request._catalogue = catalogue
+    return catalogue
+
+
+def bump_version():
+    global cache
+    cache = None
+    try:
+        bump_counter(VERSION_COUNTER)
+    except sqlite3.Error:
+        pass
+
+
+def invalidate_catalogue():
+    """
+    Сбрасывает кэш справочников текущего процесса и объявляет кэши
+    всех процессов устаревшими после фиксации текущей транзакции.
+    """
+    global cache
+    cache = None
+    transaction.on_commit(bump_version)
+
+
+def cache_genres(title, genres):
+    """
+    Кладёт жанры в кэш prefetch произведения, чтобы title.genre.all()
+    не обращался к базе.
+    """
+    queryset = title.genre.all()
+    queryset._result_cache = sorted(genres, key=lambda genre: genre.name)
+    queryset._prefetch_done = True
+    title._prefetched_objects_cache = {
+        **getattr(title, '_prefetched_objects_cache', {}),
+        'genre': queryset,
+    }
+
+
+def attach_catalogue(titles, request=None, genres=True):
+    """
+    Подставляет произведениям категорию и жанры из кэша справочников.
+    Связи с жанрами читаются из промежуточной таблицы одним запросом
+    на все произведения, таблицы справочников не читаются.
+    """
+    pending = [
+        title for title in titles
+        if genres and 'genre' not in getattr(
+            title, '_prefetched_objects_cache', {}
+        )
+    ]
+    category_ids = {
+        title.__dict__.get('category_id') for title in titles
+        if not Title.category.is_cached(title)
+    } - {None}
+    if not (pending or category_ids):
+        return
+    genre_ids = defaultdict(list)
+    if pending:
+        for title_id, genre_id in Title.genre.through.objects.filter(
+            title_id__in=[title.pk for title in pending]
+        ).values_list('title_id', 'genre_id'):
+            genre_ids[title_id].append(genre_id)
+    catalogue = get_catalogue(request)
+    if not (
+        category_ids <= catalogue.by_id[Category].keys()
+        and {
+            genre_id for ids in genre_ids.values() for genre_id in ids
+        } <= catalogue.by_id[Genre].keys()
+    ):
+        catalogue = get_catalogue(request, refresh=True)
+    for title in pending:
+        cache_genres(title, [
+            catalogue.by_id[Genre][genre_id]
+            for genre_id in genre_ids[title.pk]
+            if genre_id in catalogue.by_id[Genre]
+        ])
+    for title in titles:
+        category = catalogue.by_id[Category].get(
+            title.__dict__.get('category_id')
+        )
+        if category is not None and not Title.category.is_cached(title):
+            Title.category.field.set_cached_value(title, category)
@@ -1,2 +1,11 @@
 USERNAME_RESERVED_VALUE = 'me'
 USERNAME_MAX_LENGTH = 150
+CHANGES_PAGE_SIZE = 100
+CHANGES_MAX_PAGE_SIZE = 1000
+IDS_MAX_COUNT = 100
+INCLUDE_DEFAULT_LIMIT = 3
+INCLUDE_MAX_LIMIT = 10
+BULK_CHUNK_SIZE = 500
+BULK_MAX_OPERATIONS = 50000
+MODERATION_BATCH_SIZE = 500
+MODERATION_IDS_MAX_COUNT = 10000
@@ -0,0 +1,95 @@
+from django.utils.encoding import smart_str
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+def is_slug(value):
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """
+    Список связанных объектов по slug, загружаемый одним запросом
+    `slug__in` вместо запроса на каждый элемент. Повторы схлопываются,
+    об отсутствующих slug сообщается поимённо.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        if not all(is_slug(slug) for slug in data):
+            child.fail('invalid')
+        slugs = list(dict.fromkeys(smart_str(slug) for slug in data))
+        objects = child.get_objects(slugs)
+        missing = [slug for slug in slugs if slug not in objects]
+        if missing:
+            raise serializers.ValidationError([
+                child.error_messages['does_not_exist'].format(
+                    slug_name=child.slug_field, value=slug
+                )
+                for slug in missing
+            ])
+        return [objects[slug] for slug in slugs]
+
+
+class BulkSlugRelatedField(serializers.SlugRelatedField):
+    """
+    SlugRelatedField, который при many=True разрешает slug пачкой,
+    а при пакетной записи берёт объекты из заранее загруженного
+    словаря context['prefetched'][модель] без запросов к базе.
+    Словарь может отставать от базы (кэш справочников другого
+    процесса), поэтому отсутствующие в нём slug дочитываются запросом.
+    """
+
+    def get_prefetched(self):
+        return self.context.get('prefetched', {}).get(
+            self.get_queryset().model
+        )
+
+    def get_objects(self, slugs):
+        """
+        Словарь slug → объект, в котором есть все найденные slugs.
+        Отсутствующие в context['prefetched'] читаются одним запросом
+        `slug__in` и добавляются в копию словаря контекста, чтобы
+        следующие операции пачки их не запрашивали.
+        """
+        objects = self.get_prefetched()
+        missing = slugs if objects is None else [
+            slug for slug in slugs if slug not in objects
+        ]
+        if not missing:
+            return objects
+        found = self.get_queryset().in_bulk(
+            missing, field_name=self.slug_field
+        )
+        if objects is None:
+            return found
+        if found:
+            objects = {**objects, **found}
+            self.context['prefetched'][self.get_queryset().model] = objects
+        return objects
+
+    def to_internal_value(self, data):
+        if self.get_prefetched() is None:
+            return super().to_internal_value(data)
+        if not is_slug(data):
+            self.fail('invalid')
+        try:
+            return self.get_objects([smart_str(data)])[smart_str(data)]
+        except KeyError:
+            self.fail(
+                'does_not_exist',
+                slug_name=self.slug_field,
+                value=smart_str(data),
+            )
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
@@ -1,15 +1,114 @@
+from django.core.validators import EMPTY_VALUES
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Lower
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
 
+from api.catalogue import get_catalogue
+from api.constants import IDS_MAX_COUNT
+from api.utils import parse_list_param
 from reviews.models import Title
+from user.search import filter_username
+
+
+class LowerExactFilter(filters.CharFilter):
+    """
+    Регистронезависимое сравнение Lower(поле) = Lower(значение).
+    В отличие от iexact (LIKE в SQLite) использует функциональные
+    индексы по Lower(...).
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        return qs.alias(lookup_lower=Lower(self.field_name)).filter(
+            lookup_lower=Lower(Value(value))
+        )
+
+
+class CatalogueSlugFilter(filters.CharFilter):
+    """
+    Регистронезависимый фильтр по slug категории или жанра. Подходящие
+    id берутся из кэша справочников (api.catalogue), поэтому запрос
+    не обращается к таблице справочника.
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        model = qs.model._meta.get_field(self.field_name).related_model
+        catalogue = get_catalogue(getattr(self.parent, 'request', None))
+        value = value.lower()
+        return qs.filter(**{f'{self.field_name}__in': [
+            obj.pk for slug, obj in catalogue.by_slug[model].items()
+            if slug.lower() == value
+        ]})
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    """
+    Сортировка ?ordering=, дополненная первичным ключом: порядок
+    произведений с равными значениями не меняется между страницами.
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        qs = super().filter(qs, value)
+        return qs.order_by(*qs.query.order_by, 'pk')
 
 
 class TitleFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='iexact')
-    genre = filters.CharFilter(field_name='genre__slug', lookup_expr='iexact')
-    category = filters.CharFilter(
-        field_name='category__slug', lookup_expr='iexact'
-    )
+    name = LowerExactFilter(field_name='name')
+    genre = CatalogueSlugFilter(field_name='genre')
+    category = CatalogueSlugFilter(field_name='category')
+    rating_min = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    rating_max = filters.NumberFilter(field_name='rating', lookup_expr='lte')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    ordering = StableOrderingFilter(fields=('rating', 'year', 'name'))
 
     class Meta:
         model = Title
-        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
+        fields = (
+            'id', 'name', 'year', 'description', 'genre', 'category',
+            'rating_min', 'rating_max', 'year_min', 'year_max', 'ordering',
+        )
+
+
+class IdListFilterBackend(BaseFilterBackend):
+    """
+    Фильтр для пакетного получения объектов по списку id: ?ids=1,2,3.
+    Количество id ограничено IDS_MAX_COUNT.
+    """
+    query_param = 'ids'
+
+    def filter_queryset(self, request, queryset, view):
+        if self.query_param not in request.query_params:
+            return queryset
+        ids = parse_list_param(request.query_params[self.query_param])
+        if not all(pk.isdigit() for pk in ids):
+            raise ValidationError(
+                {self.query_param: 'Ожидается список id через запятую'}
+            )
+        if len(ids) > IDS_MAX_COUNT:
+            raise ValidationError(
+                {self.query_param: f'Не более {IDS_MAX_COUNT} id за запрос'}
+            )
+        return queryset.filter(pk__in=ids)
+
+
+class UsernameSearchFilter(SearchFilter):
+    """
+    Поиск пользователей по ?search= по индексам (см. filter_username).
+    Вне SQLite работает как обычный SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connection.vendor != 'sqlite':
+            return super().filter_queryset(request, queryset, view)
+        for term in self.get_search_terms(request):
+            queryset = filter_username(queryset, term)
+        return queryset
@@ -0,0 +1,431 @@
+import asyncio
+import gzip
+import math
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from api.shared_state import (
+    SINGLE_FLIGHT_COUNTERS,
+    purge_buckets,
+    report_load,
+    report_single_flight,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def parse_accept_encoding(header):
+    """Возвращает словарь кодировок из Accept-Encoding с их весами q."""
+    encodings = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        encodings[coding.strip().lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы brotli или gzip в зависимости от Accept-Encoding.
+    Ответы меньше COMPRESSION_MIN_SIZE и потоковые ответы не сжимаются.
+    """
+
+    def select_encoding(self, request):
+        accepted = parse_accept_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        candidates = ('br', 'gzip') if brotli is not None else ('gzip',)
+        encoding, best_quality = None, 0.0
+        for coding in candidates:
+            quality = accepted.get(coding, accepted.get('*', 0.0))
+            if quality > best_quality:
+                encoding, best_quality = coding, quality
+        return encoding
+
+    def compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(
+                content, quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        return gzip.compress(
+            content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0
+        )
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+            or response.has_header('Content-Encoding')
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.select_encoding(request)
+        if encoding is None:
+            return response
+        compressed_content = self.compress(response.content, encoding)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class LoadMonitor:
+    """
+    Нагрузка процесса: число запросов в обработке и экспоненциально
+    сглаженное время ответа, затухающее вдвое за
+    LOAD_SHEDDING_LATENCY_HALF_LIFE секунд без новых замеров, чтобы
+    после перегрузки процесс снова начал принимать запросы. Замер
+    ограничен LOAD_SHEDDING_SAMPLE_MAX_MS: один долгий ответ не
+    поднимает сглаженное время выше порога отказа.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.latency_ms = 0.0
+        self.measured_at = time.monotonic()
+        self.reported_at = 0.0
+        self.purged_at = 0.0
+
+    def current_latency(self, now):
+        elapsed = now - self.measured_at
+        return self.latency_ms * 0.5 ** (
+            elapsed / settings.LOAD_SHEDDING_LATENCY_HALF_LIFE
+        )
+
+    def enter(self):
+        """
+        Регистрирует начало запроса. Возвращает None или пару
+        (статус, секунды до повтора), если запрос нужно отклонить.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.inflight >= settings.LOAD_SHEDDING_MAX_INFLIGHT:
+                return 429, settings.LOAD_SHEDDING_RETRY_AFTER
+            latency = self.current_latency(now)
+            if latency > settings.LOAD_SHEDDING_MAX_LATENCY_MS:
+                # Время до того, как сглаженная задержка опустится ниже
+                # порога, если новых медленных ответов не будет.
+                retry_after = settings.LOAD_SHEDDING_LATENCY_HALF_LIFE * (
+                    math.log2(latency / settings.LOAD_SHEDDING_MAX_LATENCY_MS)
+                )
+                return 503, max(1, math.ceil(retry_after))
+            self.inflight += 1
+        return None
+
+    def exit(self, duration_ms, sampled=True):
+        """
+        Регистрирует конец запроса. Время ответа учитывается, если
+        sampled: долгие по назначению запросы его не учитывают.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.inflight -= 1
+            if sampled:
+                latency = self.current_latency(now)
+                alpha = settings.LOAD_SHEDDING_LATENCY_ALPHA
+                sample = min(duration_ms, settings.LOAD_SHEDDING_SAMPLE_MAX_MS)
+                self.latency_ms = latency + alpha * (sample - latency)
+                self.measured_at = now
+            report = now - self.reported_at >= settings.LOAD_REPORT_INTERVAL
+            if report:
+                self.reported_at = now
+            purge = now - self.purged_at >= settings.THROTTLE_PURGE_INTERVAL
+            if purge:
+                self.purged_at = now
+            inflight, latency_ms = self.inflight, self.latency_ms
+        try:
+            if report:
+                report_load(inflight, latency_ms)
+            if purge:
+                purge_buckets(settings.THROTTLE_BUCKET_MAX_AGE)
+        except sqlite3.Error:
+            pass
+
+
+load_monitor = LoadMonitor()
+
+
+def is_load_sampled(view_func):
+    """
+    Учитывается ли время ответа представления: атрибут
+    load_shedding_sampled действия ViewSet или класса представления.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    return getattr(view_func, 'initkwargs', {}).get(
+        'load_shedding_sampled',
+        getattr(view_class, 'load_shedding_sampled', True),
+    )
+
+
+def shed_response(status, retry_after):
+    response = JsonResponse(
+        {'detail': 'Сервер перегружен, повторите запрос позже.'},
+        status=status,
+    )
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Отклоняет запросы к API до их обработки, когда процесс перегружен:
+    429, если запросов в обработке не меньше LOAD_SHEDDING_MAX_INFLIGHT,
+    503, если сглаженное время ответа выше LOAD_SHEDDING_MAX_LATENCY_MS.
+    Время ответа представлений и действий с load_shedding_sampled=False
+    (пакетная запись, массовая модерация) не учитывается: они долгие
+    по назначению. Нагрузку процесса периодически публикует в общий
+    файл состояния.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not request.path.startswith(settings.LOAD_SHEDDING_PATH_PREFIX):
+            return self.get_response(request)
+        rejected = load_monitor.enter()
+        if rejected:
+            return shed_response(*rejected)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            load_monitor.exit(
+                (time.perf_counter() - started) * 1000,
+                getattr(request, 'load_shedding_sampled', True),
+            )
+
+    async def __acall__(self, request):
+        if not request.path.startswith(settings.LOAD_SHEDDING_PATH_PREFIX):
+            return await self.get_response(request)
+        rejected = load_monitor.enter()
+        if rejected:
+            return shed_response(*rejected)
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            load_monitor.exit(
+                (time.perf_counter() - started) * 1000,
+                getattr(request, 'load_shedding_sampled', True),
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.load_shedding_sampled = is_load_sampled(view_func)
+
+
+class SingleFlight:
+    """
+    Запросы процесса, ответы на которые сейчас вычисляются, и счётчики
+    объединения по группам (имени маршрута).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.stats = defaultdict(
+            lambda: dict.fromkeys(SINGLE_FLIGHT_COUNTERS, 0)
+        )
+        self.reported_at = 0.0
+
+    def join(self, key):
+        """
+        Возвращает будущий ответ на запрос key и признак ведущего:
+        True, если такой запрос сейчас не вычисляется и вычислять его
+        должен вызывающий.
+        """
+        with self.lock:
+            future = self.flights.get(key)
+            if future is not None:
+                return future, False
+            future = self.flights[key] = Future()
+        return future, True
+
+    def land(self, key, future, response):
+        """Передаёт ответ ведущего ожидающим и закрывает запрос key."""
+        with self.lock:
+            del self.flights[key]
+        future.set_result(
+            None if response is None else freeze_response(response)
+        )
+
+    def count(self, group, counter):
+        with self.lock:
+            self.stats[group][counter] += 1
+            now = time.monotonic()
+            if now - self.reported_at < settings.LOAD_REPORT_INTERVAL:
+                return
+            self.reported_at = now
+            stats = {
+                name: dict(counters) for name, counters in self.stats.items()
+            }
+        try:
+            report_single_flight(stats)
+        except sqlite3.Error:
+            pass
+
+
+single_flight = SingleFlight()
+
+
+def get_flight(request):
+    """
+    Группа и ключ объединения запроса или None, если запрос нельзя
+    объединять: не GET, с авторизацией или сессией, условный или
+    к неизвестному маршруту. Объединяются только анонимные запросы,
+    поэтому ключ — схема, хост (от них зависят абсолютные ссылки
+    next и previous в ответе), путь, параметры без учёта их порядка
+    и Accept.
+    """
+    if (
+        request.method != 'GET'
+        or not request.path.startswith(settings.SINGLE_FLIGHT_PATH_PREFIX)
+        or 'HTTP_AUTHORIZATION' in request.META
+        or settings.SESSION_COOKIE_NAME in request.COOKIES
+        or 'HTTP_IF_NONE_MATCH' in request.META
+        or 'HTTP_IF_MODIFIED_SINCE' in request.META
+    ):
+        return None
+    try:
+        group = resolve(request.path_info).view_name
+    except Resolver404:
+        return None
+    return group, (
+        request.scheme,
+        request.get_host(),
+        request.path,
+        tuple(
+            (name, tuple(values))
+            for name, values in sorted(request.GET.lists())
+        ),
+        request.META.get('HTTP_ACCEPT', ''),
+    )
+
+
+def freeze_response(response):
+    """
+    Статус, содержимое и заголовки ответа, если его можно отдать
+    другим запросам: успешный, не потоковый и без cookie. Иначе None.
+    """
+    if response.streaming or response.status_code != 200 or response.cookies:
+        return None
+    return response.status_code, response.content, list(response.items())
+
+
+def thaw_response(frozen):
+    status, content, headers = frozen
+    response = HttpResponse(content, status=status)
+    for header, value in headers:
+        response[header] = value
+    return response
+
+
+class SingleFlightMiddleware:
+    """
+    Объединяет одинаковые одновременные анонимные GET-запросы к API
+    в процессе: первый (ведущий) запрос вычисляет ответ, остальные
+    ждут его не дольше SINGLE_FLIGHT_TIMEOUT секунд и получают копию.
+    Если ведущий не дождались, он завершился ошибкой или его ответ
+    нельзя разделить (см. freeze_response), запрос обрабатывается сам.
+    Ожидающие запросы не проходят ограничение частоты чтения.
+    Включается переменной окружения SINGLE_FLIGHT=1, счётчики групп
+    публикуются в общий файл состояния (команда single_flight_stats).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SINGLE_FLIGHT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        flight = get_flight(request)
+        if flight is None:
+            return self.get_response(request)
+        group, key = flight
+        future, leader = single_flight.join(key)
+        if leader:
+            response = None
+            try:
+                response = self.get_response(request)
+                return response
+            finally:
+                single_flight.land(key, future, response)
+                single_flight.count(group, 'leaders')
+        try:
+            frozen = future.result(timeout=settings.SINGLE_FLIGHT_TIMEOUT)
+        except FutureTimeoutError:
+            single_flight.count(group, 'timeouts')
+            return self.get_response(request)
+        if frozen is None:
+            single_flight.count(group, 'fallbacks')
+            return self.get_response(request)
+        single_flight.count(group, 'shared')
+        return thaw_response(frozen)
+
+    async def __acall__(self, request):
+        flight = get_flight(request)
+        if flight is None:
+            return await self.get_response(request)
+        group, key = flight
+        future, leader = single_flight.join(key)
+        if leader:
+            response = None
+            try:
+                response = await self.get_response(request)
+                return response
+            finally:
+                single_flight.land(key, future, response)
+                single_flight.count(group, 'leaders')
+        try:
+            frozen = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)),
+                settings.SINGLE_FLIGHT_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            single_flight.count(group, 'timeouts')
+            return await self.get_response(request)
+        if frozen is None:
+            single_flight.count(group, 'fallbacks')
+            return await self.get_response(request)
+        single_flight.count(group, 'shared')
+        return thaw_response(frozen)
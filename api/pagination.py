@@ -0,0 +1,89 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+POSITION_SEPARATOR = '|'
+
+
+class ActivityCursorPagination(CursorPagination):
+    """
+    Пагинация ленты активности по курсору (от новых к старым):
+    страница читается по индексу (author, pub_date) с позиции курсора,
+    без OFFSET и подсчёта всех строк.
+
+    Позиция курсора — значения всех полей ordering, а не только первого,
+    как в CursorPagination: у объектов с одинаковым pub_date позиции
+    различаются, и страницы в обе стороны не теряют и не повторяют их.
+    """
+    ordering = ('-pub_date', '-id')
+
+    def _get_position_from_instance(self, instance, ordering):
+        return POSITION_SEPARATOR.join(
+            str(getattr(instance, field.lstrip('-'))) for field in ordering
+        )
+
+    def parse_position(self, position, model):
+        values = position.split(POSITION_SEPARATOR)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def filter_after(self, queryset, position, ordering):
+        """Объекты, следующие за позицией в порядке ordering."""
+        condition = None
+        for order, value in reversed(list(zip(
+            ordering, self.parse_position(position, queryset.model)
+        ))):
+            field = order.lstrip('-')
+            after = Q(**{
+                f'{field}__{"lt" if order.startswith("-") else "gt"}': value
+            })
+            condition = after if condition is None else (
+                after | Q(**{field: value}) & condition
+            )
+        return queryset.filter(condition)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Как CursorPagination.paginate_queryset, но объекты после позиции
+        курсора отбираются по всем полям ordering.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+        ordering = (
+            _reverse_ordering(self.ordering) if reverse else self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self.filter_after(queryset, position, ordering)
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        current = position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = current, following is not None
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next, self.has_previous = following is not None, current
+            self.next_position, self.previous_position = following, position
+        self.display_page_controls = self.template is not None and (
+            self.has_previous or self.has_next
+        )
+        return self.page
@@ -12,6 +12,14 @@ class IsAdmin(permissions.BasePermission):
         )
 
 
+class IsModeratorOrAdmin(IsAdmin):
+    """Разрешает доступ модераторам и администраторам."""
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) or (
+            request.user.is_authenticated and request.user.is_moderator
+        )
+
+
 class IsAdminOrReadOnly(IsAdmin):
     """
     Разрешает полный доступ администраторам и доступ на чтение всем остальным.
@@ -1,11 +1,25 @@
 import datetime
 
 from django.contrib.auth import get_user_model
+from django.db.models import Manager
 from rest_framework import serializers
 
-from api.serializers_mixins import UserMixinSerializer
-from reviews.models import Category, Comment, Genre, Review, Title
-from .constants import USERNAME_RESERVED_VALUE
+from api.catalogue import attach_catalogue, cache_genres
+from api.fields import BulkSlugRelatedField
+from api.serializers_mixins import SparseFieldsetMixin, UserMixinSerializer
+from reviews.models import (
+    Category,
+    ChangeLogEntry,
+    Comment,
+    Genre,
+    Review,
+    Title,
+)
+from .constants import (
+    MODERATION_IDS_MAX_COUNT,
+    USERNAME_MAX_LENGTH,
+    USERNAME_RESERVED_VALUE,
+)
 
 User = get_user_model()
 
@@ -72,12 +86,12 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Сериализатор для отзывов. Проверяет, что оценканаходится
     в диапазоне от 1 до 10.
-    Запрещает оставлять более одного отзыва на одно и то же
-    произведение пользователем.
+    Повторный отзыв пользователя на произведение отсекает ограничение
+    unique_review при вставке (ReviewViewSet.perform_create).
     """
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username'
@@ -88,16 +102,15 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
 
-    def validate(self, data):
-        if self.context.get('request').method == 'POST':
-            if Review.objects.filter(
-                author=self.context.get('request').user,
-                title=self.context.get('view').kwargs.get('title_id'),
-            ):
-                raise serializers.ValidationError(
-                    'Не более одного отзыва на одно и то же произведение'
-                )
-        return data
+
+class ReviewWithCommentsSerializer(ReviewSerializer):
+    """Сериализатор отзыва с последними комментариями (?include=comments)."""
+    comments = CommentSerializer(
+        source='included_comments', many=True, read_only=True
+    )
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('comments',)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -120,11 +133,11 @@ class TitleSerializer(serializers.ModelSerializer):
     рейтинг произведения.
     Проверяет, что указанный год не является будущим.
     """
-    category = serializers.SlugRelatedField(
+    category = BulkSlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all()
     )
-    genre = serializers.SlugRelatedField(
+    genre = BulkSlugRelatedField(
         slug_field='slug',
         queryset=Genre.objects.all(),
         many=True, allow_null=False,
@@ -150,11 +163,70 @@ class TitleSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Нельзя добавлять будущий год')
         return value
 
+    @staticmethod
+    def set_genres(title, genres, created=False):
+        """
+        Записывает жанры произведения одной пачкой в промежуточную
+        таблицу, удаляя только снятые жанры, и кладёт итоговый список
+        в кэш prefetch, чтобы ответ строился без повторных запросов.
+        """
+        through = Title.genre.through
+        genre_ids = [genre.pk for genre in genres]
+        if created:
+            current_ids = set()
+        else:
+            prefetched = getattr(title, '_prefetched_objects_cache', {})
+            if 'genre' in prefetched:
+                current_ids = {genre.pk for genre in prefetched['genre']}
+            else:
+                current_ids = set(through.objects.filter(
+                    title=title
+                ).values_list('genre_id', flat=True))
+            removed_ids = current_ids - set(genre_ids)
+            if removed_ids:
+                through.objects.filter(
+                    title=title, genre_id__in=removed_ids
+                ).delete()
+        through.objects.bulk_create([
+            through(title=title, genre_id=genre_id)
+            for genre_id in genre_ids if genre_id not in current_ids
+        ])
+        cache_genres(title, genres)
+
+    def create(self, validated_data):
+        genres = validated_data.pop('genre')
+        title = Title.objects.create(**validated_data)
+        self.set_genres(title, genres, created=True)
+        return title
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        instance = super().update(instance, validated_data)
+        if genres is not None:
+            self.set_genres(instance, genres)
+        return instance
+
     def to_representation(self, instance):
         return GetTitleSerializer(instance, context=self.context).data
 
 
-class GetTitleSerializer(serializers.ModelSerializer):
+class TitleListSerializer(serializers.ListSerializer):
+    """
+    Список произведений: категории и жанры всех произведений берутся
+    из кэша справочников, связи с жанрами — одним запросом.
+    """
+
+    def to_representation(self, data):
+        titles = list(data.all() if isinstance(data, Manager) else data)
+        attach_catalogue(
+            titles,
+            self.context.get('request'),
+            genres='genre' in self.child.fields,
+        )
+        return super().to_representation(titles)
+
+
+class GetTitleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для получения детальной информации о произведении."""
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(read_only=True, many=True)
@@ -171,3 +243,127 @@ class GetTitleSerializer(serializers.ModelSerializer):
             'genre',
             'category',
         )
+        list_serializer_class = TitleListSerializer
+
+    def to_representation(self, instance):
+        attach_catalogue(
+            [instance],
+            self.context.get('request'),
+            genres='genre' in self.fields,
+        )
+        return super().to_representation(instance)
+
+
+class GetTitleWithReviewsSerializer(GetTitleSerializer):
+    """Сериализатор произведения с последними отзывами (?include=reviews)."""
+    reviews = ReviewSerializer(
+        source='included_reviews', many=True, read_only=True
+    )
+
+    class Meta(GetTitleSerializer.Meta):
+        fields = GetTitleSerializer.Meta.fields + ('reviews',)
+
+
+class TitleBriefSerializer(serializers.ModelSerializer):
+    """Краткое представление произведения для ленты активности."""
+    class Meta:
+        model = Title
+        fields = ('id', 'name')
+
+
+class TitleSuggestionSerializer(serializers.Serializer):
+    """Подсказка автодополнения названия произведения."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    rating = serializers.IntegerField(allow_null=True)
+
+
+class UserReviewSerializer(serializers.ModelSerializer):
+    """Отзыв в ленте активности пользователя."""
+    title = TitleBriefSerializer(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'text', 'score', 'pub_date', 'title')
+
+
+class UserCommentSerializer(serializers.ModelSerializer):
+    """Комментарий в ленте активности пользователя."""
+    review = serializers.PrimaryKeyRelatedField(read_only=True)
+    title = TitleBriefSerializer(source='review.title', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'text', 'pub_date', 'review', 'title')
+
+
+class ChangeLogEntrySerializer(serializers.ModelSerializer):
+    """
+    Сериализатор записи ленты изменений. Для созданных и изменённых
+    объектов включает их текущее представление, для удалённых — null.
+    """
+    type = serializers.CharField(source='object_type')
+    id = serializers.IntegerField(source='object_id')
+    action = serializers.SerializerMethodField()
+    data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChangeLogEntry
+        fields = ('type', 'id', 'action', 'title_id', 'review_id', 'data')
+
+    def get_action(self, obj):
+        if (obj.object_type, obj.object_id) not in self.context['objects']:
+            return ChangeLogEntry.Action.DELETED
+        return obj.action
+
+    def get_data(self, obj):
+        instance = self.context['objects'].get(
+            (obj.object_type, obj.object_id)
+        )
+        if instance is None:
+            return None
+        serializer_class = {
+            ChangeLogEntry.ObjectType.TITLE: GetTitleSerializer,
+            ChangeLogEntry.ObjectType.REVIEW: ReviewSerializer,
+            ChangeLogEntry.ObjectType.COMMENT: CommentSerializer,
+        }[obj.object_type]
+        return serializer_class(instance, context=self.context).data
+
+
+class ModerationSerializer(serializers.Serializer):
+    """
+    Параметры массовой модерации: что обрабатывать, что с ним сделать
+    и фильтр отбора. Запрос без фильтра отклоняется, чтобы случайно не
+    затронуть все отзывы или комментарии.
+    """
+    FILTER_FIELDS = ('author', 'title', 'date_from', 'date_to', 'ids')
+
+    target = serializers.ChoiceField(choices=('reviews', 'comments'))
+    action = serializers.ChoiceField(choices=('delete', 'hide', 'unhide'))
+    author = serializers.CharField(
+        required=False, max_length=USERNAME_MAX_LENGTH
+    )
+    title = serializers.IntegerField(required=False, min_value=1)
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=MODERATION_IDS_MAX_COUNT,
+    )
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if not data.keys() & set(self.FILTER_FIELDS):
+            raise serializers.ValidationError(
+                'Укажите хотя бы один фильтр: '
+                f'{", ".join(self.FILTER_FIELDS)}.'
+            )
+        if data.get('date_from') and data.get('date_to') and (
+            data['date_from'] > data['date_to']
+        ):
+            raise serializers.ValidationError(
+                'Начало периода позже его конца.'
+            )
+        return data
@@ -1,13 +1,32 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from rest_framework import serializers
 
+from api.utils import get_sparse_fields
 from core.validators import validate_not_me
 from .constants import USERNAME_MAX_LENGTH
 
 User = get_user_model()
 
 
-class UserMixinSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Миксин сериализатора, ограничивающий поля ответа параметрами
+    ?fields= и ?exclude=. Действует только на основной сериализатор
+    представления, вложенные и служебные сериализаторы не затрагиваются.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        view = self.context.get('view')
+        if view is None or type(self) is not view.get_serializer_class():
+            return
+        selected = get_sparse_fields(self.context.get('request'), self.fields)
+        for field_name in set(self.fields) - set(selected):
+            self.fields.pop(field_name)
+
+
+class UserMixinSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     username = serializers.RegexField(
         regex=r'^[\w.@+-]+\Z',
         max_length=USERNAME_MAX_LENGTH,
@@ -15,15 +34,24 @@ class UserMixinSerializer(serializers.ModelSerializer):
     )
 
     def validate(self, data):
-        if User.objects.filter(
-            username=data.get('username'), email=data.get('email')
-        ):
+        """
+        Проверяет занятость username и email одним запросом: совпадение
+        обоих полей у одного пользователя допустимо (повторная
+        регистрация), иначе сообщается, какое из полей занято.
+        """
+        username, email = data.get('username'), data.get('email')
+        if username is None and email is None:
+            return data
+        conflicts = list(User.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).values_list('username', 'email'))
+        if (username, email) in conflicts:
             return data
-        elif User.objects.filter(username=data.get('username')):
+        if any(taken == username for taken, _ in conflicts):
             raise serializers.ValidationError(
                 'Имя пользователя уже занято'
             )
-        elif User.objects.filter(email=data.get('email')):
+        if any(taken == email for _, taken in conflicts):
             raise serializers.ValidationError(
                 'Адрес электронной почты уже занят'
             )
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS token_bucket ('
+    'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS worker_load ('
+    'pid INTEGER PRIMARY KEY, inflight INTEGER NOT NULL, '
+    'latency_ms REAL NOT NULL, updated REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS counter ('
+    'name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS single_flight ('
+    'pid INTEGER NOT NULL, name TEXT NOT NULL, '
+    'leaders INTEGER NOT NULL, shared INTEGER NOT NULL, '
+    'timeouts INTEGER NOT NULL, fallbacks INTEGER NOT NULL, '
+    'updated REAL NOT NULL, PRIMARY KEY (pid, name))',
+    'CREATE TABLE IF NOT EXISTS job_lock ('
+    'name TEXT NOT NULL, slot INTEGER NOT NULL, pid INTEGER NOT NULL, '
+    'expires REAL NOT NULL, PRIMARY KEY (name, slot))',
+)
+SINGLE_FLIGHT_COUNTERS = ('leaders', 'shared', 'timeouts', 'fallbacks')
+
+local = threading.local()
+
+
+def get_connection():
+    """
+    Соединение текущего потока с общим для всех процессов файлом
+    SHARED_STATE_PATH. Данные в нём временные, поэтому запись идёт
+    в режиме WAL без синхронизации с диском.
+    """
+    connection = getattr(local, 'connection', None)
+    key = (os.getpid(), str(settings.SHARED_STATE_PATH))
+    if connection is None or local.key != key:
+        connection = sqlite3.connect(
+            settings.SHARED_STATE_PATH,
+            timeout=settings.SHARED_STATE_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        local.connection = connection
+        local.key = key
+    return connection
+
+
+def take_tokens(key, capacity, refill_rate, count=1, now=None):
+    """
+    Забирает до count токенов из корзины key вместимостью capacity,
+    пополняемой на refill_rate токенов в секунду. Возвращает пару:
+    число выданных токенов и, если не выдано ни одного, число секунд
+    до появления токена (иначе ноль).
+    """
+    now = time.time() if now is None else now
+    connection = get_connection()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        row = connection.execute(
+            'SELECT tokens, updated FROM token_bucket WHERE key = ?', (key,)
+        ).fetchone()
+        tokens = capacity
+        if row is not None:
+            tokens = min(
+                capacity, row[0] + max(0.0, now - row[1]) * refill_rate
+            )
+        granted = min(count, int(tokens))
+        tokens -= granted
+        wait = 0.0 if granted else (1 - tokens) / refill_rate
+        connection.execute(
+            'INSERT INTO token_bucket (key, tokens, updated) '
+            'VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'tokens = excluded.tokens, updated = excluded.updated',
+            (key, tokens, now),
+        )
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+    return granted, wait
+
+
+def purge_buckets(max_age):
+    """Удаляет корзины, не использовавшиеся дольше max_age секунд."""
+    get_connection().execute(
+        'DELETE FROM token_bucket WHERE updated < ?', (time.time() - max_age,)
+    )
+
+
+def report_load(inflight, latency_ms):
+    """Публикует нагрузку текущего процесса для других процессов."""
+    get_connection().execute(
+        'INSERT INTO worker_load (pid, inflight, latency_ms, updated) '
+        'VALUES (?, ?, ?, ?) ON CONFLICT (pid) DO UPDATE SET '
+        'inflight = excluded.inflight, latency_ms = excluded.latency_ms, '
+        'updated = excluded.updated',
+        (os.getpid(), inflight, latency_ms, time.time()),
+    )
+
+
+def get_workers_load(max_age=None):
+    """
+    Нагрузка воркеров, сообщавших о себе не позже max_age секунд назад:
+    список словарей pid, inflight, latency_ms, updated.
+    """
+    if max_age is None:
+        max_age = settings.LOAD_REPORT_MAX_AGE
+    cursor = get_connection().execute(
+        'SELECT pid, inflight, latency_ms, updated FROM worker_load '
+        'WHERE updated >= ? ORDER BY pid',
+        (time.time() - max_age,),
+    )
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def get_counter(name):
+    """Текущее значение общего счётчика name (ноль, если его нет)."""
+    row = get_connection().execute(
+        'SELECT value FROM counter WHERE name = ?', (name,)
+    ).fetchone()
+    return 0 if row is None else row[0]
+
+
+def bump_counter(name):
+    """Увеличивает общий счётчик name на единицу."""
+    get_connection().execute(
+        'INSERT INTO counter (name, value) VALUES (?, 1) '
+        'ON CONFLICT (name) DO UPDATE SET value = value + 1',
+        (name,),
+    )
+
+
+def acquire_job_lock(name, slots, ttl):
+    """
+    Занимает на ttl секунд одно из slots мест задачи name. Возвращает
+    номер места или None, если все места заняты. Места, не освобождённые
+    и не продлённые за ttl (например, после падения процесса), считаются
+    свободными.
+    """
+    now = time.time()
+    connection = get_connection()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(
+            'DELETE FROM job_lock WHERE name = ? AND expires < ?', (name, now)
+        )
+        taken = {
+            slot for slot, in connection.execute(
+                'SELECT slot FROM job_lock WHERE name = ?', (name,)
+            )
+        }
+        slot = next(
+            (slot for slot in range(slots) if slot not in taken), None
+        )
+        if slot is not None:
+            connection.execute(
+                'INSERT INTO job_lock (name, slot, pid, expires) '
+                'VALUES (?, ?, ?, ?)',
+                (name, slot, os.getpid(), now + ttl),
+            )
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+    return slot
+
+
+def renew_job_lock(name, slot, ttl):
+    """Продлевает место slot задачи name, занятое текущим процессом."""
+    get_connection().execute(
+        'UPDATE job_lock SET expires = ? '
+        'WHERE name = ? AND slot = ? AND pid = ?',
+        (time.time() + ttl, name, slot, os.getpid()),
+    )
+
+
+def release_job_lock(name, slot):
+    """Освобождает место slot задачи name, занятое текущим процессом."""
+    get_connection().execute(
+        'DELETE FROM job_lock WHERE name = ? AND slot = ? AND pid = ?',
+        (name, slot, os.getpid()),
+    )
+
+
+def report_single_flight(stats):
+    """
+    Публикует счётчики объединения запросов текущего процесса:
+    словарь группа → словарь счётчиков SINGLE_FLIGHT_COUNTERS.
+    """
+    now = time.time()
+    connection = get_connection()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.executemany(
+            'INSERT INTO single_flight '
+            '(pid, name, leaders, shared, timeouts, fallbacks, updated) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (pid, name) '
+            'DO UPDATE SET leaders = excluded.leaders, '
+            'shared = excluded.shared, timeouts = excluded.timeouts, '
+            'fallbacks = excluded.fallbacks, updated = excluded.updated',
+            [
+                (
+                    os.getpid(), name,
+                    *(counters[counter] for counter in SINGLE_FLIGHT_COUNTERS),
+                    now,
+                )
+                for name, counters in stats.items()
+            ],
+        )
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def get_single_flight_stats(max_age=None):
+    """
+    Счётчики объединения запросов по группам, суммарно по воркерам,
+    сообщавшим о себе не позже max_age секунд назад.
+    """
+    if max_age is None:
+        max_age = settings.SINGLE_FLIGHT_STATS_MAX_AGE
+    cursor = get_connection().execute(
+        'SELECT name, SUM(leaders), SUM(shared), SUM(timeouts), '
+        'SUM(fallbacks), COUNT(*) FROM single_flight WHERE updated >= ? '
+        'GROUP BY name ORDER BY name',
+        (time.time() - max_age,),
+    )
+    return [
+        {
+            'name': name,
+            **dict(zip(SINGLE_FLIGHT_COUNTERS, counters)),
+            'workers': workers,
+        }
+        for name, *counters, workers in cursor.fetchall()
+    ]
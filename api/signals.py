@@ -0,0 +1,51 @@
+"""
+Кэши API в памяти процесса, которые обновляются при изменении моделей:
+справочники (api.catalogue), индекс автодополнения (api.autocomplete)
+и проверки родителей вложенных маршрутов (api.base_viewsets).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.autocomplete import title_deleted, title_saved
+from api.base_viewsets import forget_parents
+from api.catalogue import invalidate_catalogue
+from reviews.models import Category, Genre, Review, Title
+from reviews.signals import bulk_created
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+@receiver(bulk_created, sender=Category)
+@receiver(bulk_created, sender=Genre)
+def catalogue_changed(sender, raw=False, **kwargs):
+    """Изменение справочника объявляет устаревшими их кэши в процессах."""
+    invalidate_catalogue()
+
+
+@receiver(post_save, sender=Title)
+def autocomplete_title_saved(sender, instance, created, raw=False, **kwargs):
+    """Сохранённое произведение попадает в индекс автодополнения."""
+    if raw:
+        return
+    title_saved(instance, created)
+
+
+@receiver(post_delete, sender=Title)
+def autocomplete_title_deleted(sender, instance, **kwargs):
+    """Удалённое произведение убирается из индекса автодополнения."""
+    title_deleted(instance)
+
+
+@receiver(post_delete, sender=Title)
+def forget_deleted_title(sender, instance, **kwargs):
+    forget_parents(Title, [(instance.pk,)])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def forget_hidden_review(sender, instance, **kwargs):
+    """Удалённый или скрытый отзыв больше не родитель комментариев."""
+    if kwargs['signal'] is post_delete or instance.is_hidden:
+        forget_parents(Review, [(instance.pk, instance.title_id)])
@@ -0,0 +1,390 @@
+import asyncio
+import io
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.shortcuts import get_object_or_404
+from django.utils.functional import SimpleLazyObject
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.middleware import load_monitor, shed_response
+from api.permissions import IsAuthorOrAdminOrReadOnly
+from api.serializers import ChangeLogEntrySerializer
+from reviews.models import ChangeLogEntry, Comment, Review, Title
+from reviews.sharding import fetch_all
+
+EVENTS_PATH = re.compile(r'^/api/v1/titles/(?P<title_id>\d+)/events/$')
+EVENT_TYPES = (
+    ChangeLogEntry.ObjectType.REVIEW,
+    ChangeLogEntry.ObjectType.COMMENT,
+)
+
+# Чтение журнала и проверки произведений выполняются в потоках пула,
+# не блокируя цикл событий.
+read_executor = SimpleLazyObject(lambda: ThreadPoolExecutor(
+    max_workers=settings.SSE_READ_THREADS,
+    thread_name_prefix='sse-read',
+))
+
+
+def load_events(title_id=None, after=0, limit=None):
+    """
+    Читает из журнала изменений события отзывов и комментариев
+    после позиции after и сериализует их. Выполняется в потоке пула.
+    """
+    close_old_connections()
+    try:
+        entries = ChangeLogEntry.objects.filter(
+            id__gt=after, object_type__in=EVENT_TYPES
+        )
+        if title_id is not None:
+            entries = entries.filter(title_id=title_id)
+        entries = list(entries[:limit or settings.SSE_BATCH_SIZE])
+        objects = {}
+        for model, object_type in (
+            (Review, ChangeLogEntry.ObjectType.REVIEW),
+            (Comment, ChangeLogEntry.ObjectType.COMMENT),
+        ):
+            ids = [
+                entry.object_id for entry in entries
+                if entry.object_type == object_type
+                and entry.action != ChangeLogEntry.Action.DELETED
+            ]
+            if ids:
+                for obj in fetch_all(
+                    model.objects.visible().with_author().filter(pk__in=ids)
+                ):
+                    objects[(object_type, obj.pk)] = obj
+        data = ChangeLogEntrySerializer(
+            entries, many=True, context={'objects': objects}
+        ).data
+        return [
+            (entry.id, entry.title_id, item)
+            for entry, item in zip(entries, data)
+        ]
+    finally:
+        close_old_connections()
+
+
+class EventsGateView(APIView):
+    """
+    Проверки запроса потока событий, которые остальной API выполняет
+    в DRF: аутентификация, права доступа (как у отзывов), ограничение
+    частоты чтения и существование произведения. Ответ 204 разрешает
+    поток, остальные ответы отдаются клиенту вместо него.
+    """
+    permission_classes = (IsAuthorOrAdminOrReadOnly,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # Клиент потока запрашивает text/event-stream, ошибки
+        # отдаются в формате API по умолчанию.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, title_id):
+        get_object_or_404(Title.objects.only('pk'), pk=title_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+events_gate_view = EventsGateView.as_view()
+
+
+def check_events_request(scope, title_id):
+    """
+    Пропускает запрос потока событий через сброс нагрузки и
+    EventsGateView. Выполняется в потоке пула. Поток событий долгий
+    по назначению, поэтому в нагрузке процесса учитывается только
+    проверка.
+    """
+    rejected = load_monitor.enter()
+    if rejected:
+        return shed_response(*rejected)
+    started = time.perf_counter()
+    close_old_connections()
+    try:
+        response = events_gate_view(
+            ASGIRequest(scope, io.BytesIO()), title_id=title_id
+        )
+        response.render()
+        return response
+    finally:
+        close_old_connections()
+        load_monitor.exit(
+            (time.perf_counter() - started) * 1000, sampled=False
+        )
+
+
+def format_data(item):
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+
+
+def format_event(seq, item):
+    return (
+        f'id: {seq}\nevent: {item["type"]}.{item["action"]}\n'
+        f'data: {format_data(item)}\n\n'
+    ).encode()
+
+
+FAILED_EVENT = (
+    'event: error\ndata: '
+    + format_data({'detail': 'Поток событий прерван, переподключитесь.'})
+    + '\n\n'
+).encode()
+
+
+# Сообщения очереди подписчика, кроме событий: поток закрывается
+# (клиент переподключится с Last-Event-ID) или закрывается с ошибкой.
+CLOSED = None
+FAILED = 'failed'
+
+
+class Broadcaster:
+    """
+    Рассыльщик событий одного воркера. Единственная задача опрашивает
+    журнал изменений (общий для всех процессов канал в базе данных) и
+    раздаёт каждое событие, сериализованное один раз, очередям
+    подписчиков нужного произведения. Сохранения в этом же процессе
+    будят опрос сразу, не дожидаясь интервала. Если опрос падает,
+    очереди всех подписчиков закрываются с ошибкой, а следующий
+    подписчик запускает новую задачу.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.loop = None
+        self.wakeup = None
+        self.task = None
+        self.ready = None
+        self.last_seq = 0
+
+    def subscribe(self, title_id):
+        if self.task is None or self.task.done():
+            self.loop = asyncio.get_running_loop()
+            self.wakeup = asyncio.Event()
+            self.ready = asyncio.Event()
+            self.task = self.loop.create_task(self.run())
+        queue = asyncio.Queue(maxsize=settings.SSE_QUEUE_SIZE)
+        self.subscribers.setdefault(title_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, title_id, queue):
+        queues = self.subscribers.get(title_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.subscribers.pop(title_id, None)
+
+    def wake(self):
+        """Будит опрос журнала; безопасно вызывать из любого потока."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    async def run(self):
+        try:
+            await self.poll()
+        except Exception:
+            subscribers, self.subscribers = self.subscribers, {}
+            for queues in subscribers.values():
+                for queue in queues:
+                    self.close(queue, FAILED)
+            self.ready.set()
+            raise
+
+    def close(self, queue, message):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def poll(self):
+        loop = asyncio.get_running_loop()
+        self.last_seq = await loop.run_in_executor(
+            read_executor, latest_seq
+        )
+        self.ready.set()
+        while self.subscribers:
+            try:
+                await asyncio.wait_for(
+                    self.wakeup.wait(), settings.SSE_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            events = await loop.run_in_executor(
+                read_executor, load_events, None, self.last_seq
+            )
+            for seq, title_id, item in events:
+                self.last_seq = seq
+                self.publish(title_id, seq, item)
+            if len(events) == settings.SSE_BATCH_SIZE:
+                self.wakeup.set()
+
+    def publish(self, title_id, seq, item):
+        for queue in list(self.subscribers.get(title_id, ())):
+            try:
+                queue.put_nowait((seq, item))
+            except asyncio.QueueFull:
+                # Медленный клиент отключается и переподключится
+                # с Last-Event-ID, получив пропущенное из журнала.
+                self.unsubscribe(title_id, queue)
+                self.close(queue, CLOSED)
+
+
+def latest_seq():
+    close_old_connections()
+    try:
+        return ChangeLogEntry.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+    finally:
+        close_old_connections()
+
+
+broadcaster = Broadcaster()
+
+
+def wake_broadcaster(sender, **kwargs):
+    transaction.on_commit(broadcaster.wake)
+
+
+for sender in (Review, Comment):
+    post_save.connect(wake_broadcaster, sender=sender)
+    post_delete.connect(wake_broadcaster, sender=sender)
+
+
+def get_last_event_id(scope):
+    for name, value in scope['headers']:
+        if name == b'last-event-id':
+            value = value.decode('latin-1').strip()
+            return int(value) if value.isdigit() else 0
+    return 0
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_response_start(send, status_code, headers):
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ],
+    })
+
+
+async def send_response(send, response):
+    """Отправляет клиенту ответ Django целиком."""
+    await send_response_start(send, response.status_code, response.items())
+    await send({'type': 'http.response.body', 'body': response.content})
+
+
+async def events_application(scope, receive, send, title_id):
+    """
+    Поток Server-Sent Events с новыми и изменёнными отзывами и
+    комментариями произведения. Поддерживает возобновление по
+    заголовку Last-Event-ID: пропущенные события берутся из журнала.
+    Если рассыльщик упал, поток завершается событием error.
+    """
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(
+        read_executor, check_events_request, scope, title_id
+    )
+    if response.status_code != status.HTTP_204_NO_CONTENT:
+        await send_response(send, response)
+        return
+    queue = broadcaster.subscribe(title_id)
+    disconnected = loop.create_task(wait_disconnect(receive))
+    try:
+        await send_response_start(send, status.HTTP_200_OK, (
+            ('Content-Type', 'text/event-stream'),
+            ('Cache-Control', 'no-cache'),
+            ('X-Accel-Buffering', 'no'),
+        ))
+        await broadcaster.ready.wait()
+        last_seq = get_last_event_id(scope)
+        while last_seq:
+            # Пропущенное читается из журнала до текущей позиции рассыльщика,
+            # дальше события приходят из очереди подписчика.
+            replay = await loop.run_in_executor(
+                read_executor,
+                load_events,
+                title_id,
+                last_seq,
+                settings.SSE_REPLAY_BATCH_SIZE,
+            )
+            for seq, _, item in replay:
+                last_seq = seq
+                await send({
+                    'type': 'http.response.body',
+                    'body': format_event(seq, item),
+                    'more_body': True,
+                })
+            if len(replay) < settings.SSE_REPLAY_BATCH_SIZE:
+                break
+        while True:
+            getter = loop.create_task(queue.get())
+            done, _ = await asyncio.wait(
+                (getter, disconnected),
+                timeout=settings.SSE_HEARTBEAT_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter not in done:
+                getter.cancel()
+                if disconnected in done:
+                    return
+                body = b': ping\n\n'
+            else:
+                event = getter.result()
+                if event is CLOSED:
+                    break
+                if event == FAILED:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': FAILED_EVENT,
+                        'more_body': True,
+                    })
+                    break
+                seq, item = event
+                if seq <= last_seq:
+                    continue
+                last_seq = seq
+                body = format_event(seq, item)
+            await send({
+                'type': 'http.response.body',
+                'body': body,
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass
+    finally:
+        broadcaster.unsubscribe(title_id, queue)
+        disconnected.cancel()
+
+
+class EventsRouter:
+    """
+    ASGI-приложение, направляющее запросы потока событий в
+    events_application, а остальные — в приложение Django.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            match = EVENTS_PATH.match(scope['path'])
+            if match:
+                return await events_application(
+                    scope, receive, send, int(match['title_id'])
+                )
+        return await self.application(scope, receive, send)
@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+from api.shared_state import take_tokens
+
+
+class TokenLeases:
+    """
+    Токены общих корзин, взятые процессом про запас: общий файл
+    блокируется один раз на пачку запросов клиента, а не на каждый.
+    Невыданный остаток пропадает через THROTTLE_LEASE_TTL секунд.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.leases = {}
+
+    def take(self, key):
+        """Выдаёт токен из запаса key. Возвращает False, если запаса нет."""
+        now = time.monotonic()
+        with self.lock:
+            tokens, expires = self.leases.get(key, (0, now))
+            if not tokens or expires <= now:
+                return False
+            self.leases[key] = (tokens - 1, expires)
+        return True
+
+    def put(self, key, tokens):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.leases) >= settings.THROTTLE_LEASE_MAX_KEYS:
+                self.leases = {
+                    key: lease for key, lease in self.leases.items()
+                    if lease[0] and lease[1] > now
+                }
+                if len(self.leases) >= settings.THROTTLE_LEASE_MAX_KEYS:
+                    self.leases.clear()
+            self.leases[key] = (tokens, now + settings.THROTTLE_LEASE_TTL)
+
+
+token_leases = TokenLeases()
+
+
+class SharedTokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты запросов корзиной токенов в общем файле
+    SHARED_STATE_PATH, согласованной между всеми процессами-воркерами.
+    Ставка `N/период` даёт корзину на N токенов, полностью
+    пополняющуюся за период. Процесс берёт из корзины сразу столько
+    токенов, сколько их пополняется за THROTTLE_LEASE_TTL секунд (не
+    больше THROTTLE_LEASE_SIZE), и выдаёт остаток следующим запросам
+    клиента без обращения к общему файлу. Если общий файл недоступен,
+    запрос пропускается: ограничитель не должен ронять API.
+    """
+    cache_format = '%(scope)s:%(ident)s'
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def get_cache_key(self, request, view):
+        return self.get_ident_key(request)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.wait_time = 0
+        if token_leases.take(key):
+            return True
+        refill_rate = self.num_requests / self.duration
+        lease = max(1, min(
+            settings.THROTTLE_LEASE_SIZE,
+            int(refill_rate * settings.THROTTLE_LEASE_TTL),
+        ))
+        try:
+            granted, self.wait_time = take_tokens(
+                key, self.num_requests, refill_rate, lease
+            )
+        except sqlite3.Error:
+            return True
+        if granted > 1:
+            token_leases.put(key, granted - 1)
+        return bool(granted)
+
+    def wait(self):
+        return self.wait_time
+
+
+class SignupRateThrottle(SharedTokenBucketThrottle):
+    """Регистрация и повторная отправка кода: по IP-адресу."""
+    scope = 'signup'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class TokenRateThrottle(SignupRateThrottle):
+    """Получение JWT-токена по коду подтверждения: по IP-адресу."""
+    scope = 'token'
+
+
+class ReadRateThrottle(SharedTokenBucketThrottle):
+    """Чтение: по пользователю или IP-адресу анонима."""
+    scope = 'read'
+
+    def get_cache_key(self, request, view):
+        if request.method not in SAFE_METHODS:
+            return None
+        return self.get_ident_key(request)
+
+
+class WriteRateThrottle(SharedTokenBucketThrottle):
+    """Создание, изменение и удаление: по пользователю или IP-адресу."""
+    scope = 'write'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return self.get_ident_key(request)
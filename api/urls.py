@@ -3,10 +3,12 @@ from rest_framework.routers import DefaultRouter
 
 from api.views import (
     CategoryViewSet,
+    ChangeFeedView,
     CommentViewSet,
     CreateJWTTokenView,
     CreateUserView,
     GenreViewSet,
+    ModerationView,
     ReviewViewSet,
     TitleViewSet,
     UserViewSet,
@@ -30,4 +32,6 @@ urlpatterns = [
     path('v1/', include(router_v1.urls)),
     path('v1/auth/signup/', CreateUserView.as_view()),
     path('v1/auth/token/', CreateJWTTokenView.as_view()),
+    path('v1/changes/', ChangeFeedView.as_view()),
+    path('v1/moderation/', ModerationView.as_view()),
 ]
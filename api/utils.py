@@ -1,5 +1,8 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
 from django.core.mail import send_mail
 from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
 
 
 def send_email_to_user(email, code):
@@ -11,3 +14,53 @@ def send_email_to_user(email, code):
         recipient_list=[email],
         fail_silently=True,
     )
+
+
+def encode_change_token(seq):
+    """Кодирует позицию в журнале изменений в непрозрачный токен."""
+    return urlsafe_b64encode(f'seq:{seq}'.encode()).decode().rstrip('=')
+
+
+def decode_change_token(token):
+    """
+    Декодирует токен журнала изменений в позицию.
+    Возвращает None, если токен некорректен.
+    """
+    try:
+        prefix, seq = urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)
+        ).decode().split(':')
+        seq = int(seq)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if prefix != 'seq' or seq < 0:
+        return None
+    return seq
+
+
+def parse_list_param(value):
+    """Разбирает параметр запроса со списком значений через запятую."""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def parse_int_param(value, default, max_value):
+    """Разбирает положительное целое из параметра запроса с ограничением."""
+    try:
+        return max(1, min(int(value), max_value))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_sparse_fields(request, fields):
+    """
+    Возвращает поля ответа с учётом параметров ?fields= и ?exclude=
+    для запросов на чтение. Неизвестные имена полей игнорируются.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return tuple(fields)
+    selected = parse_list_param(request.query_params.get('fields'))
+    excluded = parse_list_param(request.query_params.get('exclude'))
+    return tuple(
+        field for field in fields
+        if (not selected or field in selected) and field not in excluded
+    )
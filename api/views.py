@@ -1,37 +1,95 @@
+from collections import Counter
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg
+from django.db import IntegrityError, router, transaction
+from django.db.models import Prefetch
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, status, viewsets
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.generics import CreateAPIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import CreateAPIView, GenericAPIView
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 
-from api.filters import TitleFilter
-from api.base_viewsets import BaseCreateListDestroyViewSet
+from api.autocomplete import search as autocomplete_search
+from api.catalogue import CATALOGUE_MODELS, attach_catalogue, get_catalogue
+from api.constants import (
+    CHANGES_MAX_PAGE_SIZE,
+    CHANGES_PAGE_SIZE,
+    MODERATION_BATCH_SIZE,
+)
+from api.filters import (
+    IdListFilterBackend,
+    TitleFilter,
+    UsernameSearchFilter,
+)
+from api.base_viewsets import (
+    BaseCreateListDestroyViewSet,
+    BulkWriteMixin,
+    IdempotentCreateMixin,
+    IncludeNewestMixin,
+    NestedParentMixin,
+    forget_parents,
+)
+from api.pagination import ActivityCursorPagination
 from api.permissions import (
     IsAdminOrReadOnly,
     IsAdmin,
     IsAuthorOrAdminOrReadOnly,
+    IsModeratorOrAdmin,
 )
 from api.serializers import (
     CategorySerializer,
+    ChangeLogEntrySerializer,
     CommentSerializer,
     GenreSerializer,
     GetTitleSerializer,
+    GetTitleWithReviewsSerializer,
+    ModerationSerializer,
     ReviewSerializer,
+    ReviewWithCommentsSerializer,
     TitleSerializer,
+    TitleSuggestionSerializer,
     TokenSerializer,
     UserAdminEditSerializer,
+    UserCommentSerializer,
     UserCreateSerializer,
     UserEditSerializer,
+    UserReviewSerializer,
+)
+from api.throttling import SignupRateThrottle, TokenRateThrottle
+from api.utils import (
+    decode_change_token,
+    encode_change_token,
+    get_sparse_fields,
+    parse_int_param,
+    send_email_to_user,
 )
-from api.utils import send_email_to_user
-from reviews.models import Category, Genre, Title, Review
+from reviews.models import (
+    Category,
+    ChangeLogEntry,
+    ChangeLogHorizon,
+    Comment,
+    Genre,
+    Review,
+    Title,
+)
+from reviews.sharding import (
+    ShardedQuerySet,
+    fan_out,
+    fetch_all,
+    get_shards,
+    is_sharded,
+    shard_for,
+)
+from reviews.signals import mute_changelog, title_updated_entry
 
 User = get_user_model()
 
@@ -44,6 +102,7 @@ class CreateUserView(CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserCreateSerializer
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (SignupRateThrottle,)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -61,6 +120,7 @@ class CreateJWTTokenView(CreateAPIView):
     """
     serializer_class = TokenSerializer
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (TokenRateThrottle,)
 
     def get_queryset(self):
         return get_object_or_404(User, username=self.kwargs['username'])
@@ -86,7 +146,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserAdminEditSerializer
     permission_classes = (IsAdmin,)
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (UsernameSearchFilter,)
     lookup_field = 'username'
     search_fields = ('username',)
     pagination_class = PageNumberPagination
@@ -114,8 +174,84 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def list_activity(self, user):
+        """
+        Отзывы или комментарии пользователя от новых к старым, с кратким
+        представлением произведения, загруженным тем же запросом. При
+        шардах лента читается из всех шардов, а произведения, которые
+        хранятся в default, загружаются отдельным запросом.
+        """
+        if self.get_serializer_class() is UserReviewSerializer:
+            queryset = Review.objects.visible()
+            fields = ('id', 'text', 'score', 'pub_date')
+            title = 'title'
+        else:
+            queryset = Comment.objects.visible().filter(
+                review__is_hidden=False
+            ).select_related('review')
+            fields = ('id', 'text', 'pub_date')
+            title = 'review__title'
+        queryset = queryset.filter(author=user)
+        if is_sharded():
+            queryset = ShardedQuerySet(
+                queryset.only(*fields, title).prefetch_related(Prefetch(
+                    title, queryset=Title.objects.only('name')
+                ))
+            )
+        else:
+            queryset = queryset.select_related(title).only(
+                *fields, f'{title}__name'
+            )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['get'],
+        permission_classes=(permissions.IsAuthenticated,),
+        detail=False,
+        serializer_class=UserReviewSerializer,
+        pagination_class=ActivityCursorPagination,
+        url_path='me/reviews',
+    )
+    def my_reviews(self, request):
+        return self.list_activity(request.user)
+
+    @action(
+        methods=['get'],
+        permission_classes=(permissions.IsAuthenticated,),
+        detail=False,
+        serializer_class=UserCommentSerializer,
+        pagination_class=ActivityCursorPagination,
+        url_path='me/comments',
+    )
+    def my_comments(self, request):
+        return self.list_activity(request.user)
+
+    @action(
+        methods=['get'],
+        detail=True,
+        serializer_class=UserReviewSerializer,
+        pagination_class=ActivityCursorPagination,
+    )
+    def reviews(self, request, username=None):
+        return self.list_activity(self.get_object())
+
+    @action(
+        methods=['get'],
+        detail=True,
+        serializer_class=UserCommentSerializer,
+        pagination_class=ActivityCursorPagination,
+    )
+    def comments(self, request, username=None):
+        return self.list_activity(self.get_object())
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    IdempotentCreateMixin,
+    NestedParentMixin,
+    viewsets.ModelViewSet,
+):
     """
     Представление для управления комментариями к отзывам.
     Позволяет создавать, просматривать, редактировать и удалять комментарии.
@@ -123,36 +259,107 @@ class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'delete', 'patch']
+    parent_queryset = Review.objects.visible()
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
 
-    def get_review(self):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        return get_object_or_404(Review, pk=review_id, title_id=title_id)
+    def get_parent_filter(self):
+        return {
+            'review_id': self.kwargs.get('review_id'),
+            'review__title_id': self.kwargs.get('title_id'),
+            'review__is_hidden': False,
+        }
 
     def get_queryset(self):
-        return self.get_review().comments.select_related('author')
+        return Comment.objects.visible().filter(
+            **self.get_parent_filter()
+        ).with_author()
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        self.check_parent(use_cache=False)
+        try:
+            with transaction.atomic(using=router.db_for_write(Comment)):
+                # В шарде внешние ключи не проверяются: отзыв, удалённый
+                # после проверки, ищется в транзакции записи.
+                if is_sharded() and not Review.objects.visible().filter(
+                    pk=self.kwargs.get('review_id'),
+                    title_id=self.kwargs.get('title_id'),
+                ).exists():
+                    raise Http404
+                serializer.save(
+                    author=self.request.user,
+                    review_id=self.kwargs.get('review_id'),
+                )
+        except IntegrityError:
+            # Отзыв удалён после проверки.
+            raise Http404
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    IdempotentCreateMixin,
+    IncludeNewestMixin,
+    NestedParentMixin,
+    viewsets.ModelViewSet,
+):
     """
     Представление для управления отзывами на произведения.
     Позволяет создавать, просматривать, редактировать и удалять отзывы.
+    С ?include=comments встраивает последние комментарии к отзывам.
     """
     serializer_class = ReviewSerializer
+    include_relation = 'comments'
+    include_parent_field = 'review'
+    include_queryset = Comment.objects.visible().with_author()
+    include_serializer_class = ReviewWithCommentsSerializer
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'delete', 'patch']
+    parent_queryset = Title.objects.all()
+    parent_lookups = {'pk': 'title_id'}
 
-    def get_title(self):
-        return get_object_or_404(Title, pk=self.kwargs.get('title_id'))
+    def get_parent_filter(self):
+        return {'title_id': self.kwargs.get('title_id')}
 
     def get_queryset(self):
-        return self.get_title().reviews.select_related('author')
+        queryset = Review.objects.visible().filter(**self.get_parent_filter())
+        if self.request.method not in permissions.SAFE_METHODS:
+            # Изменение и удаление читают title_id и is_hidden в сигналах
+            # журнала изменений: отзыв загружается целиком.
+            return queryset.with_author()
+        fields = get_sparse_fields(
+            self.request, self.get_serializer_class().Meta.fields
+        )
+        columns = [
+            field for field in ('text', 'score', 'pub_date') if field in fields
+        ]
+        if 'author' not in fields:
+            return queryset.only('id', *columns)
+        if is_sharded():
+            return queryset.only('id', *columns, 'author').prefetch_related(
+                Prefetch('author', queryset=User.objects.only('username'))
+            )
+        return queryset.select_related('author').only(
+            'id', *columns, 'author__username'
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        """
+        Отзыв создаётся одним INSERT: повторный отзыв автора на
+        произведение отсекает ограничение unique_review. Произведение
+        проверяется до INSERT без кэша проверок: внешний ключ SQLite
+        проверяется только при фиксации, а внутри внешней транзакции
+        (ATOMIC_REQUESTS) и в шарде, где внешних ключей нет, не
+        отсекает отзыв на несуществующее произведение.
+        """
+        self.check_parent(use_cache=False)
+        title_id = self.kwargs.get('title_id')
+        try:
+            with transaction.atomic(using=router.db_for_write(Review)):
+                serializer.save(author=self.request.user, title_id=title_id)
+        except IntegrityError:
+            if not Title.objects.filter(pk=title_id).exists():
+                raise Http404
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Не более одного отзыва на одно и то же произведение'
+            ]})
 
 
 class CategoryViewSet(BaseCreateListDestroyViewSet):
@@ -173,25 +380,353 @@ class GenreViewSet(BaseCreateListDestroyViewSet):
     serializer_class = GenreSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    IncludeNewestMixin, BulkWriteMixin, viewsets.ModelViewSet
+):
     """
     Представление для управления произведениями.
     Позволяет создавать, просматривать, обновлять и удалять произведения.
+    С ?ids=1,2,3 возвращает произведения по списку id без пагинации,
+    с ?include=reviews встраивает последние отзывы,
+    titles/bulk/ принимает пакет операций записи,
+    titles/autocomplete/?q= подсказывает названия по началу слов.
     """
     queryset = (
         Title
         .objects
-        .prefetch_related('genre', 'category')
-        .annotate(rating=Avg('reviews__score'))
         .order_by('name')
     )
-    filter_backends = (DjangoFilterBackend,)
+    serializer_class = GetTitleSerializer
+    filter_backends = (DjangoFilterBackend, IdListFilterBackend)
     filterset_class = TitleFilter
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = PageNumberPagination
     http_method_names = ['get', 'post', 'delete', 'patch']
+    include_relation = 'reviews'
+    include_parent_field = 'title'
+    include_queryset = Review.objects.visible().with_author()
+    include_serializer_class = GetTitleWithReviewsSerializer
+    bulk_changelog = True
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
-            return GetTitleSerializer
+            return super().get_serializer_class()
         return TitleSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method in permissions.SAFE_METHODS:
+            return context
+        # Slug категорий и жанров при записи разрешаются по кэшу
+        # справочников (см. BulkSlugRelatedField).
+        catalogue = get_catalogue(self.request)
+        context['prefetched'] = {
+            model: catalogue.by_slug[model] for model in CATALOGUE_MODELS
+        }
+        return context
+
+    def get_queryset(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return super().get_queryset()
+        return self.get_read_queryset(get_sparse_fields(
+            self.request, self.get_serializer_class().Meta.fields
+        ))
+
+    @staticmethod
+    def get_read_queryset(fields):
+        """
+        Queryset произведений, загружающий только то, что нужно для
+        выбранных полей ответа: без лишних колонок.
+        Категории и жанры подставляет кэш справочников (api.catalogue).
+        """
+        return Title.objects.only(
+            'id',
+            *(
+                field for field in (
+                    'name', 'year', 'description', 'category', 'rating'
+                )
+                if field in fields
+            ),
+        ).order_by('name')
+
+    def update(self, request, *args, **kwargs):
+        """
+        Как UpdateModelMixin.update, но в ответе произведение для чтения
+        (GetTitleSerializer) с записанным в базе рейтингом и уже
+        записанными жанрами из кэша prefetch, без повторных запросов.
+        """
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(
+            instance, data=request.data, partial=partial
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(GetTitleSerializer(
+            instance, context=self.get_serializer_context()
+        ).data)
+
+    def paginate_queryset(self, queryset):
+        if IdListFilterBackend.query_param in self.request.query_params:
+            return None
+        return super().paginate_queryset(queryset)
+
+    @action(
+        detail=False,
+        url_path='autocomplete',
+        serializer_class=TitleSuggestionSerializer,
+    )
+    def autocomplete(self, request):
+        """
+        Подсказки названий из индекса в памяти процесса, лучшие по
+        рейтингу: ?q= — начало слова названия, ?limit= — число подсказок.
+        """
+        suggestions = autocomplete_search(
+            request.query_params.get('q', ''),
+            parse_int_param(
+                request.query_params.get('limit'),
+                settings.AUTOCOMPLETE_DEFAULT_LIMIT,
+                settings.AUTOCOMPLETE_MAX_LIMIT,
+            ),
+        )
+        return Response(self.get_serializer(suggestions, many=True).data)
+
+
+class ChangeFeedView(GenericAPIView):
+    """
+    Лента изменений произведений, отзывов и комментариев для
+    инкрементальной синхронизации. Возвращает изменения после позиции,
+    переданной в непрозрачном токене `since`, и токен следующей страницы.
+    """
+    serializer_class = ChangeLogEntrySerializer
+    permission_classes = (permissions.AllowAny,)
+
+    def get_changed_objects(self, entries):
+        """Загружает текущие версии объектов одним запросом на модель."""
+        ids = {object_type: set() for object_type in ChangeLogEntry.ObjectType}
+        for entry in entries:
+            if entry.action != ChangeLogEntry.Action.DELETED:
+                ids[entry.object_type].add(entry.object_id)
+        querysets = {
+            ChangeLogEntry.ObjectType.TITLE: TitleViewSet.queryset,
+            ChangeLogEntry.ObjectType.REVIEW: (
+                Review.objects.visible().with_author()
+            ),
+            ChangeLogEntry.ObjectType.COMMENT: (
+                Comment.objects.visible().with_author()
+            ),
+        }
+        objects = {}
+        for object_type, object_ids in ids.items():
+            if not object_ids:
+                continue
+            for obj in fetch_all(
+                querysets[object_type].filter(pk__in=object_ids)
+            ):
+                objects[(object_type, obj.pk)] = obj
+        attach_catalogue(
+            [
+                obj for (object_type, _), obj in objects.items()
+                if object_type == ChangeLogEntry.ObjectType.TITLE
+            ],
+            self.request,
+        )
+        return objects
+
+    def get(self, request):
+        token = request.query_params.get('since')
+        since = 0
+        if token is not None:
+            since = decode_change_token(token)
+            if since is None:
+                return Response(
+                    {'since': 'Некорректный токен синхронизации'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if since < ChangeLogHorizon.get_seq():
+                return Response(
+                    {'since': 'Токен устарел, требуется полная синхронизация'},
+                    status=status.HTTP_410_GONE,
+                )
+        limit = parse_int_param(
+            request.query_params.get('limit'),
+            CHANGES_PAGE_SIZE,
+            CHANGES_MAX_PAGE_SIZE,
+        )
+        entries = list(ChangeLogEntry.objects.filter(id__gt=since)[:limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        latest = {}
+        for entry in entries:
+            latest[(entry.object_type, entry.object_id)] = entry
+        changes = sorted(latest.values(), key=lambda entry: entry.id)
+        serializer = self.get_serializer(
+            changes,
+            many=True,
+            context={
+                **self.get_serializer_context(),
+                'objects': self.get_changed_objects(changes),
+            },
+        )
+        return Response({
+            'next': encode_change_token(entries[-1].id if entries else since),
+            'has_more': has_more,
+            'results': serializer.data,
+        })
+
+
+class ModerationView(GenericAPIView):
+    """
+    Массовая модерация отзывов и комментариев для модераторов и
+    администраторов: удаление, скрытие или возврат скрытых объектов,
+    отобранных фильтром (автор, произведение, период, список id).
+    Объекты обрабатываются пачками по MODERATION_BATCH_SIZE, каждая в
+    своей транзакции. Скрытые объекты пропадают из списков, рейтинга,
+    встраиваемых отзывов, ленты изменений и потока событий.
+    """
+    serializer_class = ModerationSerializer
+    permission_classes = (IsModeratorOrAdmin,)
+    load_shedding_sampled = False
+    targets = {
+        'reviews': (Review, 'title_id'),
+        'comments': (Comment, 'review__title_id'),
+    }
+
+    def get_moderated_queryset(self, data):
+        model, title_lookup = self.targets[data['target']]
+        queryset = model.objects.all()
+        if 'author' in data:
+            # Автор находится отдельным запросом: при шардах таблица
+            # пользователей в другой базе.
+            queryset = queryset.filter(author=User.objects.filter(
+                username=data['author']
+            ).first())
+        if 'title' in data:
+            queryset = queryset.filter(**{title_lookup: data['title']})
+        if 'date_from' in data:
+            queryset = queryset.filter(pub_date__gte=data['date_from'])
+        if 'date_to' in data:
+            queryset = queryset.filter(pub_date__lte=data['date_to'])
+        if 'ids' in data:
+            queryset = queryset.filter(pk__in=data['ids'])
+        if data['action'] != 'delete':
+            # Уже скрытые (или уже видимые) объекты не обрабатываются.
+            queryset = queryset.filter(is_hidden=data['action'] == 'unhide')
+        return queryset.order_by('pk')
+
+    def set_hidden(self, model, ids, hidden):
+        """
+        Скрывает или возвращает объекты одним UPDATE. Сигналы сохранения
+        при этом не отправляются, поэтому изменения и пересчёт рейтинга
+        произведений записываются в журнал здесь же.
+        """
+        model.objects.filter(pk__in=ids).update(is_hidden=hidden)
+        objects = model.objects.filter(pk__in=ids)
+        entries = ChangeLogEntry.for_objects(
+            objects, ChangeLogEntry.Action.UPDATED
+        )
+        if model is Review:
+            if hidden:
+                forget_parents(Review, [
+                    (entry.object_id, entry.title_id) for entry in entries
+                ])
+            title_ids = {entry.title_id for entry in entries}
+            Title.refresh_rating(title_ids)
+            entries += [
+                title_updated_entry(title_id) for title_id in title_ids
+            ]
+        ChangeLogEntry.objects.bulk_create(entries)
+
+    def delete_batch(self, model, ids):
+        """
+        Удаляет объекты и комментарии удаляемых отзывов. Сигналы удаления
+        не пишут журнал и не пересчитывают рейтинг (mute_changelog):
+        записи журнала и пересчёт рейтинга выполняются здесь же, одним
+        запросом на пачку. Возвращает счётчик удалённых объектов по
+        моделям.
+        """
+        comments = Comment.objects.select_related('review').only(
+            'review__title_id'
+        )
+        if model is Review:
+            reviews = list(Review.objects.filter(pk__in=ids).only('title_id'))
+            comments = list(comments.filter(review_id__in=ids))
+        else:
+            reviews = []
+            comments = list(comments.filter(pk__in=ids))
+        entries = []
+        deleted = Counter()
+        with mute_changelog():
+            for deleted_model, objects in (
+                (Comment, comments), (Review, reviews)
+            ):
+                entries += ChangeLogEntry.for_objects(
+                    objects, ChangeLogEntry.Action.DELETED
+                )
+                if objects:
+                    deleted.update(deleted_model.objects.filter(
+                        pk__in=[obj.pk for obj in objects]
+                    ).delete()[1])
+        title_ids = {review.title_id for review in reviews}
+        if title_ids:
+            Title.refresh_rating(title_ids)
+            entries += [
+                title_updated_entry(title_id) for title_id in title_ids
+            ]
+        ChangeLogEntry.objects.bulk_create(entries)
+        return deleted
+
+    def moderate(self, model, queryset, action):
+        """
+        Обрабатывает объекты пачками по MODERATION_BATCH_SIZE, каждую
+        в своей транзакции. Возвращает число объектов, пачек и счётчик
+        удалённых объектов по моделям.
+        """
+        processed, batches, deleted = 0, 0, Counter()
+        while True:
+            ids = list(
+                queryset.values_list('pk', flat=True)[:MODERATION_BATCH_SIZE]
+            )
+            if not ids:
+                break
+            with transaction.atomic(using=router.db_for_write(model)):
+                if action == 'delete':
+                    deleted.update(self.delete_batch(model, ids))
+                else:
+                    self.set_hidden(model, ids, action == 'hide')
+            processed += len(ids)
+            batches += 1
+        return processed, batches, deleted
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        model, _ = self.targets[data['target']]
+        queryset = self.get_moderated_queryset(data)
+        summary = {'target': data['target'], 'action': data['action']}
+        # При шардах каждый шард обрабатывается параллельно.
+        shards = (
+            [shard_for(data['title'])] if 'title' in data else get_shards()
+        )
+        if data['dry_run']:
+            return Response({**summary, 'matched': sum(fan_out(
+                lambda alias: queryset.using(alias).count(), shards
+            ))})
+        processed, batches, deleted = 0, 0, Counter()
+        for shard_processed, shard_batches, shard_deleted in fan_out(
+            lambda alias: self.moderate(
+                model, queryset.using(alias), data['action']
+            ),
+            shards,
+        ):
+            processed += shard_processed
+            batches += shard_batches
+            deleted.update(shard_deleted)
+        summary.update(processed=processed, batches=batches)
+        if data['action'] == 'delete':
+            summary['deleted'] = {
+                label.split('.')[-1].lower(): count
+                for label, count in deleted.items()
+            }
+        return Response(summary)
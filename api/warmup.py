@@ -0,0 +1,142 @@
+"""
+Прогрев воркера до приёма запросов.
+
+Для gunicorn подключается в конфигурации сервера:
+
+    from api.warmup import post_fork  # noqa: F401
+
+Вручную и для замера — командой `python manage.py warmup`.
+"""
+import inspect
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import URLResolver, get_resolver
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from api import serializers
+from api.autocomplete import get_index
+from api.catalogue import get_catalogue
+from api.shared_state import get_connection
+
+
+def compile_routes(resolver=None):
+    """
+    Компилирует регулярные выражения всех маршрутов и заполняет
+    словари обратного разрешения. Возвращает число маршрутов.
+    """
+    if resolver is None:
+        resolver = get_resolver()
+        resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += compile_routes(pattern)
+            pattern.reverse_dict
+        else:
+            count += 1
+    return count
+
+
+def build_fields(serializer):
+    """Строит поля сериализатора и вложенных сериализаторов."""
+    serializer = getattr(serializer, 'child', serializer)
+    count = 1
+    for field in serializer.fields.values():
+        if isinstance(field, BaseSerializer):
+            count += build_fields(field)
+    return count
+
+
+def build_serializers():
+    """Создаёт экземпляр каждого сериализатора API и строит его поля."""
+    return sum(
+        build_fields(serializer_class(context={}))
+        for _, serializer_class in inspect.getmembers(
+            serializers, inspect.isclass
+        )
+        if issubclass(serializer_class, BaseSerializer)
+        and not issubclass(serializer_class, ListSerializer)
+        and serializer_class.__module__ == serializers.__name__
+    )
+
+
+def open_connections():
+    """
+    Открывает соединения со всеми базами данных и с общим файлом
+    состояния процессов.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    try:
+        get_connection()
+    except sqlite3.Error:
+        pass
+    return len(connections.all()) + 1
+
+
+def load_catalogue():
+    """Загружает справочники в кэш процесса."""
+    return len(get_catalogue())
+
+
+def build_autocomplete():
+    """Строит индекс автодополнения названий."""
+    return len(get_index().titles)
+
+
+def prime_paths():
+    """
+    Выполняет запросы WARMUP_PATHS через всю цепочку middleware,
+    представлений и рендереров.
+    """
+    client = Client(REMOTE_ADDR='warmup')
+    for path in settings.WARMUP_PATHS:
+        client.get(path)
+    return len(settings.WARMUP_PATHS)
+
+
+STEPS = (
+    ('Маршруты', compile_routes),
+    ('Сериализаторы', build_serializers),
+    ('Соединения', open_connections),
+    ('Справочники', load_catalogue),
+    ('Автодополнение', build_autocomplete),
+    ('Запросы', prime_paths),
+)
+
+
+def warm_up():
+    """
+    Прогревает процесс. Возвращает список (шаг, число объектов, секунды)
+    и общее время прогрева.
+    """
+    report = []
+    started = time.perf_counter()
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        count = step()
+        report.append((name, count, time.perf_counter() - step_started))
+    return report, time.perf_counter() - started
+
+
+def post_fork(server, worker):
+    """Хук gunicorn: прогрев каждого воркера после fork."""
+    # Соединения, унаследованные от мастер-процесса, не переиспользуются.
+    connections.close_all()
+    report, elapsed = warm_up()
+    server.log.info(
+        'Воркер %s прогрет за %.0f мс: %s',
+        worker.pid,
+        elapsed * 1000,
+        ', '.join(
+            f'{name.lower()} {count} ({seconds * 1000:.0f} мс)'
+            for name, count, seconds in report
+        ),
+    )
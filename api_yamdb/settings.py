@@ -1,3 +1,5 @@
+import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -24,12 +26,16 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'user.apps.UserConfig',
     'reviews.apps.ReviewsConfig',
+    'api.apps.ApiConfig',
     'rest_framework',
     'django_filters',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.LoadSheddingMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.SingleFlightMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,6 +75,21 @@ DATABASES = {
     }
 }
 
+# Шарды отзывов и комментариев (reviews.sharding): REVIEW_SHARDS=N
+# добавляет N баз, схема каждой создаётся командой
+# python manage.py migrate --database=reviews_<номер>.
+REVIEW_SHARDS = tuple(
+    f'reviews_{index}'
+    for index in range(int(os.environ.get('REVIEW_SHARDS', 0)))
+)
+for alias in REVIEW_SHARDS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db_{alias}.sqlite3',
+    }
+DATABASE_ROUTERS = ('reviews.sharding.ShardRouter',)
+SHARD_ID_SPAN = 10 ** 12
+
 
 # Password validation
 
@@ -116,6 +137,30 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'api.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS': (
+        'api.renderers.AvailableContentNegotiation'
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.ReadRateThrottle',
+        'api.throttling.WriteRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': '10/hour',
+        'token': '30/hour',
+        'write': '60/min',
+        'read': '600/min',
+    },
 }
 
 SIMPLE_JWT = {
@@ -130,3 +175,118 @@ EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 EMAIL_FROM = 'yamdb_registration@yandex.ru'
 
 CSV_DATA_DIR = BASE_DIR / 'static/data'
+
+CHANGELOG_RETENTION_DAYS = 30
+
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Поток событий отзывов и комментариев (только под ASGI).
+SSE_POLL_INTERVAL = 1
+SSE_READ_THREADS = 4
+SSE_HEARTBEAT_INTERVAL = 15
+SSE_QUEUE_SIZE = 100
+SSE_BATCH_SIZE = 500
+SSE_REPLAY_BATCH_SIZE = 500
+
+# Общее для процессов-воркеров состояние: корзины токенов ограничителя
+# частоты запросов, нагрузка воркеров и счётчики объединения запросов.
+SHARED_STATE_PATH = Path(tempfile.gettempdir()) / 'api_yamdb_state.sqlite3'
+SHARED_STATE_TIMEOUT = 1
+THROTTLE_PURGE_INTERVAL = 300
+THROTTLE_BUCKET_MAX_AGE = 86400
+# Запас токенов ограничителя в процессе (api.throttling.TokenLeases).
+THROTTLE_LEASE_TTL = 1
+THROTTLE_LEASE_SIZE = 10
+THROTTLE_LEASE_MAX_KEYS = 10000
+
+# Сброс нагрузки: ранний отказ 429/503 при перегрузке процесса.
+LOAD_SHEDDING_PATH_PREFIX = '/api/'
+LOAD_SHEDDING_MAX_INFLIGHT = 64
+LOAD_SHEDDING_MAX_LATENCY_MS = 2000
+LOAD_SHEDDING_LATENCY_ALPHA = 0.2
+LOAD_SHEDDING_LATENCY_HALF_LIFE = 10
+# Предел одного замера времени ответа: отказ 503 вызывают только
+# несколько долгих ответов подряд.
+LOAD_SHEDDING_SAMPLE_MAX_MS = 4000
+LOAD_SHEDDING_RETRY_AFTER = 1
+LOAD_REPORT_INTERVAL = 1
+LOAD_REPORT_MAX_AGE = 10
+
+# Объединение одинаковых одновременных анонимных GET-запросов в воркере.
+SINGLE_FLIGHT = os.environ.get('SINGLE_FLIGHT') == '1'
+SINGLE_FLIGHT_PATH_PREFIX = '/api/'
+SINGLE_FLIGHT_TIMEOUT = 5
+SINGLE_FLIGHT_STATS_MAX_AGE = 86400
+
+# Прогрев воркера (api.warmup): запросы через всю цепочку обработки.
+WARMUP_PATHS = (
+    '/api/v1/titles/',
+    '/api/v1/titles/?include=reviews',
+    '/api/v1/categories/',
+    '/api/v1/genres/',
+)
+
+# Админка: число строк, дальше которого списки не пересчитываются.
+ADMIN_COUNT_LIMIT = 10000
+
+# Вложенные маршруты: сколько секунд помнить, что родитель существует.
+PARENT_CACHE_TTL = 5
+
+# Автодополнение названий (api.autocomplete): индекс в памяти процесса.
+# Объём ограничен числом произведений, слов и длиной ключа: не больше
+# AUTOCOMPLETE_MAX_TITLES * AUTOCOMPLETE_WORDS ключей по
+# AUTOCOMPLETE_KEY_LENGTH символов.
+AUTOCOMPLETE_MAX_TITLES = 100000
+AUTOCOMPLETE_WORDS = 4
+AUTOCOMPLETE_KEY_LENGTH = 64
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_MEMO_MIN_KEYS = 256
+AUTOCOMPLETE_SYNC_INTERVAL = 1
+AUTOCOMPLETE_SYNC_BATCH = 1000
+AUTOCOMPLETE_MAX_AGE = 3600
+
+# Снимки базы (core.snapshot): команды snapshot и restore.
+SNAPSHOT_PAGES_PER_STEP = 1024
+SNAPSHOT_STEP_SLEEP = 0.005
+SNAPSHOT_MAX_RESTARTS = 3
+SNAPSHOT_GZIP_LEVEL = 6
+
+# С TEST_SNAPSHOT тестовая база наполняется снимком вместо миграций.
+TEST_RUNNER = 'core.test_runner.SnapshotTestRunner'
+TEST_SNAPSHOT = os.environ.get('TEST_SNAPSHOT')
+
+# Планировщик задач обслуживания (core.scheduler, команда scheduler).
+# Задача: command и args команды manage.py, interval в секундах
+# и необязательные jitter (разброс интервала, доля), pool ('thread'
+# или 'process'), concurrency (одновременных запусков во всех
+# процессах), timeout в секундах (прерывается только пул process)
+# и pausable (откладывать под нагрузкой).
+SCHEDULER_JOBS = {
+    'purge_idempotency_keys': {
+        'command': 'purge_idempotency_keys',
+        'interval': 3600,
+    },
+    'compact_changelog': {
+        'command': 'compact_changelog',
+        'interval': 86400,
+    },
+    'rebuild_ratings': {
+        'command': 'rebuild_ratings',
+        'interval': 86400,
+        'pool': 'process',
+    },
+}
+SCHEDULER_WORKERS = 4
+SCHEDULER_JITTER = 0.1
+SCHEDULER_JOB_TIMEOUT = 3600
+SCHEDULER_LOCK_TTL = 60
+SCHEDULER_START_SPREAD = 10
+SCHEDULER_TICK = 1
+SCHEDULER_PAUSE_LATENCY_MS = 500
+SCHEDULER_PAUSE_RETRY = 30
+SCHEDULER_HISTORY_PER_JOB = 1000
@@ -0,0 +1,46 @@
+"""
+Облегчённый профиль воркеров, обслуживающих только API.
+
+Без админки, сессий, сообщений, CSRF, шаблонов и статики: запросы к API
+аутентифицируются JWT и отдаются в JSON или MessagePack. Админка и
+страница redoc обслуживаются отдельным пулом с api_yamdb.settings.
+Миграции выполняются с полным профилем.
+"""
+from api_yamdb.settings import *  # noqa: F401,F403
+from api_yamdb.settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'user.apps.UserConfig',
+    'reviews.apps.ReviewsConfig',
+    'api.apps.ApiConfig',
+    'rest_framework',
+    'django_filters',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'api.middleware.LoadSheddingMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.SingleFlightMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'api_yamdb.urls_api'
+
+WSGI_APPLICATION = 'api_yamdb.wsgi_api.application'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'api.renderers.MessagePackParser',
+    ),
+}
@@ -0,0 +1,6 @@
+"""URL-конфигурация облегчённого профиля: только API."""
+from django.urls import include, path
+
+urlpatterns = [
+    path('api/', include('api.urls')),
+]
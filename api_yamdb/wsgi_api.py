@@ -0,0 +1,14 @@
+"""
+WSGI config for YaMDb API-only workers.
+
+Serves only ``api.urls`` with the lean profile ``api_yamdb.settings_api``;
+admin and redoc are served by ``api_yamdb.wsgi`` on a separate pool.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings_api')
+
+application = get_wsgi_application()
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from user.search import filter_username
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Пагинатор, считающий строки не дальше ADMIN_COUNT_LIMIT: подсчёт
+    больших таблиц ограничен, страницы за пределом недоступны.
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list.order_by().values('pk')[
+            :settings.ADMIN_COUNT_LIMIT
+        ].count()
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр списка по введённому значению вместо перечня всех вариантов:
+    боковая панель не загружает связанные объекты. Значение сравнивается
+    с полем lookup.
+    """
+    template = 'admin/input_filter.html'
+    lookup = None
+    placeholder = ''
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'query_parts': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.parameter_name
+            ],
+            'placeholder': self.placeholder,
+        }
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            return queryset.filter(**{self.lookup: self.value()})
+        except (ValueError, ValidationError) as error:
+            raise IncorrectLookupParameters(error)
+
+
+class ScalableAdminMixin:
+    """
+    Списки админки для больших таблиц: ограниченный подсчёт строк и
+    поиск по индексам — по id и по имени пользователя в поле
+    username_search_field (для самой модели пользователя — None).
+    Вне SQLite поиск идёт по search_fields.
+    """
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    username_search_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if connection.vendor != 'sqlite':
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        for term in search_term.split():
+            users = filter_username(
+                get_user_model().objects.all(), term
+            ).values('pk')
+            field = self.username_search_field or 'pk'
+            condition = Q(**{f'{field}__in': users})
+            if term.isdigit():
+                condition |= Q(pk=term)
+            queryset = queryset.filter(condition)
+        return queryset, False
@@ -0,0 +1,270 @@
+"""
+Планировщик периодических задач обслуживания (команда scheduler).
+
+Задачи описываются в SCHEDULER_JOBS: команда manage.py с аргументами
+и интервал между запусками со случайным разбросом, чтобы задачи
+разных планировщиков не совпадали по времени. Задача пула thread
+выполняется в потоке планировщика, пула process — отдельным процессом
+manage.py, который можно прервать по timeout. Вывод задачи пула thread
+в историю попадает только через self.stdout команды, print() пишет
+в вывод планировщика.
+
+Одновременных запусков задачи во всех процессах не больше её
+concurrency: перед запуском занимается место в блокировке общего файла
+состояния (api.shared_state) на SCHEDULER_LOCK_TTL секунд, и пока
+задача выполняется, место продлевается. Место упавшего процесса
+освобождается через SCHEDULER_LOCK_TTL секунд.
+
+Пока сглаженное время ответа какого-либо воркера API выше
+SCHEDULER_PAUSE_LATENCY_MS, задачи с pausable откладываются
+на SCHEDULER_PAUSE_RETRY секунд.
+
+Запуски записываются в JobRun; по последнему из них после перезапуска
+планировщика отсчитывается следующий запуск задачи.
+"""
+import io
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections
+from django.utils import timezone
+
+from api.shared_state import (
+    acquire_job_lock,
+    get_workers_load,
+    release_job_lock,
+    renew_job_lock,
+)
+from reviews.constants import JOB_OUTPUT_MAX_LENGTH
+from reviews.models import JobRun
+
+POOLS = ('thread', 'process')
+
+
+class Job:
+    """Периодическая задача из SCHEDULER_JOBS."""
+
+    def __init__(
+        self, name, command, interval, args=(), jitter=None, pool='thread',
+        concurrency=1, timeout=None, pausable=True,
+    ):
+        if pool not in POOLS:
+            raise ImproperlyConfigured(
+                f'Задача {name}: пул должен быть одним из {POOLS}.'
+            )
+        self.name = name
+        self.command = command
+        self.args = tuple(args)
+        self.interval = interval
+        self.jitter = settings.SCHEDULER_JITTER if jitter is None else jitter
+        self.pool = pool
+        self.concurrency = concurrency
+        self.timeout = timeout or settings.SCHEDULER_JOB_TIMEOUT
+        self.pausable = pausable
+
+    def __str__(self):
+        return self.name
+
+    def next_delay(self):
+        """Интервал до следующего запуска с разбросом ±jitter."""
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def get_jobs(names=None):
+    """Задачи из SCHEDULER_JOBS: все или только с именами names."""
+    jobs = {
+        name: Job(name, **config)
+        for name, config in settings.SCHEDULER_JOBS.items()
+    }
+    if not names:
+        return list(jobs.values())
+    unknown = set(names) - jobs.keys()
+    if unknown:
+        raise KeyError(', '.join(sorted(unknown)))
+    return [jobs[name] for name in names]
+
+
+def workers_overloaded():
+    """Время ответа какого-либо воркера API выше порога паузы задач."""
+    try:
+        loads = get_workers_load()
+    except sqlite3.Error:
+        return False
+    return any(
+        load['latency_ms'] > settings.SCHEDULER_PAUSE_LATENCY_MS
+        for load in loads
+    )
+
+
+def execute(job):
+    """Выполняет команду задачи. Возвращает статус и вывод."""
+    if job.pool == 'process':
+        try:
+            result = subprocess.run(
+                [
+                    sys.executable, str(settings.BASE_DIR / 'manage.py'),
+                    job.command, *job.args,
+                ],
+                capture_output=True,
+                text=True,
+                timeout=job.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return JobRun.Status.TIMED_OUT, ''
+        status = (
+            JobRun.Status.FAILED if result.returncode
+            else JobRun.Status.SUCCEEDED
+        )
+        return status, result.stdout + result.stderr
+    output = io.StringIO()
+    try:
+        call_command(job.command, *job.args, stdout=output, stderr=output)
+    except Exception:
+        output.write(traceback.format_exc())
+        return JobRun.Status.FAILED, output.getvalue()
+    return JobRun.Status.SUCCEEDED, output.getvalue()
+
+
+def run_job(job):
+    """
+    Запускает задачу, если в блокировке есть свободное место, и
+    записывает запуск в историю. Возвращает JobRun или None, если
+    места нет.
+    """
+    slot = acquire_job_lock(
+        job.name, job.concurrency, settings.SCHEDULER_LOCK_TTL
+    )
+    if slot is None:
+        return None
+    finished = threading.Event()
+    heartbeat = threading.Thread(
+        target=hold_job_lock, args=(job.name, slot, finished), daemon=True
+    )
+    heartbeat.start()
+    try:
+        run = JobRun.objects.create(job=job.name, pid=os.getpid())
+        started = time.perf_counter()
+        run.status, output = execute(job)
+        run.duration = time.perf_counter() - started
+        run.finished_at = timezone.now()
+        run.output = output[-JOB_OUTPUT_MAX_LENGTH:]
+        run.save(
+            update_fields=('status', 'duration', 'finished_at', 'output')
+        )
+        trim_history(job.name)
+        return run
+    finally:
+        finished.set()
+        heartbeat.join()
+        release_job_lock(job.name, slot)
+
+
+def hold_job_lock(name, slot, finished):
+    """Продлевает место задачи в блокировке, пока не установлен finished."""
+    while not finished.wait(settings.SCHEDULER_LOCK_TTL / 3):
+        try:
+            renew_job_lock(name, slot, settings.SCHEDULER_LOCK_TTL)
+        except sqlite3.Error:
+            pass
+
+
+def trim_history(name):
+    """Оставляет SCHEDULER_HISTORY_PER_JOB последних запусков задачи."""
+    boundary = JobRun.objects.filter(job=name).values_list(
+        'id', flat=True
+    )[settings.SCHEDULER_HISTORY_PER_JOB:][:1]
+    if boundary:
+        JobRun.objects.filter(job=name, id__lte=boundary[0]).delete()
+
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+def run_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        connections.close_all()
+
+
+class Scheduler:
+    """Запускает задачи по расписанию в пуле из workers потоков."""
+
+    def __init__(self, jobs, workers, log=print):
+        self.jobs = jobs
+        self.log = log
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.running = Counter()
+        self.stopping = threading.Event()
+        self.due = {job.name: self.first_due(job) for job in jobs}
+
+    def first_due(self, job):
+        last = JobRun.objects.filter(job=job.name).values_list(
+            'started_at', flat=True
+        ).first()
+        now = time.time()
+        if last is None:
+            return now + random.uniform(0, settings.SCHEDULER_START_SPREAD)
+        return max(now, last.timestamp() + job.next_delay())
+
+    def run(self):
+        """Работает до вызова stop(), затем дожидается запущенных задач."""
+        for job in self.jobs:
+            self.log(
+                f'{job}: следующий запуск {format_time(self.due[job.name])}.'
+            )
+        while not self.stopping.is_set():
+            now = time.time()
+            for job in self.jobs:
+                if self.due[job.name] <= now:
+                    self.start(job, now)
+            wait = min(self.due.values()) - time.time()
+            self.stopping.wait(min(settings.SCHEDULER_TICK, max(0, wait)))
+        self.log('Остановка: ожидание запущенных задач.')
+        self.executor.shutdown(wait=True)
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def start(self, job, now):
+        with self.lock:
+            if self.running[job.name] >= job.concurrency:
+                return
+        if job.pausable and workers_overloaded():
+            self.due[job.name] = now + settings.SCHEDULER_PAUSE_RETRY
+            self.log(f'{job}: воркеры перегружены, запуск отложен.')
+            return
+        self.due[job.name] = now + job.next_delay()
+        with self.lock:
+            self.running[job.name] += 1
+        self.executor.submit(run_in_thread, job).add_done_callback(
+            lambda future: self.finished(job, future)
+        )
+
+    def finished(self, job, future):
+        with self.lock:
+            self.running[job.name] -= 1
+        if future.exception() is not None:
+            self.log(f'{job}: ошибка планировщика: {future.exception()!r}')
+            return
+        run = future.result()
+        if run is None:
+            self.log(f'{job}: уже выполняется в другом процессе.')
+            return
+        self.log(
+            f'{job}: {run.get_status_display().lower()} '
+            f'за {run.duration:.2f} с.'
+        )
@@ -0,0 +1,146 @@
+"""
+Снимки базы SQLite через online backup API (sqlite3.Connection.backup).
+
+Снимок копирует базу постранично, по pages страниц за шаг с паузой
+sleep между шагами, и не держит блокировку базы между шагами. В режиме
+WAL копирование идёт внутри читающей транзакции: снимок согласован
+на момент её начала, а писатели не ждут. В других режимах журнала
+запись в базу во время копирования перезапускает его с начала; после
+max_restarts перезапусков оставшееся копируется за один шаг, на время
+которого запись в базу ждёт.
+
+Снимок с суффиксом .gz сжимается gzip. Восстановление копирует снимок
+в базу целиком за один шаг.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+COMPRESSED_SUFFIX = '.gz'
+
+
+def is_compressed(path):
+    return str(path).endswith(COMPRESSED_SUFFIX)
+
+
+def get_database_path(connection):
+    """Путь к файлу базы соединения Django; None для базы в памяти."""
+    if connection.vendor != 'sqlite':
+        return None
+    name = str(connection.settings_dict['NAME'])
+    if connection.is_in_memory_db() or not os.path.exists(name):
+        return None
+    return name
+
+
+class BackupRestarted(Exception):
+    """Постраничное копирование перезапускалось слишком часто."""
+
+
+def watch_restarts(progress, max_restarts):
+    """
+    Обёртка progress для source.backup(), прерывающая копирование
+    исключением BackupRestarted после max_restarts перезапусков.
+    """
+    restarts = 0
+    last_remaining = None
+
+    def watch(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if progress is not None:
+            progress(status, remaining, total)
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise BackupRestarted
+        last_remaining = remaining
+
+    return watch
+
+
+def take_snapshot(
+    database_path, path, pages, sleep, progress=None, max_restarts=None,
+):
+    """
+    Копирует базу database_path в файл path. Файл заменяется только
+    после успешного копирования. Возвращает размер снимка в байтах.
+    """
+    if max_restarts is None:
+        max_restarts = settings.SNAPSHOT_MAX_RESTARTS
+    copy_path = f'{path}.{os.getpid()}.partial'
+    result_path = copy_path
+    try:
+        source = sqlite3.connect(
+            f'file:{database_path}?mode=ro', uri=True, isolation_level=None
+        )
+        target = sqlite3.connect(copy_path)
+        try:
+            mode = source.execute('PRAGMA journal_mode').fetchone()[0]
+            if mode == 'wal':
+                source.execute('BEGIN')
+                source.execute('SELECT count(*) FROM sqlite_master')
+                source.backup(
+                    target, pages=pages, sleep=sleep, progress=progress
+                )
+            else:
+                try:
+                    source.backup(
+                        target,
+                        pages=pages,
+                        sleep=sleep,
+                        progress=watch_restarts(progress, max_restarts),
+                    )
+                except BackupRestarted:
+                    source.backup(target, progress=progress)
+        finally:
+            target.close()
+            source.close()
+        if is_compressed(path):
+            result_path = f'{copy_path}{COMPRESSED_SUFFIX}'
+            with open(copy_path, 'rb') as raw, gzip.open(
+                result_path, 'wb', compresslevel=settings.SNAPSHOT_GZIP_LEVEL
+            ) as compressed:
+                shutil.copyfileobj(raw, compressed)
+        os.replace(result_path, path)
+    finally:
+        for temporary in (copy_path, result_path):
+            if os.path.exists(temporary):
+                os.remove(temporary)
+    return os.path.getsize(path)
+
+
+@contextmanager
+def open_snapshot(path):
+    """Соединение только для чтения со снимком, сжатый распаковывается."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    unpacked_path = None
+    try:
+        if is_compressed(path):
+            fd, unpacked_path = tempfile.mkstemp(suffix='.sqlite3')
+            with os.fdopen(fd, 'wb') as unpacked, gzip.open(
+                path, 'rb'
+            ) as compressed:
+                shutil.copyfileobj(compressed, unpacked)
+        snapshot = sqlite3.connect(
+            f'file:{unpacked_path or path}?mode=ro', uri=True
+        )
+        try:
+            yield snapshot
+        finally:
+            snapshot.close()
+    finally:
+        if unpacked_path is not None:
+            os.remove(unpacked_path)
+
+
+def restore_snapshot(connection, path):
+    """Заменяет содержимое базы соединения Django снимком path."""
+    with open_snapshot(path) as snapshot:
+        connection.ensure_connection()
+        snapshot.backup(connection.connection)
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+
+from core.snapshot import restore_snapshot
+
+
+class SnapshotTestRunner(DiscoverRunner):
+    """
+    Если задан TEST_SNAPSHOT, тестовая база default наполняется
+    снимком (python manage.py snapshot) вместо миграций с нуля:
+    применяются только миграции, которых в снимке ещё нет. Остальные
+    базы (шарды отзывов) создаются как обычно.
+    """
+
+    def setup_databases(self, **kwargs):
+        if not settings.TEST_SNAPSHOT:
+            return super().setup_databases(**kwargs)
+        old_config = []
+        for alias in kwargs.get('aliases') or connections:
+            connection = connections[alias]
+            old_config.append(
+                (connection, connection.settings_dict['NAME'], True)
+            )
+            serialize = connection.settings_dict['TEST'].get('SERIALIZE', True)
+            if alias == DEFAULT_DB_ALIAS:
+                self.create_test_db(connection, serialize)
+            else:
+                connection.creation.create_test_db(
+                    verbosity=self.verbosity,
+                    autoclobber=not self.interactive,
+                    keepdb=self.keepdb,
+                    serialize=serialize,
+                )
+            for index in range(self.parallel if self.parallel > 1 else 0):
+                connection.creation.clone_test_db(
+                    suffix=str(index + 1),
+                    verbosity=self.verbosity,
+                    keepdb=self.keepdb,
+                )
+        return old_config
+
+    def create_test_db(self, connection, serialize):
+        """
+        Таблицы тестовой базы создаются без миграций и заменяются
+        снимком, затем повторный create_test_db с keepdb применяет
+        недостающие миграции и сериализует базу для TransactionTestCase.
+        """
+        test_settings = connection.settings_dict['TEST']
+        migrate = test_settings['MIGRATE']
+        test_settings['MIGRATE'] = False
+        try:
+            connection.creation.create_test_db(
+                verbosity=self.verbosity,
+                autoclobber=not self.interactive,
+                keepdb=self.keepdb,
+                serialize=False,
+            )
+        finally:
+            test_settings['MIGRATE'] = migrate
+        restore_snapshot(connection, settings.TEST_SNAPSHOT)
+        connection.creation.create_test_db(
+            verbosity=0, keepdb=True, serialize=serialize
+        )
@@ -1,6 +1,72 @@
 from django.contrib import admin
 
-from reviews.models import Category, Genre, Title, Comment, Review
+from core.admin import InputFilter, ScalableAdminMixin
+from reviews.constants import SCORE_MAX_VALUE, SCORE_MIN_VALUE
+from reviews.models import Category, Genre, JobRun, Title, Comment, Review
+from reviews.sharding import is_sharded
+
+
+class AuthorFilter(InputFilter):
+    title = 'Автор'
+    parameter_name = 'author'
+    lookup = 'author__username'
+    placeholder = 'username'
+
+
+class TitleFilter(InputFilter):
+    title = 'Произведение'
+    parameter_name = 'title'
+    lookup = 'title_id'
+    placeholder = 'id'
+
+
+class ReviewFilter(InputFilter):
+    title = 'Отзыв'
+    parameter_name = 'review'
+    lookup = 'review_id'
+    placeholder = 'id'
+
+
+class ScoreFilter(admin.SimpleListFilter):
+    """Оценки без запроса SELECT DISTINCT по всем отзывам."""
+    title = 'Оценка'
+    parameter_name = 'score'
+
+    def lookups(self, request, model_admin):
+        return [
+            (score, score)
+            for score in range(SCORE_MIN_VALUE, SCORE_MAX_VALUE + 1)
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() in dict(self.lookup_choices):
+            return queryset.filter(score=self.value())
+        return queryset
+
+
+class UnshardedAdminMixin:
+    """
+    Админка читает только default: при шардах (см. reviews.sharding)
+    отзывы и комментарии в ней недоступны, а не показываются пустыми.
+    """
+
+    def has_view_permission(self, request, obj=None):
+        return not is_sharded() and super().has_view_permission(request, obj)
+
+    def has_add_permission(self, request):
+        return not is_sharded() and super().has_add_permission(request)
+
+    def has_change_permission(self, request, obj=None):
+        return (
+            not is_sharded()
+            and super().has_change_permission(request, obj)
+        )
+
+    def has_delete_permission(self, request, obj=None):
+        return (
+            not is_sharded()
+            and super().has_delete_permission(request, obj)
+        )
 
 
 @admin.register(Category)
@@ -12,6 +78,7 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Title)
 class TitleAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'year', 'description', 'category')
+    list_select_related = ('category',)
     search_fields = ('name',)
 
 
@@ -22,14 +89,41 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(
+    UnshardedAdminMixin, ScalableAdminMixin, admin.ModelAdmin
+):
     list_display = ('pk', 'text', 'score', 'title', 'author', 'pub_date', )
-    search_fields = ('text', 'author', )
-    list_filter = ('pub_date', 'score', 'author', 'title', )
+    list_select_related = ('title', 'author', )
+    search_fields = ('=author__username', )
+    username_search_field = 'author'
+    list_filter = ('pub_date', ScoreFilter, AuthorFilter, TitleFilter, )
+    autocomplete_fields = ('title', 'author', )
+    ordering = ('-pk', )
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(
+    UnshardedAdminMixin, ScalableAdminMixin, admin.ModelAdmin
+):
     list_display = ('pk', 'text', 'review', 'author', 'pub_date', )
-    search_fields = ('text', 'author', )
-    list_filter = ('pub_date', 'author', )
+    list_select_related = ('review__title', 'author', )
+    search_fields = ('=author__username', )
+    username_search_field = 'author'
+    list_filter = ('pub_date', AuthorFilter, ReviewFilter, )
+    autocomplete_fields = ('review', 'author', )
+    ordering = ('-pk', )
+
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    """История запусков планировщика только для просмотра."""
+    list_display = (
+        'pk', 'job', 'status', 'started_at', 'duration', 'pid', )
+    list_filter = ('job', 'status', )
+    ordering = ('-pk', )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -5,3 +5,11 @@ COMMENT_TEXT_MAX_LENGTH = 500
 SCORE_MIN_VALUE = 1
 SCORE_MAX_VALUE = 10
 COMMENT_STR_MAX_LENGTH = 50
+CHANGELOG_OBJECT_TYPE_MAX_LENGTH = 16
+CHANGELOG_ACTION_MAX_LENGTH = 16
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_FINGERPRINT_LENGTH = 64
+RATING_UPDATE_BATCH_SIZE = 500
+JOB_NAME_MAX_LENGTH = 64
+JOB_STATUS_MAX_LENGTH = 16
+JOB_OUTPUT_MAX_LENGTH = 10000
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from api.autocomplete import get_index
+
+
+class Command(BaseCommand):
+    """Для оценки объёма и скорости индекса автодополнения."""
+    help = (
+        'Строит индекс автодополнения названий, как воркер, и печатает '
+        'его размер в памяти и время поиска по запросам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queries',
+            nargs='*',
+            help='Запросы для замера времени поиска.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        started = time.perf_counter()
+        index = get_index()
+        elapsed = time.perf_counter() - started
+        stats = index.stats()
+        print(
+            f'Произведений: {stats["titles"]} из {stats["max_titles"]}, '
+            f'ключей: {stats["keys"]}, вытеснено: {stats["evicted"]}.'
+        )
+        print(
+            f'Память: {stats["memory"] / 1024:.1f} КиБ, '
+            f'построение: {elapsed * 1000:.1f} мс.'
+        )
+        for query in options['queries']:
+            started = time.perf_counter()
+            suggestions = index.search(
+                query, settings.AUTOCOMPLETE_MAX_LIMIT
+            )
+            elapsed = time.perf_counter() - started
+            print(
+                f'{query!r}: {len(suggestions)} подсказок '
+                f'за {elapsed * 1000:.3f} мс'
+            )
@@ -0,0 +1,133 @@
+import asyncio
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+
+from reviews.models import Title
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    """Для сравнения пропускной способности пути чтения под WSGI и ASGI."""
+    help = (
+        'Нагружает списки произведений и отзывов параллельными запросами '
+        'под WSGI и ASGI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Потоков WSGI-воркера (как у gunicorn --threads).',
+        )
+        parser.add_argument(
+            '--query-latency',
+            type=float,
+            default=0.0,
+            help='Искусственная задержка каждого SQL-запроса, мс '
+                 '(имитация сетевой базы данных).',
+        )
+        parser.add_argument('--mode', choices=MODES, help='Служебный.')
+
+    def handle(self, *args, **options) -> None:
+        if options['mode']:
+            self.run_mode(options)
+            return
+        print(
+            f'Запросов: {options["requests"]}, '
+            f'одновременных клиентов: {options["concurrency"]}, '
+            f'задержка запроса к БД: {options["query_latency"]} мс.'
+        )
+        for mode in MODES:
+            result = subprocess.run(
+                [
+                    sys.executable, sys.argv[0], 'benchmark_read_path',
+                    '--mode', mode,
+                    '--requests', str(options['requests']),
+                    '--concurrency', str(options['concurrency']),
+                    '--threads', str(options['threads']),
+                    '--query-latency', str(options['query_latency']),
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                raise CommandError(result.stderr)
+            print(result.stdout.strip())
+
+    def get_paths(self):
+        title = Title.objects.order_by('pk').first()
+        if title is None:
+            raise CommandError(
+                'Нет произведений: загрузите данные load_data_from_csv.'
+            )
+        return ('/api/v1/titles/', f'/api/v1/titles/{title.pk}/reviews/')
+
+    def client_address(self, index):
+        """Адрес клиента: ограничитель частоты считает запросы по IP."""
+        return f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}'
+
+    @override_settings(
+        LOAD_SHEDDING_MAX_INFLIGHT=10 ** 6,
+        LOAD_SHEDDING_MAX_LATENCY_MS=10 ** 6,
+    )
+    def run_mode(self, options):
+        paths = self.get_paths()
+        if options['query_latency']:
+            self.add_query_latency(options['query_latency'] / 1000)
+        total = options['requests']
+        if options['mode'] == 'wsgi':
+            elapsed = self.run_wsgi(paths, total, options['threads'])
+        else:
+            elapsed = asyncio.run(
+                self.run_asgi(paths, total, options['concurrency'])
+            )
+        print(
+            f'{options["mode"]:>10}: {total / elapsed:8.1f} запр/с '
+            f'({elapsed:.2f} с)'
+        )
+
+    def add_query_latency(self, latency):
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_wrapper(sender, connection, **kwargs):
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        connection_created.connect(add_wrapper, weak=False)
+
+    def run_wsgi(self, paths, total, threads):
+        def get(index):
+            response = Client(REMOTE_ADDR=self.client_address(index)).get(
+                paths[index % len(paths)]
+            )
+            assert response.status_code == 200, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(get, range(total)))
+        return time.perf_counter() - started
+
+    async def run_asgi(self, paths, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get(index):
+            client = AsyncClient(client=(self.client_address(index), 0))
+            async with semaphore:
+                response = await client.get(paths[index % len(paths)])
+            assert response.status_code == 200, response.status_code
+
+        started = time.perf_counter()
+        await asyncio.gather(*(get(index) for index in range(total)))
+        return time.perf_counter() - started
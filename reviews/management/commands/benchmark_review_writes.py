@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Title
+from reviews.sharding import get_shards
+from user.models import User
+
+USERNAME_PREFIX = 'benchmark_writer_'
+# Меньше ставки write: автор не упирается в ограничение частоты.
+REVIEWS_PER_AUTHOR = 50
+
+
+class Command(BaseCommand):
+    """Для оценки пропускной способности записи отзывов по шардам."""
+    help = (
+        'Создаёт отзывы через API параллельными запросами и печатает '
+        'число записанных отзывов в секунду. Сравните запуски с разным '
+        'REVIEW_SHARDS. Созданные пользователи и отзывы удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviews', type=int, default=1000)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Одновременных запросов на запись.',
+        )
+
+    @override_settings(
+        LOAD_SHEDDING_MAX_INFLIGHT=10 ** 6,
+        LOAD_SHEDDING_MAX_LATENCY_MS=10 ** 6,
+    )
+    def handle(self, *args, **options) -> None:
+        title_ids = list(
+            Title.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if not title_ids:
+            raise CommandError(
+                'Нет произведений: загрузите данные load_data_from_csv.'
+            )
+        per_author = min(len(title_ids), REVIEWS_PER_AUTHOR)
+        authors = self.create_authors(-(-options['reviews'] // per_author))
+        tasks = [
+            (author, title_id)
+            for author in authors
+            for title_id in title_ids[:per_author]
+        ][:options['reviews']]
+        try:
+            elapsed = self.run(tasks, authors, options['threads'])
+        finally:
+            User.objects.filter(pk__in=authors).delete()
+        print(
+            f'Шардов: {len(get_shards())}, потоков: {options["threads"]}, '
+            f'отзывов: {len(tasks)}.'
+        )
+        print(
+            f'{len(tasks) / elapsed:.1f} отзывов/с ({elapsed:.2f} с)'
+        )
+
+    def create_authors(self, count):
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        User.objects.bulk_create(
+            User(
+                username=f'{USERNAME_PREFIX}{index}',
+                email=f'{USERNAME_PREFIX}{index}@example.com',
+            )
+            for index in range(count)
+        )
+        return {
+            user.pk: f'Bearer {AccessToken.for_user(user)}'
+            for user in User.objects.filter(
+                username__startswith=USERNAME_PREFIX
+            )
+        }
+
+    def run(self, tasks, authors, threads):
+        def post(task):
+            author, title_id = task
+            response = Client().post(
+                f'/api/v1/titles/{title_id}/reviews/',
+                {'text': 'benchmark', 'score': 5},
+                content_type='application/json',
+                HTTP_AUTHORIZATION=authors[author],
+            )
+            assert response.status_code == 201, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(post, tasks))
+        return time.perf_counter() - started
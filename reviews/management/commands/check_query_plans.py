@@ -0,0 +1,112 @@
+import re
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment
+
+# Справочники из десятков строк читаются целиком, и полный проход
+# по ним дешевле любого индекса.
+# subquery — проход по уже отобранным строкам при подсчёте для пагинации.
+SCAN_ALLOWED = ('reviews_category', 'reviews_genre', 'subquery')
+
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! USING)')
+
+
+class Command(BaseCommand):
+    """Для проверки, что горячие запросы API используют индексы."""
+    help = (
+        'Выполняет основные запросы чтения API и проверяет планы '
+        'их SQL-запросов (EXPLAIN QUERY PLAN) на полный просмотр таблиц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать планы всех запросов.',
+        )
+
+    def get_paths(self):
+        comment = Comment.objects.select_related('review').order_by(
+            'pk'
+        ).first()
+        if comment is None:
+            raise CommandError(
+                'Нет данных: выполните python manage.py load_data_from_csv.'
+            )
+        review = comment.review
+        title = f'/api/v1/titles/{review.title_id}/'
+        reviews = f'{title}reviews/'
+        return (
+            '/api/v1/titles/',
+            '/api/v1/titles/?name=Title',
+            '/api/v1/titles/?genre=DRAMA',
+            '/api/v1/titles/?category=Movie',
+            '/api/v1/titles/?year=1994',
+            '/api/v1/titles/?ordering=-rating',
+            '/api/v1/titles/?rating_min=5&rating_max=9',
+            '/api/v1/titles/?category=Movie&ordering=-rating',
+            '/api/v1/titles/?year_min=1990&ordering=year',
+            f'/api/v1/titles/?ids={review.title_id}',
+            '/api/v1/titles/?include=reviews',
+            title,
+            reviews,
+            f'{reviews}?include=comments',
+            f'{reviews}{review.pk}/',
+            f'{reviews}{review.pk}/comments/',
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+            '/api/v1/changes/',
+        )
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def full_scans(self, plan):
+        return [
+            line for line in plan
+            if (match := FULL_SCAN.search(line))
+            and match.group(1) not in SCAN_ALLOWED
+        ]
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов реализована для SQLite.')
+        client = Client(REMOTE_ADDR='query-plans')
+        failures = []
+        for path in self.get_paths():
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path}: {response.status_code}')
+            selects = [
+                query['sql'] for query in context.captured_queries
+                if query['sql'].lstrip().upper().startswith('SELECT')
+            ]
+            scans = []
+            for sql in selects:
+                # CaptureQueriesContext хранит SQL с подставленными
+                # параметрами, поэтому план строится без них.
+                plan = self.explain(sql, ())
+                if options['verbose_plans']:
+                    print(f'  {sql}')
+                    for line in plan:
+                        print(f'    {line}')
+                scans.extend(
+                    (sql, line) for line in self.full_scans(plan)
+                )
+            status = 'ПОЛНЫЙ ПРОСМОТР' if scans else 'OK'
+            print(f'{path:<48}{len(selects):>4} запр.  {status}')
+            failures.extend((path, sql, line) for sql, line in scans)
+        if failures:
+            for path, sql, line in failures:
+                self.stderr.write(f'{path}: {line}\n  {sql}')
+            raise CommandError(
+                f'Запросов с полным просмотром таблиц: {len(failures)}.'
+            )
+        print('Все запросы используют индексы.')
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from reviews.models import ChangeLogEntry, ChangeLogHorizon
+
+Action = ChangeLogEntry.Action
+ObjectType = ChangeLogEntry.ObjectType
+
+
+class Command(BaseCommand):
+    """Для сжатия и очистки журнала изменений."""
+    help = (
+        'Оставляет в журнале изменений только последнюю запись для каждого '
+        'объекта и удаляет записи об удалении старше срока хранения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.CHANGELOG_RETENTION_DAYS,
+            help='Срок хранения записей об удалении, в днях.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            collapsed = self.collapse()
+            expired = self.expire(options['days'])
+        print(
+            f'Сжато записей: {collapsed}, удалено устаревших: {expired}. '
+            f'Граница журнала: {ChangeLogHorizon.get_seq()}.'
+        )
+
+    def collapse(self):
+        """
+        Удаляет записи, перекрытые более поздними для того же объекта.
+        Удаление произведения или отзыва окончательно для него и его
+        потомков: остаётся только его tombstone, а записи отзывов и
+        комментариев удалённого произведения и комментариев удалённого
+        отзыва (в том числе записанные после tombstone) удаляются.
+        """
+        entries = ChangeLogEntry.objects.all()
+        tombstones = entries.filter(action=Action.DELETED)
+        deleted_titles = tombstones.filter(
+            object_type=ObjectType.TITLE
+        ).values('object_id')
+        deleted_reviews = tombstones.filter(
+            object_type=ObjectType.REVIEW
+        ).values('object_id')
+        superseded = (
+            Q(object_type=ObjectType.TITLE, object_id__in=deleted_titles)
+            | Q(object_type=ObjectType.REVIEW, object_id__in=deleted_reviews)
+        ) & ~Q(action=Action.DELETED)
+        descendants = (
+            Q(title_id__in=deleted_titles) & ~Q(object_type=ObjectType.TITLE)
+            | Q(object_type=ObjectType.COMMENT, review_id__in=deleted_reviews)
+        )
+        terminal, _ = entries.filter(superseded | descendants).delete()
+        latest_ids = (
+            ChangeLogEntry.objects
+            .order_by()
+            .values('object_type', 'object_id')
+            .annotate(latest_id=Max('id'))
+            .values('latest_id')
+        )
+        deleted, _ = entries.exclude(id__in=latest_ids).delete()
+        return terminal + deleted
+
+    def expire(self, days):
+        """
+        Удаляет записи об удалении старше срока хранения и сдвигает границу
+        журнала: клиентам с более старым токеном нужна полная синхронизация.
+        """
+        expired = ChangeLogEntry.objects.filter(
+            action=Action.DELETED,
+            changed_at__lt=timezone.now() - timedelta(days=days),
+        )
+        horizon = expired.aggregate(seq=Max('id'))['seq']
+        if horizon is None:
+            return 0
+        deleted, _ = expired.filter(id__lte=horizon).delete()
+        ChangeLogHorizon.objects.update_or_create(
+            pk=1, defaults={'seq': max(horizon, ChangeLogHorizon.get_seq())}
+        )
+        return deleted
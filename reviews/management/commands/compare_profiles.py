@@ -0,0 +1,128 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+PROFILES = ('api_yamdb.settings', 'api_yamdb.settings_api')
+
+# Выполняется в отдельном процессе для каждого профиля, чтобы время
+# импорта и память не зависели от уже загруженных модулей.
+PROBE = '''
+import json, os, sys, time
+
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+application = get_wsgi_application()
+get_resolver().url_patterns
+import_ms = (time.perf_counter() - started) * 1000
+
+from django.test import Client
+
+path, total = sys.argv[1], int(sys.argv[2])
+
+
+def get(index):
+    address = f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}'
+    response = Client(REMOTE_ADDR=address).get(path)
+    if response.status_code != 200:
+        raise SystemExit(f'{path}: {response.status_code}')
+
+
+for index in range(min(total, 50)):
+    get(index)
+started = time.perf_counter()
+for index in range(total):
+    get(index)
+request_us = (time.perf_counter() - started) / total * 1e6
+
+with open('/proc/self/status') as status:
+    rss_kb = next(
+        int(line.split()[1]) for line in status if line.startswith('VmRSS')
+    )
+from django.conf import settings
+
+print(json.dumps({
+    'import_ms': import_ms,
+    'rss_mb': rss_kb / 1024,
+    'request_us': request_us,
+    'modules': len(sys.modules),
+    'middleware': len(settings.MIDDLEWARE),
+    'apps': len(settings.INSTALLED_APPS),
+}))
+'''
+
+METRICS = (
+    ('import_ms', 'Запуск и импорт URL, мс', '{:.0f}'),
+    ('rss_mb', 'RSS воркера, МБ', '{:.1f}'),
+    ('request_us', 'Запрос, мкс', '{:.0f}'),
+    ('modules', 'Загружено модулей', '{:.0f}'),
+    ('middleware', 'Middleware', '{:.0f}'),
+    ('apps', 'Приложений', '{:.0f}'),
+)
+
+
+class Command(BaseCommand):
+    """Для сравнения полного и облегчённого профиля воркера."""
+    help = (
+        'Сравнивает время запуска, память и накладные расходы на запрос '
+        'полного профиля api_yamdb.settings и api_yamdb.settings_api.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--path', default='/api/v1/categories/')
+
+    def probe(self, profile, options):
+        result = subprocess.run(
+            [
+                sys.executable, '-c', PROBE,
+                options['path'], str(options['requests']),
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': profile},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr or result.stdout)
+        return json.loads(result.stdout)
+
+    def handle(self, *args, **options) -> None:
+        runs = {profile: [] for profile in PROFILES}
+        # Профили запускаются поочерёдно, а по запускам берётся медиана,
+        # чтобы сгладить шум соседних процессов.
+        for _ in range(options['runs']):
+            for profile in PROFILES:
+                runs[profile].append(self.probe(profile, options))
+        results = {
+            profile: {
+                metric: sorted(run[metric] for run in profile_runs)[
+                    len(profile_runs) // 2
+                ]
+                for metric, _, _ in METRICS
+            }
+            for profile, profile_runs in runs.items()
+        }
+        print(
+            f'Запросов {options["path"]}: {options["requests"]}, '
+            f'запусков: {options["runs"]}.'
+        )
+        full, lean = (results[profile] for profile in PROFILES)
+        print(f'{"":<26}{"полный":>10}{"API":>10}{"разница":>10}')
+        for metric, title, value_format in METRICS:
+            difference = (
+                f'{(lean[metric] - full[metric]) / full[metric]:+.0%}'
+                if full[metric] else ''
+            )
+            print(
+                f'{title:<26}'
+                f'{value_format.format(full[metric]):>10}'
+                f'{value_format.format(lean[metric]):>10}'
+                f'{difference:>10}'
+            )
@@ -5,7 +5,16 @@ from django.contrib.auth import get_user_model
 from django.core.management import BaseCommand
 from django.db import IntegrityError, transaction
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (
+    Category,
+    ChangeLogEntry,
+    Comment,
+    Genre,
+    Review,
+    Title,
+)
+from reviews.sharding import group_by_db
+from reviews.signals import bulk_created
 
 User = get_user_model()
 
@@ -28,6 +37,8 @@ csv_models_dict = {
     'author': User,
 }
 
+logged_models = (Title, Review, Comment)
+
 
 class Command(BaseCommand):
     """Для импорта CSV данных в модели."""
@@ -35,6 +46,9 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options) -> None:
         """Обрабатывает CSV файлы."""
+        # Загруженные отзывы по id: комментарий сохраняется в шард
+        # своего отзыва (reviews.sharding).
+        self.reviews = {}
         for csv_file_name in list_of_csv:
             self.process_csv(csv_file_name)
 
@@ -66,6 +80,10 @@ class Command(BaseCommand):
             try:
                 self.replace_keys_with_objects(model_data, csv_file_name)
                 model = csv_models_dict[csv_file_name](**model_data)
+                if isinstance(model, Comment):
+                    review = self.reviews.get(int(model.review_id))
+                    if review is not None:
+                        model.review = review
                 objects_list.append(model)
             except Exception as e:
                 print(f'\nОшибка при импорте {csv_file_name}: {e}')
@@ -81,9 +99,26 @@ class Command(BaseCommand):
         """Сохраняет объекты в базу данных."""
         try:
             with transaction.atomic():
-                csv_models_dict[csv_file_name].objects.bulk_create(
-                    objects_list
-                )
+                model = csv_models_dict[csv_file_name]
+                for alias, objects in group_by_db(objects_list).items():
+                    model.objects.using(alias).bulk_create(objects)
+                if model in logged_models:
+                    ChangeLogEntry.objects.bulk_create(
+                        ChangeLogEntry.for_objects(
+                            objects_list, ChangeLogEntry.Action.CREATED
+                        )
+                    )
+                if model is Review:
+                    self.reviews.update(
+                        (int(review.pk), review) for review in objects_list
+                    )
+                    # bulk_create не отправляет сигналы сохранения.
+                    Title.refresh_rating(
+                        {review.title_id for review in objects_list}
+                    )
+                transaction.on_commit(lambda: bulk_created.send(
+                    sender=model, objects=objects_list
+                ))
                 print('.', end='')
         except IntegrityError as e:
             print(f'\nОшибка целостности для {csv_file_name}: {e}')
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from reviews.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """Для очистки устаревших ключей идемпотентности."""
+    help = (
+        'Удаляет ключи идемпотентности и сохранённые ответы старше '
+        'IDEMPOTENCY_KEY_TTL_HOURS часов.'
+    )
+
+    def handle(self, *args, **options) -> None:
+        deleted, _ = IdempotencyKey.objects.filter(
+            created_at__lt=timezone.now() - timedelta(
+                hours=settings.IDEMPOTENCY_KEY_TTL_HOURS
+            )
+        ).delete()
+        print(f'Удалено ключей идемпотентности: {deleted}.')
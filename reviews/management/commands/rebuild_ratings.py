@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Для сверки хранимого рейтинга с отзывами."""
+    help = (
+        'Пересчитывает рейтинг всех произведений по видимым отзывам.'
+    )
+
+    def handle(self, *args, **options) -> None:
+        Title.refresh_rating()
+        print(f'Рейтинг пересчитан: {Title.objects.count()} произведений.')
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.catalogue import bump_version
+from core.snapshot import restore_snapshot
+
+
+class Command(BaseCommand):
+    """Для быстрого наполнения стендов и тестовых баз."""
+    help = (
+        'Заменяет содержимое базы SQLite снимком, сохранённым командой '
+        'snapshot. Если схема снимка старше кода, выполните migrate.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл снимка.')
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='База данных для восстановления.',
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='Не запрашивать подтверждение.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Восстановление реализовано для SQLite.')
+        if options['interactive'] and input(
+            f'Все данные базы {connection.settings_dict["NAME"]} будут '
+            f'заменены снимком {options["path"]}.\n'
+            f'Введите "yes" для продолжения: '
+        ) != 'yes':
+            raise CommandError('Восстановление отменено.')
+        started = time.perf_counter()
+        try:
+            restore_snapshot(connection, options['path'])
+        except FileNotFoundError:
+            raise CommandError(f'Файл снимка {options["path"]} не найден.')
+        # Справочники в кэшах воркеров относятся к прежним данным.
+        bump_version()
+        print(
+            f'База восстановлена из {options["path"]} '
+            f'за {time.perf_counter() - started:.2f} с.'
+        )
@@ -0,0 +1,82 @@
+import signal
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from core.scheduler import Scheduler, format_time, get_jobs, run_job
+from reviews.models import JobRun
+
+
+class Command(BaseCommand):
+    """Для периодических задач обслуживания вместо cron."""
+    help = (
+        'Запускает задачи SCHEDULER_JOBS по расписанию в пуле потоков '
+        'или процессов, не допуская пересечения запусков одной задачи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'jobs',
+            nargs='*',
+            help='Задачи для запуска (по умолчанию все).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.SCHEDULER_WORKERS,
+            help='Задач, выполняемых одновременно.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Запустить задачи сразу по одному разу и завершиться.',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Показать задачи и их последние запуски.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        try:
+            jobs = get_jobs(options['jobs'])
+        except KeyError as error:
+            raise CommandError(f'Нет таких задач: {error.args[0]}.')
+        if options['list']:
+            self.list_jobs(jobs)
+        elif options['once']:
+            self.run_once(jobs)
+        else:
+            scheduler = Scheduler(jobs, options['workers'])
+            signal.signal(signal.SIGTERM, scheduler.stop)
+            signal.signal(signal.SIGINT, scheduler.stop)
+            scheduler.run()
+
+    def list_jobs(self, jobs):
+        for job in jobs:
+            print(
+                f'{job}: manage.py {" ".join((job.command, *job.args))}, '
+                f'каждые {job.interval} с ±{job.jitter:.0%}, '
+                f'пул {job.pool}, одновременно {job.concurrency}'
+            )
+            for run in JobRun.objects.filter(job=job.name)[:5]:
+                duration = (
+                    '' if run.duration is None else f' за {run.duration:.2f} с'
+                )
+                print(
+                    f'  {format_time(run.started_at.timestamp())} '
+                    f'{run.get_status_display().lower()}{duration}'
+                )
+
+    def run_once(self, jobs):
+        for job in jobs:
+            run = run_job(job)
+            if run is None:
+                print(f'{job}: уже выполняется в другом процессе.')
+                continue
+            print(
+                f'{job}: {run.get_status_display().lower()} '
+                f'за {run.duration:.2f} с.'
+            )
+            if run.status != JobRun.Status.SUCCEEDED:
+                print(run.output)
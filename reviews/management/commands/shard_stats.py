@@ -0,0 +1,39 @@
+import os
+
+from django.core.management import BaseCommand
+from django.db import connections
+
+from core.snapshot import get_database_path
+from reviews.models import Comment, Review
+from reviews.sharding import fan_out
+
+
+class Command(BaseCommand):
+    """Для контроля равномерности разбиения отзывов по шардам."""
+    help = (
+        'Печатает число отзывов и комментариев и размер файла базы '
+        'в каждом шарде. Шарды опрашиваются параллельно.'
+    )
+
+    def handle(self, *args, **options) -> None:
+        def collect(alias):
+            path = get_database_path(connections[alias])
+            return (
+                alias,
+                Review.objects.using(alias).count(),
+                Comment.objects.using(alias).count(),
+                os.path.getsize(path) if path else None,
+            )
+
+        rows = fan_out(collect)
+        for alias, reviews, comments, size in rows:
+            size = '—' if size is None else f'{size / 1024 / 1024:.1f} МиБ'
+            print(
+                f'{alias}: отзывов {reviews}, комментариев {comments}, '
+                f'файл {size}'
+            )
+        if len(rows) > 1:
+            print(
+                f'Всего: отзывов {sum(row[1] for row in rows)}, '
+                f'комментариев {sum(row[2] for row in rows)}'
+            )
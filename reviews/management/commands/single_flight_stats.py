@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from api.shared_state import get_single_flight_stats
+
+
+class Command(BaseCommand):
+    """Для оценки пользы объединения одинаковых запросов."""
+    help = (
+        'Печатает счётчики объединения одинаковых одновременных '
+        'GET-запросов по маршрутам, суммарно по воркерам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=float,
+            help='Учитывать воркеры, обновлявшие счётчики не позже '
+                 'стольких секунд назад.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        rows = get_single_flight_stats(options['max_age'])
+        if not rows:
+            print('Объединённых запросов нет.')
+            return
+        for row in rows:
+            total = row['leaders'] + row['shared']
+            print(
+                f'{row["name"]}: вычислено {row["leaders"]}, '
+                f'получили готовый ответ {row["shared"]} '
+                f'({row["shared"] / total:.0%}), '
+                f'не дождались {row["timeouts"]}, '
+                f'повторили сами {row["fallbacks"]}, '
+                f'воркеров {row["workers"]}'
+            )
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.snapshot import get_database_path, take_snapshot
+
+
+class Command(BaseCommand):
+    """Для быстрого наполнения стендов и тестовых баз."""
+    help = (
+        'Сохраняет снимок базы SQLite в файл через online backup API, '
+        'не останавливая запись в базу. Файл с суффиксом .gz сжимается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл снимка.')
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='База данных для снимка.',
+        )
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=settings.SNAPSHOT_PAGES_PER_STEP,
+            help='Страниц базы за шаг копирования.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.SNAPSHOT_STEP_SLEEP,
+            help='Пауза между шагами копирования, в секундах.',
+        )
+        parser.add_argument(
+            '--max-restarts',
+            type=int,
+            default=settings.SNAPSHOT_MAX_RESTARTS,
+            help=(
+                'Перезапусков копирования из-за записи в базу, после '
+                'которых оставшееся копируется за один шаг.'
+            ),
+        )
+
+    def handle(self, *args, **options) -> None:
+        database_path = get_database_path(connections[options['database']])
+        if database_path is None:
+            raise CommandError('Снимок возможен только для файла базы SQLite.')
+
+        def progress(status, remaining, total):
+            if options['verbosity'] > 1:
+                print(f'Скопировано страниц: {total - remaining} из {total}')
+
+        started = time.perf_counter()
+        size = take_snapshot(
+            database_path,
+            options['path'],
+            pages=options['pages'],
+            sleep=options['sleep'],
+            progress=progress,
+            max_restarts=options['max_restarts'],
+        )
+        print(
+            f'Снимок {options["path"]}: {size / 1024 / 1024:.1f} МиБ '
+            f'за {time.perf_counter() - started:.2f} с.'
+        )
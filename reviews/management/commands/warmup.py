@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from api.warmup import warm_up
+
+
+class Command(BaseCommand):
+    """Для проверки и замера прогрева воркера."""
+    help = (
+        'Прогревает процесс: компилирует маршруты, строит сериализаторы, '
+        'открывает соединения и выполняет запросы WARMUP_PATHS.'
+    )
+
+    def handle(self, *args, **options) -> None:
+        report, elapsed = warm_up()
+        for name, count, seconds in report:
+            print(f'{name:<16}{count:>6}{seconds * 1000:>10.1f} мс')
+        print(f'Прогрев завершён за {elapsed * 1000:.1f} мс.')
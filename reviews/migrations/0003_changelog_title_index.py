@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_changelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['title_id', 'id'], name='changelog_title_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=64, verbose_name='Задача')),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('succeeded', 'Успешно'), ('failed', 'Ошибка'), ('timed_out', 'Превышено время')], default='running', max_length=16, verbose_name='Статус')),
+                ('pid', models.PositiveIntegerField(verbose_name='Процесс планировщика')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Начало')),
+                ('finished_at', models.DateTimeField(null=True, verbose_name='Окончание')),
+                ('duration', models.FloatField(null=True, verbose_name='Длительность, с')),
+                ('output', models.TextField(blank=True, verbose_name='Вывод')),
+            ],
+            options={
+                'verbose_name': 'запуск задачи',
+                'verbose_name_plural': 'Запуски задач',
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['job', 'id'], name='jobrun_job_idx'),
+        ),
+    ]
@@ -1,6 +1,11 @@
+from contextlib import ExitStack
+
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Avg, OuterRef, Subquery
+from django.db.models.functions import Lower
 
 from core.validators import validate_year
 from .constants import (
@@ -11,7 +16,15 @@ from .constants import (
     SCORE_MIN_VALUE,
     SCORE_MAX_VALUE,
     COMMENT_STR_MAX_LENGTH,
+    CHANGELOG_OBJECT_TYPE_MAX_LENGTH,
+    CHANGELOG_ACTION_MAX_LENGTH,
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    IDEMPOTENCY_FINGERPRINT_LENGTH,
+    RATING_UPDATE_BATCH_SIZE,
+    JOB_NAME_MAX_LENGTH,
+    JOB_STATUS_MAX_LENGTH,
 )
+from .sharding import fan_out, is_sharded, shard_for
 
 User = get_user_model()
 
@@ -38,6 +51,74 @@ class UserRelatedModel(models.Model):
         abstract = True
 
 
+class ModeratedQuerySet(models.QuerySet):
+    def visible(self):
+        """Объекты, не скрытые модератором."""
+        return self.filter(is_hidden=False)
+
+    def with_author(self):
+        """
+        Авторы загружаются тем же запросом, а при шардах, где таблицы
+        пользователей нет, — отдельным запросом к default.
+        """
+        if is_sharded():
+            return self.prefetch_related('author')
+        return self.select_related('author')
+
+    def create(self, **kwargs):
+        """
+        Без явной базы (using) объект сохраняется в базу, выбранную
+        по нему самому: при шардах — в шард его произведения.
+        """
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class ModeratedModel(models.Model):
+    """Абстрактная модель объекта, который модератор может скрыть."""
+    is_hidden = models.BooleanField('Скрыт модератором', default=False)
+
+    objects = ModeratedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+
+class ChangeLoggedModel(models.Model):
+    """
+    Абстрактная модель, изменения которой записывают в журнал сигналы
+    (reviews.signals). Сохранение и удаление выполняются в транзакции
+    вместе с записью журнала и пересчётом рейтинга. При шардах это
+    транзакции двух баз: журнал фиксируется раньше объекта.
+    """
+
+    class Meta:
+        abstract = True
+
+    def changelog_atomic(self, using=None):
+        using = using or router.db_for_write(type(self), instance=self)
+        log_using = router.db_for_write(ChangeLogEntry)
+        atomic = transaction.atomic(using=using, savepoint=False)
+        if log_using == using:
+            return atomic
+        stack = ExitStack()
+        stack.enter_context(atomic)
+        # Ошибка записи в базу объекта не должна прерывать внешнюю
+        # транзакцию базы журнала: её блок откатывается до точки
+        # сохранения.
+        stack.enter_context(transaction.atomic(using=log_using))
+        return stack
+
+    def save(self, *args, **kwargs):
+        with self.changelog_atomic(kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        with self.changelog_atomic(using):
+            return super().delete(using=using, keep_parents=keep_parents)
+
+
 class Category(models.Model):
     name = models.CharField(
         'Название категории',
@@ -54,6 +135,9 @@ class Category(models.Model):
         verbose_name = 'категория'
         verbose_name_plural = 'Категории'
         ordering = ('name',)
+        indexes = (
+            models.Index(Lower('slug'), name='category_slug_lower_idx'),
+        )
 
     def __str__(self):
         return self.name
@@ -75,12 +159,15 @@ class Genre(models.Model):
         verbose_name = 'жанр'
         verbose_name_plural = 'Жанры'
         ordering = ('name',)
+        indexes = (
+            models.Index(Lower('slug'), name='genre_slug_lower_idx'),
+        )
 
     def __str__(self):
         return self.name
 
 
-class Title(models.Model):
+class Title(ChangeLoggedModel):
     name = models.CharField(
         'Название произведения',
         max_length=NAME_MAX_LENGTH,
@@ -99,17 +186,98 @@ class Title(models.Model):
         Genre, related_name='titles', verbose_name='Жанры'
     )
     description = models.TextField('Описание', blank=True, null=True)
+    rating = models.FloatField(
+        'Рейтинг',
+        null=True,
+        editable=False,
+        help_text='Средняя оценка видимых отзывов',
+    )
 
     class Meta:
         verbose_name = 'произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('name',)
+        indexes = (
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(Lower('name'), name='title_name_lower_idx'),
+            models.Index(fields=('year',), name='title_year_idx'),
+            models.Index(fields=('rating',), name='title_rating_idx'),
+            models.Index(
+                fields=('category', 'rating'),
+                name='title_category_rating_idx',
+            ),
+        )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Рейтинг пишет только refresh_rating: сохранение произведения
+        # не затирает его значением, прочитанным до изменения отзывов.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = [
+                name for name in update_fields if name != 'rating'
+            ]
+        adding = self._state.adding
+        with self.changelog_atomic(kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if update_fields is None and not adding:
+                Title.refresh_rating([self.pk])
+                self.refresh_from_db(fields=('rating',))
 
-class Review(DateRecordModel, UserRelatedModel):
+    @classmethod
+    def refresh_rating(cls, title_ids=None):
+        """
+        Пересчитывает сохранённый рейтинг произведений title_ids (всех,
+        если None) одним UPDATE: средняя оценка видимых отзывов.
+        При шардах средние считаются в шардах этих произведений.
+        """
+        titles = cls.objects.all()
+        if title_ids is not None:
+            titles = titles.filter(pk__in=title_ids)
+        if is_sharded():
+            if title_ids is None or title_ids:
+                cls.refresh_sharded_rating(titles, title_ids)
+            return
+        titles.update(rating=Subquery(
+            Review.objects.visible()
+            .filter(title=OuterRef('pk'))
+            .order_by()
+            .values('title')
+            .annotate(rating=Avg('score'))
+            .values('rating')
+        ))
+
+    @classmethod
+    def refresh_sharded_rating(cls, titles, title_ids):
+        def averages(alias):
+            reviews = Review.objects.using(alias).visible()
+            if title_ids is not None:
+                reviews = reviews.filter(title_id__in=title_ids)
+            return reviews.order_by().values_list('title_id').annotate(
+                rating=Avg('score')
+            )
+
+        ratings = {}
+        for rows in fan_out(
+            lambda alias: list(averages(alias)),
+            None if title_ids is None else {
+                shard_for(title_id) for title_id in title_ids
+            },
+        ):
+            ratings.update(rows)
+        titles = list(titles.only('pk'))
+        for title in titles:
+            title.rating = ratings.get(title.pk)
+        cls.objects.bulk_update(
+            titles, ('rating',), batch_size=RATING_UPDATE_BATCH_SIZE
+        )
+
+
+class Review(
+    ChangeLoggedModel, DateRecordModel, UserRelatedModel, ModeratedModel
+):
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -134,12 +302,23 @@ class Review(DateRecordModel, UserRelatedModel):
                 name='unique_review', fields=('author', 'title')
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('title', 'pub_date', 'id'),
+                name='review_title_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'), name='review_author_date_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.title.name}: {self.score}.'
 
 
-class Comment(DateRecordModel, UserRelatedModel):
+class Comment(
+    ChangeLoggedModel, DateRecordModel, UserRelatedModel, ModeratedModel
+):
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
@@ -152,6 +331,221 @@ class Comment(DateRecordModel, UserRelatedModel):
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('pub_date',)
+        indexes = (
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'), name='comment_author_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:COMMENT_STR_MAX_LENGTH]
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Запись журнала изменений произведений, отзывов и комментариев.
+    Журнал только дополняется; порядковый номер записи (id) монотонно
+    растёт и служит позицией для инкрементальной синхронизации.
+    """
+
+    class ObjectType(models.TextChoices):
+        TITLE = 'title', 'Произведение'
+        REVIEW = 'review', 'Отзыв'
+        COMMENT = 'comment', 'Комментарий'
+
+    class Action(models.TextChoices):
+        CREATED = 'created', 'Создан'
+        UPDATED = 'updated', 'Изменён'
+        DELETED = 'deleted', 'Удалён'
+
+    object_type = models.CharField(
+        'Тип объекта',
+        max_length=CHANGELOG_OBJECT_TYPE_MAX_LENGTH,
+        choices=ObjectType.choices,
+    )
+    object_id = models.BigIntegerField('ID объекта')
+    title_id = models.BigIntegerField('ID произведения', null=True)
+    review_id = models.BigIntegerField('ID отзыва', null=True)
+    action = models.CharField(
+        'Действие',
+        max_length=CHANGELOG_ACTION_MAX_LENGTH,
+        choices=Action.choices,
+    )
+    changed_at = models.DateTimeField('Дата изменения', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'запись журнала изменений'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('object_type', 'object_id'),
+                name='changelog_object_idx',
+            ),
+            models.Index(
+                fields=('title_id', 'id'),
+                name='changelog_title_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.id}: {self.object_type} {self.object_id} {self.action}'
+
+    @classmethod
+    def for_object(cls, obj, action):
+        """Создаёт (не сохраняя) запись журнала для объекта модели."""
+        return cls.for_objects([obj], action)[0]
+
+    @classmethod
+    def for_objects(cls, objs, action):
+        """
+        Создаёт (не сохраняя) записи журнала для объектов одной модели.
+        Произведения комментариев, не загруженные заранее, определяются
+        одним запросом.
+        """
+        objs = list(objs)
+        if not objs:
+            return []
+        if isinstance(objs[0], Title):
+            return [
+                cls(
+                    object_type=cls.ObjectType.TITLE,
+                    object_id=obj.pk,
+                    title_id=obj.pk,
+                    action=action,
+                )
+                for obj in objs
+            ]
+        if isinstance(objs[0], Review):
+            return [
+                cls(
+                    object_type=cls.ObjectType.REVIEW,
+                    object_id=obj.pk,
+                    title_id=obj.title_id,
+                    action=action,
+                )
+                for obj in objs
+            ]
+        title_ids = {
+            obj.review_id: obj.review.title_id
+            for obj in objs if Comment.review.is_cached(obj)
+        }
+        missing = {obj.review_id for obj in objs} - title_ids.keys()
+        if missing:
+            title_ids.update(
+                Review.objects.using(objs[0]._state.db).filter(
+                    pk__in=missing
+                ).values_list(
+                    'pk', 'title_id'
+                )
+            )
+        return [
+            cls(
+                object_type=cls.ObjectType.COMMENT,
+                object_id=obj.pk,
+                title_id=title_ids.get(obj.review_id),
+                review_id=obj.review_id,
+                action=action,
+            )
+            for obj in objs
+        ]
+
+
+class ChangeLogHorizon(models.Model):
+    """
+    Граница журнала изменений: записи с номером не больше seq могли быть
+    удалены при очистке, синхронизация от более старой позиции невозможна.
+    """
+    seq = models.BigIntegerField('Граница журнала', default=0)
+
+    class Meta:
+        verbose_name = 'граница журнала изменений'
+        verbose_name_plural = 'Граница журнала изменений'
+
+    def __str__(self):
+        return str(self.seq)
+
+    @classmethod
+    def get_seq(cls):
+        return cls.objects.values_list('seq', flat=True).first() or 0
+
+
+class IdempotencyKey(models.Model):
+    """
+    Ключ идемпотентности запроса на создание (заголовок Idempotency-Key)
+    и сохранённый ответ на него. Пока запрос выполняется, status_code
+    пуст; повтор с тем же ключом получает сохранённый ответ.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name='Пользователь',
+    )
+    key = models.CharField('Ключ', max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
+    fingerprint = models.CharField(
+        'Отпечаток запроса', max_length=IDEMPOTENCY_FINGERPRINT_LENGTH
+    )
+    status_code = models.PositiveSmallIntegerField('Код ответа', null=True)
+    response = models.JSONField(
+        'Тело ответа', null=True, encoder=DjangoJSONEncoder
+    )
+    created_at = models.DateTimeField('Дата запроса', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = (
+            models.UniqueConstraint(
+                name='unique_idempotency_key', fields=('user', 'key')
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('created_at',), name='idempotency_created_idx'
+            ),
+        )
+
+    def __str__(self):
+        return self.key
+
+
+class JobRun(models.Model):
+    """
+    Запуск периодической задачи планировщика (команда scheduler):
+    время выполнения, результат и конец вывода команды.
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = 'running', 'Выполняется'
+        SUCCEEDED = 'succeeded', 'Успешно'
+        FAILED = 'failed', 'Ошибка'
+        TIMED_OUT = 'timed_out', 'Превышено время'
+
+    job = models.CharField('Задача', max_length=JOB_NAME_MAX_LENGTH)
+    status = models.CharField(
+        'Статус',
+        max_length=JOB_STATUS_MAX_LENGTH,
+        choices=Status.choices,
+        default=Status.RUNNING,
+    )
+    pid = models.PositiveIntegerField('Процесс планировщика')
+    started_at = models.DateTimeField('Начало', auto_now_add=True)
+    finished_at = models.DateTimeField('Окончание', null=True)
+    duration = models.FloatField('Длительность, с', null=True)
+    output = models.TextField('Вывод', blank=True)
+
+    class Meta:
+        verbose_name = 'запуск задачи'
+        verbose_name_plural = 'Запуски задач'
+        ordering = ('-id',)
+        indexes = (
+            models.Index(fields=('job', 'id'), name='jobrun_job_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.job} {self.started_at:%Y-%m-%d %H:%M:%S}'
@@ -0,0 +1,247 @@
+"""
+Разбиение отзывов и комментариев по нескольким базам данных (шардам).
+
+Включается переменной окружения REVIEW_SHARDS — числом шардов (см.
+settings). Отзывы произведения и комментарии к ним хранятся в базе
+shard_for(title_id), остальные модели — в default. Схема шарда создаётся
+командой `python manage.py migrate --database=<шард>`: в шарде
+создаются только таблицы отзывов и комментариев, а ссылки на
+произведения и пользователей из другой базы не проверяются внешними
+ключами SQLite.
+
+Базу для отзыва или комментария ShardRouter выбирает по объекту
+(произведение, отзыв), а без него — по шарду, закреплённому use_shard()
+на время запроса к вложенному маршруту произведения. Операции по всем
+шардам выполняет fan_out: параллельно в потоках или, внутри открытой
+транзакции, по очереди в ней же.
+
+Первичные ключи уникальны во всех шардах: каждый шард выдаёт ключи
+из своего диапазона по SHARD_ID_SPAN, а загруженные с явными ключами
+данные занимают диапазон до SHARD_ID_SPAN.
+
+Ленты активности пользователя читаются из всех шардов через
+ShardedQuerySet. Списки отзывов и комментариев в админке читают только
+default и в режиме шардов недоступны.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+SHARDED_MODELS = ('reviews.review', 'reviews.comment')
+
+current_shard = ContextVar('current_shard', default=None)
+
+
+def is_sharded():
+    return bool(settings.REVIEW_SHARDS)
+
+
+def get_shards():
+    """Базы с отзывами и комментариями."""
+    return settings.REVIEW_SHARDS or (DEFAULT_DB_ALIAS,)
+
+
+def shard_for(title_id):
+    """База отзывов и комментариев произведения."""
+    shards = get_shards()
+    return shards[int(title_id) % len(shards)]
+
+
+@contextmanager
+def use_shard(alias):
+    """Направляет запросы к отзывам и комментариям без объекта в alias."""
+    token = current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        current_shard.reset(token)
+
+
+def run_in_thread(function, alias):
+    try:
+        with use_shard(alias):
+            return function(alias)
+    finally:
+        connections.close_all()
+
+
+def fan_out(function, aliases=None):
+    """
+    Выполняет function(alias) для каждого шарда aliases (по умолчанию
+    всех) и возвращает список результатов в порядке шардов. Шарды
+    обрабатываются параллельно в потоках, кроме случая, когда
+    в текущем потоке открыта транзакция в шарде или в default (куда
+    пишут журнал изменений и рейтинг): тогда по очереди в ней же.
+    """
+    aliases = list(get_shards() if aliases is None else aliases)
+    if len(aliases) < 2 or any(
+        connections[alias].in_atomic_block
+        for alias in {*aliases, DEFAULT_DB_ALIAS}
+    ):
+        results = []
+        for alias in aliases:
+            with use_shard(alias):
+                results.append(function(alias))
+        return results
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return list(executor.map(
+            run_in_thread, [function] * len(aliases), aliases
+        ))
+
+
+def fetch_all(queryset):
+    """Объекты queryset; отзывы и комментарии — из всех шардов."""
+    if (
+        not is_sharded()
+        or queryset.model._meta.label_lower not in SHARDED_MODELS
+    ):
+        return list(queryset)
+    return [
+        obj
+        for objects in fan_out(lambda alias: list(queryset.using(alias)))
+        for obj in objects
+    ]
+
+
+class ShardedQuerySet:
+    """
+    Queryset отзывов или комментариев для пагинации по курсору при
+    шардах: фильтры и сортировка применяются в каждом шарде, а срез
+    [start:stop] — к объединению первых stop объектов всех шардов,
+    упорядоченному так же. Поддерживает только то, что использует
+    CursorPagination; сортировка — по полям модели.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    @property
+    def model(self):
+        return self.queryset.model
+
+    def filter(self, *args, **kwargs):
+        return type(self)(self.queryset.filter(*args, **kwargs))
+
+    def order_by(self, *ordering):
+        return type(self)(self.queryset.order_by(*ordering))
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.stop is None or item.step:
+            raise TypeError('Поддерживаются только срезы с границей.')
+        objects = [
+            obj
+            for shard_objects in fan_out(
+                lambda alias: list(self.queryset.using(alias)[:item.stop])
+            )
+            for obj in shard_objects
+        ]
+        # Устойчивые сортировки от младшего поля к старшему.
+        for field in reversed(self.queryset.query.order_by):
+            objects.sort(
+                key=attrgetter(field.lstrip('-')),
+                reverse=field.startswith('-'),
+            )
+        return objects[item]
+
+
+def group_by_db(objects):
+    """Раскладывает несохранённые объекты по базам для bulk_create."""
+    groups = defaultdict(list)
+    for obj in objects:
+        groups[router.db_for_write(type(obj), instance=obj)].append(obj)
+    return groups
+
+
+class ShardRouter:
+    """Маршрутизатор баз для режима шардов."""
+
+    def db_for_instance(self, instance):
+        label = instance._meta.label_lower
+        if label == 'reviews.title' and instance.pk is not None:
+            return shard_for(instance.pk)
+        if label not in SHARDED_MODELS:
+            return None
+        # Шард определяется по произведению, а не по _state.db: его
+        # выставляет и присваивание автора из default.
+        # Поля читаются из __dict__: отложенное поле загружалось бы
+        # из базы, которую ещё предстоит выбрать.
+        title_id = instance.__dict__.get('title_id')
+        if label == 'reviews.review' and title_id is not None:
+            return shard_for(title_id)
+        if label == 'reviews.comment':
+            review = instance._meta.get_field('review')
+            if review.is_cached(instance):
+                return self.db_for_instance(review.get_cached_value(instance))
+        return instance._state.db
+
+    def db_for_model(self, model, **hints):
+        if not is_sharded():
+            return None
+        if model._meta.label_lower not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None:
+            alias = self.db_for_instance(instance)
+            if alias is not None:
+                return alias
+        return current_shard.get()
+
+    db_for_read = db_for_model
+    db_for_write = db_for_model
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded():
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in settings.REVIEW_SHARDS:
+            return None
+        return f'{app_label}.{model_name}' in SHARDED_MODELS
+
+
+@receiver(connection_created)
+def disable_foreign_keys(sender, connection, **kwargs):
+    """
+    В шарде нет произведений и пользователей, на которые ссылаются
+    отзывы и комментарии, поэтому внешние ключи SQLite в нём не
+    проверяются, в том числе после миграций.
+    """
+    if connection.alias not in settings.REVIEW_SHARDS:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA foreign_keys = OFF')
+    connection.check_constraints = lambda table_names=None: None
+    connection.enable_constraint_checking = lambda: None
+
+
+@receiver(post_migrate)
+def reserve_id_range(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Ключи шарда начинаются с его диапазона (см. SHARD_ID_SPAN)."""
+    if sender.label != 'reviews' or using not in settings.REVIEW_SHARDS:
+        return
+    start = (settings.REVIEW_SHARDS.index(using) + 1) * settings.SHARD_ID_SPAN
+    with connections[using].cursor() as cursor:
+        for model in sender.get_models():
+            if model._meta.label_lower not in SHARDED_MODELS:
+                continue
+            table = model._meta.db_table
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, 0 '
+                'WHERE NOT EXISTS '
+                '(SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                (table, table),
+            )
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = %s '
+                'WHERE name = %s AND seq < %s',
+                (start, table, start),
+            )
@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from reviews.models import ChangeLogEntry, Comment, Review, Title
+from reviews.sharding import fan_out, is_sharded, shard_for
+
+Action = ChangeLogEntry.Action
+User = get_user_model()
+
+changelog_muted = ContextVar('changelog_muted', default=False)
+
+# Объекты модели sender записаны пачкой (bulk_create) без сигналов
+# сохранения; objects — записанные объекты. Отправляется после
+# фиксации транзакции записи.
+bulk_created = Signal()
+
+
+@contextmanager
+def mute_changelog():
+    """
+    Сигналы сохранения и удаления не пишут журнал и не пересчитывают
+    рейтинг: это делает вызывающий код, одним запросом на пачку.
+    """
+    token = changelog_muted.set(True)
+    try:
+        yield
+    finally:
+        changelog_muted.reset(token)
+
+
+def title_updated_entry(title_id):
+    """Запись об изменении произведения (жанры, рейтинг)."""
+    return ChangeLogEntry(
+        object_type=ChangeLogEntry.ObjectType.TITLE,
+        object_id=title_id,
+        title_id=title_id,
+        action=Action.UPDATED,
+    )
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def log_saved(sender, instance, created, raw=False, **kwargs):
+    """Записывает в журнал создание или изменение объекта."""
+    if raw or changelog_muted.get():
+        return
+    entries = [ChangeLogEntry.for_object(
+        instance, Action.CREATED if created else Action.UPDATED
+    )]
+    if sender is Review:
+        Title.refresh_rating([instance.title_id])
+        entries.append(title_updated_entry(instance.title_id))
+    ChangeLogEntry.objects.bulk_create(entries)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def log_deleted(sender, instance, **kwargs):
+    """Записывает в журнал удаление объекта (tombstone)."""
+    if changelog_muted.get():
+        return
+    entries = [ChangeLogEntry.for_object(instance, Action.DELETED)]
+    if sender is Review:
+        Title.refresh_rating([instance.title_id])
+        entries.append(title_updated_entry(instance.title_id))
+    ChangeLogEntry.objects.bulk_create(entries)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def log_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Изменение жанров произведения записывается как его изменение."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    title_ids = (pk_set or ()) if reverse else (instance.pk,)
+    ChangeLogEntry.objects.bulk_create(
+        title_updated_entry(title_id) for title_id in title_ids
+    )
+
+
+@receiver(post_delete, sender=User)
+def delete_sharded_activity(sender, instance, **kwargs):
+    """
+    При шардах каскадное удаление не доходит до отзывов и комментариев
+    в шардах: после фиксации удаления пользователя они удаляются во всех
+    шардах параллельно.
+    """
+    if not is_sharded():
+        return
+
+    def delete(alias):
+        Comment.objects.using(alias).filter(author_id=instance.pk).delete()
+        Review.objects.using(alias).filter(author_id=instance.pk).delete()
+
+    transaction.on_commit(lambda: fan_out(delete))
+
+
+@receiver(post_delete, sender=Title)
+def delete_sharded_reviews(sender, instance, **kwargs):
+    """
+    При шардах каскадное удаление произведения не доходит до его отзывов
+    и комментариев в шарде: после фиксации удаления они удаляются в шарде
+    произведения, а их tombstone пишутся в журнал одним запросом.
+    """
+    if not is_sharded():
+        return
+    title_id = instance.pk
+
+    def delete():
+        alias = shard_for(title_id)
+        comments = Comment.objects.using(alias).filter(
+            review__title_id=title_id
+        )
+        reviews = Review.objects.using(alias).filter(title_id=title_id)
+        with transaction.atomic(using=alias), mute_changelog():
+            entries = ChangeLogEntry.for_objects(
+                comments.select_related('review').only('review__title_id'),
+                Action.DELETED,
+            ) + ChangeLogEntry.for_objects(
+                reviews.only('title_id'), Action.DELETED
+            )
+            comments.delete()
+            reviews.delete()
+        ChangeLogEntry.objects.bulk_create(entries)
+
+    transaction.on_commit(delete)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from reviews.models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+
+class APIBaseTestCase(APITestCase):
+    """Общие данные тестов API: пользователи, произведения и отзывы."""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username='admin', email='admin@yamdb.ru', role='admin'
+        )
+        cls.moderator = User.objects.create(
+            username='moderator', email='moderator@yamdb.ru',
+            role='moderator',
+        )
+        cls.user = User.objects.create(username='user', email='user@yamdb.ru')
+        cls.other_user = User.objects.create(
+            username='other', email='other@yamdb.ru'
+        )
+        cls.category = Category.objects.create(name='Фильм', slug='movie')
+        cls.genre = Genre.objects.create(name='Драма', slug='drama')
+        cls.title = Title.objects.create(
+            name='Сталкер', year=1979, category=cls.category
+        )
+        cls.title.genre.set([cls.genre])
+        cls.other_title = Title.objects.create(
+            name='Солярис', year=1972, category=cls.category
+        )
+        cls.review = Review.objects.create(
+            title=cls.title, author=cls.user, text='Хорошо', score=8
+        )
+        cls.other_review = Review.objects.create(
+            title=cls.title, author=cls.other_user, text='Плохо', score=2
+        )
+        cls.comment = Comment.objects.create(
+            review=cls.review, author=cls.other_user, text='Согласен'
+        )
+
+    @staticmethod
+    def title_url(title):
+        return f'/api/v1/titles/{title.pk}/'
+
+    @staticmethod
+    def reviews_url(title):
+        return f'{APIBaseTestCase.title_url(title)}reviews/'
+
+    @classmethod
+    def review_url(cls, review):
+        return f'{cls.reviews_url(review.title)}{review.pk}/'
+
+    @classmethod
+    def comments_url(cls, review):
+        return f'{cls.review_url(review)}comments/'
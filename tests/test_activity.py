@@ -0,0 +1,92 @@
+from base64 import b64encode
+from datetime import datetime, timezone
+from unittest import mock
+from urllib.parse import urlencode
+
+from api.pagination import ActivityCursorPagination
+from reviews.models import Review, Title
+from reviews.sharding import shard_for, use_shard
+
+from tests.base import APIBaseTestCase
+
+
+@mock.patch.object(ActivityCursorPagination, 'page_size', 2)
+class ActivityPaginationTests(APIBaseTestCase):
+    """Лента отзывов пользователя постранично по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reviews = [cls.review]
+        for index in range(5):
+            title = Title.objects.create(
+                name=f'Фильм {index}', year=2000, category=cls.category
+            )
+            cls.reviews.append(Review.objects.create(
+                title=title, author=cls.user, text='Отзыв', score=index + 1,
+                is_hidden=index == 4,
+            ))
+        # Одинаковое время публикации: порядок внутри него по id.
+        for review in cls.reviews[1:4]:
+            with use_shard(shard_for(review.title_id)):
+                Review.objects.filter(pk=review.pk).update(
+                    pub_date=datetime(2020, 1, 1, tzinfo=timezone.utc)
+                )
+        cls.visible = [
+            review.pk for review in sorted(
+                cls.reviews[:5],
+                key=lambda review: (
+                    Review.objects.db_manager(
+                        shard_for(review.title_id)
+                    ).get(pk=review.pk).pub_date,
+                    review.pk,
+                ),
+                reverse=True,
+            )
+        ]
+
+    def walk(self, url, direction='next'):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            pages.append([result['id'] for result in data['results']])
+            url = data[direction]
+        return pages
+
+    def test_pages(self):
+        self.client.force_authenticate(self.user)
+        pages = self.walk('/api/v1/users/me/reviews/')
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), self.visible)
+
+    def test_previous(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/v1/users/me/reviews/')
+        response = self.client.get(response.json()['next'])
+        response = self.client.get(response.json()['next'])
+        pages = self.walk(response.json()['previous'], 'previous')
+        self.assertEqual(sum(reversed(pages), []), self.visible[:4])
+
+    def test_admin_reads_other_user(self):
+        self.client.force_authenticate(self.admin)
+        pages = self.walk(f'/api/v1/users/{self.user.username}/reviews/')
+        self.assertEqual(sum(pages, []), self.visible)
+
+    def test_other_user_forbidden(self):
+        self.client.force_authenticate(self.other_user)
+        response = self.client.get(
+            f'/api/v1/users/{self.user.username}/reviews/'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(self.user)
+        for position in ('2020-01-01', 'никогда|1'):
+            with self.subTest(position=position):
+                cursor = b64encode(urlencode({'p': position}).encode())
+                response = self.client.get(
+                    '/api/v1/users/me/reviews/', {'cursor': cursor.decode()}
+                )
+                self.assertEqual(response.status_code, 404)
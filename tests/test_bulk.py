@@ -0,0 +1,117 @@
+import json
+from unittest import mock
+
+from reviews.models import Category, ChangeLogEntry, Genre, Title
+
+from tests.base import APIBaseTestCase
+
+Action = ChangeLogEntry.Action
+
+
+class BulkWriteTests(APIBaseTestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def bulk(self, resource, operations, status=200):
+        response = self.client.post(
+            f'/api/v1/{resource}/bulk/', operations, format='json'
+        )
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def statuses(self, data):
+        return [result['status'] for result in data['results']]
+
+    def test_permissions(self):
+        self.client.force_authenticate(self.user)
+        self.bulk('genres', [], status=403)
+        self.client.force_authenticate(None)
+        self.bulk('genres', [], status=401)
+
+    def test_not_a_list(self):
+        self.bulk('genres', {'op': 'create'}, status=400)
+
+    def test_genres(self):
+        data = self.bulk('genres', [
+            {'op': 'create', 'name': 'Комедия', 'slug': 'comedy'},
+            {'op': 'create', 'name': 'Драма', 'slug': 'drama'},
+            {'op': 'update', 'slug': 'drama', 'name': 'Драма!'},
+            {'op': 'delete', 'slug': 'unknown'},
+            {'op': 'rename'},
+            {'op': 'create', 'name': 'Плохой', 'slug': 'bad slug'},
+        ])
+        self.assertEqual(self.statuses(data), [201, 400, 400, 404, 400, 400])
+        self.assertEqual(data['summary'], {
+            'created': 1, 'updated': 0, 'deleted': 0, 'failed': 5,
+        })
+        self.assertTrue(Genre.objects.filter(slug='comedy').exists())
+        self.assertEqual(Genre.objects.get(slug='drama').name, 'Драма')
+
+    @mock.patch('api.base_viewsets.BULK_CHUNK_SIZE', 2)
+    def test_chunks(self):
+        data = self.bulk('categories', [
+            {'op': 'create', 'name': f'Категория {index}', 'slug': f'c{index}'}
+            for index in range(5)
+        ])
+        self.assertEqual(
+            [result['index'] for result in data['results']], list(range(5))
+        )
+        self.assertEqual(data['summary']['created'], 5)
+        self.assertEqual(Category.objects.count(), 6)
+
+    def test_ndjson(self):
+        body = '\n'.join(
+            json.dumps({'op': 'create', 'name': name, 'slug': slug})
+            for name, slug in (('Книга', 'book'), ('Музыка', 'music'))
+        )
+        response = self.client.post(
+            '/api/v1/categories/bulk/',
+            f'{body}\n\n',
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.json()['summary']['created'], 2)
+        response = self.client.post(
+            '/api/v1/categories/bulk/',
+            '{"op":\n',
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_titles(self):
+        Title.refresh_rating([self.title.pk])
+        ChangeLogEntry.objects.all().delete()
+        data = self.bulk('titles', [
+            {
+                'op': 'create', 'name': 'Зеркало', 'year': 1974,
+                'category': 'movie', 'genre': ['drama'],
+            },
+            {'op': 'update', 'id': self.title.pk, 'name': 'Сталкер!'},
+            {'op': 'delete', 'id': self.other_title.pk},
+            {'op': 'update', 'id': 'abc'},
+        ])
+        self.assertEqual(self.statuses(data), [201, 200, 204, 400])
+        created = Title.objects.get(pk=data['results'][0]['id'])
+        self.assertEqual(
+            [genre.slug for genre in created.genre.all()], ['drama']
+        )
+        title = Title.objects.get(pk=self.title.pk)
+        self.assertEqual(title.name, 'Сталкер!')
+        self.assertEqual(title.rating, 5)
+        self.assertFalse(Title.objects.filter(pk=self.other_title.pk).exists())
+        self.assertEqual(
+            set(ChangeLogEntry.objects.values_list('object_id', 'action')),
+            {
+                (created.pk, Action.CREATED),
+                (self.title.pk, Action.UPDATED),
+                (self.other_title.pk, Action.DELETED),
+            },
+        )
+
+    def test_same_object_twice(self):
+        data = self.bulk('titles', [
+            {'op': 'update', 'id': self.title.pk, 'year': 1980},
+            {'op': 'delete', 'id': self.title.pk},
+        ])
+        self.assertEqual(self.statuses(data), [400, 400])
+        self.assertTrue(Title.objects.filter(pk=self.title.pk).exists())
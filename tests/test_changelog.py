@@ -0,0 +1,172 @@
+import io
+from contextlib import redirect_stdout
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TransactionTestCase
+
+from api.utils import encode_change_token
+from reviews.models import ChangeLogEntry, ChangeLogHorizon, Review, Title
+from reviews.sharding import shard_for
+
+from tests.base import APIBaseTestCase, User
+
+Action = ChangeLogEntry.Action
+ObjectType = ChangeLogEntry.ObjectType
+
+
+class ChangeLogAtomicityTests(TransactionTestCase):
+    """
+    Ошибка записи журнала откатывает изменение объекта, в том числе
+    без внешней транзакции.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create(username='user', email='u@yamdb.ru')
+        self.title = Title.objects.create(name='Сталкер', year=1979)
+        self.alias = shard_for(self.title.pk)
+
+    def log_unavailable(self):
+        return mock.patch.object(
+            ChangeLogEntry.objects, 'bulk_create',
+            side_effect=DatabaseError('Журнал недоступен.'),
+        )
+
+    def test_save(self):
+        with self.log_unavailable(), self.assertRaises(DatabaseError):
+            Review.objects.create(
+                title=self.title, author=self.user, text='Хорошо', score=5
+            )
+        self.assertFalse(Review.objects.using(self.alias).exists())
+
+    def test_delete(self):
+        review = Review.objects.create(
+            title=self.title, author=self.user, text='Хорошо', score=5
+        )
+        with self.log_unavailable(), self.assertRaises(DatabaseError):
+            review.delete()
+        self.assertTrue(
+            Review.objects.using(self.alias).filter(pk=review.pk).exists()
+        )
+
+
+class CompactChangeLogTests(APIBaseTestCase):
+
+    def entry(self, object_type, object_id, action, **kwargs):
+        return ChangeLogEntry.objects.create(
+            object_type=object_type, object_id=object_id, action=action,
+            **kwargs,
+        )
+
+    def compact(self):
+        with redirect_stdout(io.StringIO()):
+            call_command('compact_changelog')
+        return set(ChangeLogEntry.objects.values_list(
+            'object_type', 'object_id', 'action'
+        ))
+
+    def test_latest_entry_kept(self):
+        ChangeLogEntry.objects.all().delete()
+        self.entry(ObjectType.TITLE, 1, Action.CREATED, title_id=1)
+        self.entry(ObjectType.TITLE, 1, Action.UPDATED, title_id=1)
+        self.assertEqual(
+            self.compact(), {(ObjectType.TITLE, 1, Action.UPDATED)}
+        )
+
+    def test_deleted_title_is_terminal(self):
+        ChangeLogEntry.objects.all().delete()
+        self.entry(ObjectType.TITLE, 1, Action.CREATED, title_id=1)
+        self.entry(ObjectType.REVIEW, 2, Action.CREATED, title_id=1)
+        self.entry(
+            ObjectType.COMMENT, 3, Action.CREATED, title_id=1, review_id=2
+        )
+        self.entry(ObjectType.TITLE, 1, Action.DELETED, title_id=1)
+        # Отзыв удалён после произведения: его tombstone и пересчёт
+        # рейтинга записаны позже tombstone произведения.
+        self.entry(ObjectType.REVIEW, 2, Action.DELETED, title_id=1)
+        self.entry(ObjectType.TITLE, 1, Action.UPDATED, title_id=1)
+        self.assertEqual(
+            self.compact(), {(ObjectType.TITLE, 1, Action.DELETED)}
+        )
+
+    def test_deleted_review_is_terminal(self):
+        ChangeLogEntry.objects.all().delete()
+        self.entry(ObjectType.REVIEW, 2, Action.CREATED, title_id=1)
+        self.entry(
+            ObjectType.COMMENT, 3, Action.CREATED, title_id=1, review_id=2
+        )
+        self.entry(ObjectType.REVIEW, 2, Action.DELETED, title_id=1)
+        self.entry(
+            ObjectType.COMMENT, 3, Action.DELETED, title_id=1, review_id=2
+        )
+        self.assertEqual(
+            self.compact(), {(ObjectType.REVIEW, 2, Action.DELETED)}
+        )
+
+
+class ChangeFeedTests(APIBaseTestCase):
+    """Лента изменений /changes/ для дифференциальной синхронизации."""
+
+    def sync(self, since=None, status=200, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get('/api/v1/changes/', params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def sync_all(self, since=None):
+        changes = []
+        while True:
+            data = self.sync(since, limit=3)
+            changes += data['results']
+            since = data['next']
+            if not data['has_more']:
+                return changes, since
+
+    def test_full_sync(self):
+        changes, _ = self.sync_all()
+        latest = {
+            (change['type'], change['id']): change for change in changes
+        }
+        self.assertEqual(
+            latest[(ObjectType.REVIEW, self.review.pk)]['data']['score'], 8
+        )
+        self.assertEqual(
+            latest[(ObjectType.TITLE, self.title.pk)]['data']['name'],
+            self.title.name,
+        )
+        self.assertEqual(
+            latest[(ObjectType.COMMENT, self.comment.pk)]['review_id'],
+            self.review.pk,
+        )
+
+    def test_incremental(self):
+        _, since = self.sync_all()
+        self.assertEqual(self.sync(since)['results'], [])
+        review = self.title.reviews.get(pk=self.review.pk)
+        review.score = 10
+        review.save()
+        deleted_pk = self.other_review.pk
+        self.title.reviews.get(pk=deleted_pk).delete()
+        changes = self.sync(since)['results']
+        self.assertEqual(
+            [(change['type'], change['id'], change['action'])
+             for change in changes],
+            [
+                (ObjectType.REVIEW, self.review.pk, Action.UPDATED),
+                (ObjectType.REVIEW, deleted_pk, Action.DELETED),
+                (ObjectType.TITLE, self.title.pk, Action.UPDATED),
+            ],
+        )
+        self.assertEqual(changes[0]['data']['score'], 10)
+        self.assertIsNone(changes[1]['data'])
+        self.assertEqual(changes[2]['data']['rating'], 10)
+
+    def test_invalid_token(self):
+        self.sync('не токен', status=400)
+
+    def test_expired_token(self):
+        ChangeLogHorizon.objects.create(seq=10 ** 6)
+        self.sync(encode_change_token(1), status=410)
@@ -0,0 +1,92 @@
+import gzip
+import json
+from unittest import skipIf
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import (
+    CompressionMiddleware,
+    brotli,
+    parse_accept_encoding,
+)
+from api.renderers import ORJSONRenderer, msgpack, orjson
+from reviews.models import Title
+
+from tests.base import APIBaseTestCase
+
+BODY = json.dumps([{'name': 'Сталкер', 'year': 1979}] * 100).encode()
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def respond(self, accept_encoding, content=BODY, **headers):
+        response = HttpResponse(content, content_type='application/json')
+        for name, value in headers.items():
+            response.headers[name] = value
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING=accept_encoding
+        ))
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(
+            parse_accept_encoding('gzip;q=0.5, BR, identity;q=x,'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0},
+        )
+
+    @skipIf(brotli is None, 'brotli не установлен')
+    def test_brotli_preferred(self):
+        response = self.respond('gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+        self.assertEqual(
+            response['Content-Length'], str(len(response.content))
+        )
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_gzip_by_quality(self):
+        response = self.respond('br;q=0.1, gzip;q=0.9')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_not_compressed(self):
+        for accept_encoding, content in (
+            ('', BODY),
+            ('br;q=0, gzip;q=0', BODY),
+            ('gzip', b'{}'),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.respond(accept_encoding, content)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, content)
+
+    def test_etag_weakened(self):
+        response = self.respond('gzip', ETag='"abc"')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+
+class RendererTests(APIBaseTestCase):
+
+    @skipIf(orjson is None, 'orjson не установлен')
+    def test_orjson_matches_json_renderer(self):
+        data = {
+            'name': 'Сталкер\u2028', 'rating': 7.5, 'genre': [None, True],
+        }
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    @skipIf(msgpack is None, 'msgpack не установлен')
+    def test_msgpack(self):
+        response = self.client.get(
+            self.title_url(self.title), HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data['name'], Title.objects.get(pk=data['id']).name)
@@ -0,0 +1,93 @@
+from reviews.models import ChangeLogEntry, Comment, Review, Title
+from reviews.sharding import fetch_all
+
+from tests.base import APIBaseTestCase
+
+MODERATION_URL = '/api/v1/moderation/'
+Action = ChangeLogEntry.Action
+ObjectType = ChangeLogEntry.ObjectType
+
+
+class ModerationTests(APIBaseTestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(self.moderator)
+
+    def moderate(self, **data):
+        response = self.client.post(MODERATION_URL, data, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def logged(self, object_type, action):
+        return set(ChangeLogEntry.objects.filter(
+            object_type=object_type, action=action
+        ).values_list('object_id', flat=True))
+
+    def test_filter_required(self):
+        response = self.client.post(
+            MODERATION_URL,
+            {'target': 'reviews', 'action': 'delete'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_forbidden(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            MODERATION_URL,
+            {'target': 'reviews', 'action': 'hide', 'author': 'user'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_dry_run(self):
+        summary = self.moderate(
+            target='reviews', action='delete', title=self.title.pk,
+            dry_run=True,
+        )
+        self.assertEqual(summary['matched'], 2)
+        self.assertEqual(len(fetch_all(Review.objects.all())), 2)
+
+    def test_delete_reviews(self):
+        ChangeLogEntry.objects.all().delete()
+        summary = self.moderate(
+            target='reviews', action='delete', author='user'
+        )
+        self.assertEqual(summary['processed'], 1)
+        self.assertEqual(summary['deleted'], {'comment': 1, 'review': 1})
+        self.assertEqual(
+            fetch_all(Review.objects.all()), [self.other_review]
+        )
+        self.assertEqual(fetch_all(Comment.objects.all()), [])
+        self.assertEqual(
+            Title.objects.get(pk=self.title.pk).rating,
+            self.other_review.score,
+        )
+        # Одна запись на объект: сигналы удаления журнал не пишут.
+        self.assertEqual(ChangeLogEntry.objects.count(), 3)
+        self.assertEqual(
+            self.logged(ObjectType.REVIEW, Action.DELETED), {self.review.pk}
+        )
+        self.assertEqual(
+            self.logged(ObjectType.COMMENT, Action.DELETED),
+            {self.comment.pk},
+        )
+        self.assertEqual(
+            self.logged(ObjectType.TITLE, Action.UPDATED), {self.title.pk}
+        )
+
+    def test_hide_and_unhide(self):
+        self.moderate(target='reviews', action='hide', author='other')
+        self.assertEqual(
+            Title.objects.get(pk=self.title.pk).rating, self.review.score
+        )
+        response = self.client.get(self.reviews_url(self.title))
+        self.assertEqual(
+            [review['id'] for review in response.json()['results']],
+            [self.review.pk],
+        )
+        summary = self.moderate(
+            target='reviews', action='unhide', author='other'
+        )
+        self.assertEqual(summary['processed'], 1)
+        self.assertEqual(Title.objects.get(pk=self.title.pk).rating, 5)
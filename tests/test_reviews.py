@@ -0,0 +1,67 @@
+from reviews.models import ChangeLogEntry, Review, Title
+
+from tests.base import APIBaseTestCase
+
+
+class ReviewDeleteTests(APIBaseTestCase):
+
+    def test_author_deletes_review(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.delete(self.review_url(self.review))
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assertFalse(Review.objects.filter(pk=self.review.pk).exists())
+        self.assertTrue(
+            ChangeLogEntry.objects.filter(
+                object_type=ChangeLogEntry.ObjectType.REVIEW,
+                object_id=self.review.pk,
+                title_id=self.title.pk,
+                action=ChangeLogEntry.Action.DELETED,
+            ).exists()
+        )
+        self.assertEqual(
+            Title.objects.get(pk=self.title.pk).rating,
+            self.other_review.score,
+        )
+
+    def test_author_updates_review(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(
+            self.review_url(self.review), {'score': 4}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['score'], 4)
+        self.assertEqual(Title.objects.get(pk=self.title.pk).rating, 3)
+
+
+class ReviewCreateTests(APIBaseTestCase):
+
+    def test_create(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            self.reviews_url(self.other_title),
+            {'text': 'Отлично', 'score': 9},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Title.objects.get(pk=self.other_title.pk).rating, 9)
+
+    def test_second_review_rejected(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            self.reviews_url(self.title),
+            {'text': 'Ещё раз', 'score': 9},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400, response.content)
+
+    def test_missing_title(self):
+        # Тест выполняется во внешней транзакции, как при
+        # ATOMIC_REQUESTS: внешний ключ до фиксации не проверяется.
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            '/api/v1/titles/0/reviews/',
+            {'text': 'Отлично', 'score': 9},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 404, response.content)
+        self.assertFalse(Review.objects.filter(title_id=0).exists())
@@ -0,0 +1,93 @@
+from unittest import skipUnless
+
+from django.conf import settings
+
+from reviews.models import ChangeLogEntry, Comment, Review, Title
+from reviews.sharding import shard_for
+
+from tests.base import APIBaseTestCase
+
+Action = ChangeLogEntry.Action
+ObjectType = ChangeLogEntry.ObjectType
+
+
+class TitleDeleteTests(APIBaseTestCase):
+    """Удаление произведения удаляет его отзывы и комментарии."""
+
+    def assert_activity_deleted(self):
+        alias = shard_for(self.title.pk)
+        self.assertFalse(
+            Review.objects.using(alias).filter(title_id=self.title.pk).exists()
+        )
+        self.assertFalse(
+            Comment.objects.using(alias).filter(pk=self.comment.pk).exists()
+        )
+        deleted = set(ChangeLogEntry.objects.filter(
+            action=Action.DELETED
+        ).values_list('object_type', 'object_id'))
+        self.assertEqual(deleted, {
+            (ObjectType.TITLE, self.title.pk),
+            (ObjectType.REVIEW, self.review.pk),
+            (ObjectType.REVIEW, self.other_review.pk),
+            (ObjectType.COMMENT, self.comment.pk),
+        })
+
+    def test_destroy(self):
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/v1/titles/{self.title.pk}/')
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assertFalse(Title.objects.filter(pk=self.title.pk).exists())
+        self.assert_activity_deleted()
+
+    def test_bulk_delete(self):
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/v1/titles/bulk/',
+                [{'op': 'delete', 'id': self.title.pk}],
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_activity_deleted()
+
+
+class ActivityTests(APIBaseTestCase):
+    """Лента активности пользователя (при шардах — из всех шардов)."""
+
+    def test_reviews_across_titles(self):
+        review = Review.objects.create(
+            title=self.other_title, author=self.user, text='Тоже', score=6
+        )
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/v1/users/me/reviews/')
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        self.assertEqual(
+            [(result['id'], result['title']['name']) for result in results],
+            [
+                (review.pk, self.other_title.name),
+                (self.review.pk, self.title.name),
+            ],
+        )
+
+    def test_comments(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(
+            f'/api/v1/users/{self.other_user.username}/comments/'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        [result] = response.json()['results']
+        self.assertEqual(result['review'], self.review.pk)
+        self.assertEqual(result['title']['name'], self.title.name)
+
+
+@skipUnless(settings.REVIEW_SHARDS, 'Только в режиме шардов.')
+class ShardedAdminTests(APIBaseTestCase):
+
+    def test_reviews_unavailable(self):
+        self.admin.is_staff = self.admin.is_superuser = True
+        self.admin.save()
+        self.client.force_login(self.admin)
+        response = self.client.get('/admin/reviews/review/')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,67 @@
+import threading
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.middleware import SingleFlightMiddleware, get_flight
+
+
+@override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+class GetFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def key(self, path='/api/v1/titles/', host='a.example', **kwargs):
+        return get_flight(self.factory.get(path, HTTP_HOST=host, **kwargs))
+
+    def test_query_order_ignored(self):
+        self.assertEqual(
+            self.key('/api/v1/titles/?year=2000&name=a'),
+            self.key('/api/v1/titles/?name=a&year=2000'),
+        )
+
+    def test_host_and_scheme_in_key(self):
+        # Ссылки next и previous в ответе абсолютные.
+        self.assertNotEqual(self.key(), self.key(host='b.example'))
+        self.assertNotEqual(self.key(), self.key(secure=True))
+
+    def test_not_coalesced(self):
+        self.assertIsNone(self.key(HTTP_AUTHORIZATION='Bearer token'))
+        self.assertIsNone(self.key(HTTP_IF_NONE_MATCH='"etag"'))
+        self.assertIsNone(self.key('/api/v1/unknown/'))
+        self.assertIsNone(get_flight(self.factory.post('/api/v1/titles/')))
+
+
+@override_settings(SINGLE_FLIGHT=True)
+class SingleFlightMiddlewareTests(SimpleTestCase):
+
+    def test_concurrent_requests_share_response(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def get_response(request):
+            calls.append(request)
+            started.set()
+            release.wait(5)
+            return HttpResponse(b'{}', content_type='application/json')
+
+        middleware = SingleFlightMiddleware(get_response)
+        request = RequestFactory().get('/api/v1/titles/')
+        responses = []
+        leader = threading.Thread(
+            target=lambda: responses.append(middleware(request))
+        )
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(
+            target=lambda: responses.append(middleware(request))
+        )
+        follower.start()
+        follower.join(0.2)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([response.content for response in responses],
+                         [b'{}', b'{}'])
@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.snapshot import open_snapshot, take_snapshot
+
+
+class SnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database_path = os.path.join(directory.name, 'db.sqlite3')
+        self.snapshot_path = os.path.join(directory.name, 'snapshot.sqlite3')
+        self.database = sqlite3.connect(self.database_path)
+        self.addCleanup(self.database.close)
+
+    def fill(self, journal_mode='delete', rows=200):
+        self.database.execute(f'PRAGMA journal_mode={journal_mode}')
+        self.database.execute('CREATE TABLE item (value TEXT)')
+        self.database.executemany(
+            'INSERT INTO item VALUES (?)', [('x' * 1000,)] * rows
+        )
+        self.database.commit()
+
+    def count(self, path):
+        with open_snapshot(path) as snapshot:
+            return snapshot.execute('SELECT count(*) FROM item').fetchone()[0]
+
+    def write(self, *args):
+        self.database.execute("INSERT INTO item VALUES ('y')")
+        self.database.commit()
+
+    def test_compressed(self):
+        self.fill()
+        path = f'{self.snapshot_path}.gz'
+        take_snapshot(self.database_path, path, pages=10, sleep=0)
+        self.assertEqual(self.count(path), 200)
+        # Временные файлы копирования удалены.
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(path))),
+            ['db.sqlite3', 'snapshot.sqlite3.gz'],
+        )
+
+    def test_restarts_limited(self):
+        # Запись после каждого шага перезапускает постраничное
+        # копирование; без предела оно не закончилось бы никогда.
+        self.fill()
+        take_snapshot(
+            self.database_path, self.snapshot_path, pages=1, sleep=0,
+            progress=self.write, max_restarts=2,
+        )
+        self.assertGreater(self.count(self.snapshot_path), 200)
+
+    def test_wal_consistent(self):
+        self.fill('wal')
+        take_snapshot(
+            self.database_path, self.snapshot_path, pages=1, sleep=0,
+            progress=self.write,
+        )
+        self.assertEqual(self.count(self.snapshot_path), 200)
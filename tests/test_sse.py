@@ -0,0 +1,111 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TransactionTestCase
+
+from api import sse
+from reviews.models import Category, Title
+
+
+def run_events(title_id, method='GET', headers=()):
+    """Запрос потока событий; клиент отключается после ответа."""
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': f'/api/v1/titles/{title_id}/events/',
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+        'scheme': 'http',
+    }
+    messages = []
+
+    async def receive():
+        await asyncio.sleep(0.2)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(sse.events_application(scope, receive, send, title_id))
+    start, *body = messages
+    return (
+        start['status'],
+        dict(start['headers']),
+        b''.join(message['body'] for message in body),
+    )
+
+
+class EventsTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.title = Title.objects.create(
+            name='Сталкер', year=1979,
+            category=Category.objects.create(name='Фильм', slug='movie'),
+        )
+        patcher = mock.patch.object(sse, 'broadcaster', sse.Broadcaster())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stream(self):
+        status, headers, _ = run_events(
+            self.title.pk, headers=[(b'accept', b'text/event-stream')]
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'text/event-stream')
+
+    def test_missing_title(self):
+        status, _, body = run_events(self.title.pk + 1)
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(body)['detail'], 'Страница не найдена.')
+
+    def test_write_requires_auth(self):
+        status, _, body = run_events(self.title.pk, method='POST')
+        self.assertEqual(status, 401)
+        self.assertEqual(
+            json.loads(body)['detail'],
+            'Учетные данные не были предоставлены.',
+        )
+
+    def test_invalid_token(self):
+        status, _, _ = run_events(
+            self.title.pk, headers=[(b'authorization', b'Bearer invalid')]
+        )
+        self.assertEqual(status, 401)
+
+    def test_throttled(self):
+        with mock.patch.multiple(
+            'api.throttling.ReadRateThrottle',
+            allow_request=mock.Mock(return_value=False),
+            wait=mock.Mock(return_value=3),
+        ):
+            status, headers, _ = run_events(self.title.pk)
+        self.assertEqual(status, 429)
+        self.assertEqual(headers[b'retry-after'], b'3')
+
+    def test_shed(self):
+        with mock.patch.object(
+            sse.load_monitor, 'enter', return_value=(503, 5)
+        ):
+            status, headers, _ = run_events(self.title.pk)
+        self.assertEqual(status, 503)
+        self.assertEqual(headers[b'retry-after'], b'5')
+
+    def test_broadcaster_failure_closes_stream(self):
+        with mock.patch.object(
+            sse, 'latest_seq', side_effect=DatabaseError
+        ):
+            status, _, body = run_events(self.title.pk)
+        self.assertEqual(status, 200)
+        self.assertTrue(body.endswith(sse.FAILED_EVENT))
+        self.assertEqual(sse.broadcaster.subscribers, {})
+        self.assertIsInstance(
+            sse.broadcaster.task.exception(), DatabaseError
+        )
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import override_settings
+
+from api import shared_state, throttling
+from api.middleware import load_monitor
+from api.throttling import TokenLeases
+
+from tests.base import APIBaseTestCase
+
+
+class SharedStateTestCase(APIBaseTestCase):
+    """Тесты с отдельным общим файлом состояния и пустым запасом токенов."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_state_path = override_settings(
+            SHARED_STATE_PATH=os.path.join(directory.name, 'state.sqlite3')
+        )
+        shared_state_path.enable()
+        self.addCleanup(shared_state_path.disable)
+        leases = mock.patch.object(throttling, 'token_leases', TokenLeases())
+        leases.start()
+        self.addCleanup(leases.stop)
+
+
+class TokenBucketTests(SharedStateTestCase):
+
+    def test_take_tokens(self):
+        now = 1000.0
+        self.assertEqual(
+            shared_state.take_tokens('key', 3, 1.0, 2, now), (2, 0)
+        )
+        self.assertEqual(
+            shared_state.take_tokens('key', 3, 1.0, 2, now), (1, 0)
+        )
+        granted, wait = shared_state.take_tokens('key', 3, 1.0, 2, now)
+        self.assertEqual(granted, 0)
+        self.assertAlmostEqual(wait, 1.0)
+        self.assertEqual(
+            shared_state.take_tokens('key', 3, 1.0, 2, now + 1), (1, 0)
+        )
+
+    def test_signup_throttle(self):
+        statuses = [
+            self.client.post('/api/v1/auth/signup/', {
+                'username': f'new{index}', 'email': f'new{index}@yamdb.ru',
+            }).status_code
+            for index in range(11)
+        ]
+        self.assertEqual(statuses, [200] * 10 + [429])
+
+    def test_reads_take_tokens_in_leases(self):
+        with mock.patch.object(
+            throttling, 'take_tokens', wraps=shared_state.take_tokens
+        ) as take_tokens:
+            for _ in range(10):
+                response = self.client.get('/api/v1/categories/')
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(take_tokens.call_count, 1)
+
+    def test_shared_state_unavailable(self):
+        with override_settings(SHARED_STATE_PATH='/nonexistent/state.sqlite3'):
+            response = self.client.get('/api/v1/categories/')
+        self.assertEqual(response.status_code, 200)
+
+
+class LoadSheddingTests(SharedStateTestCase):
+
+    def setUp(self):
+        super().setUp()
+        load_monitor.latency_ms = 0.0
+        load_monitor.measured_at = time.monotonic()
+
+    def test_inflight_limit(self):
+        with override_settings(LOAD_SHEDDING_MAX_INFLIGHT=0):
+            response = self.client.get('/api/v1/categories/')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_latency_limit(self):
+        load_monitor.latency_ms = 10000.0
+        response = self.client.get('/api/v1/categories/')
+        self.assertEqual(response.status_code, 503)
+        load_monitor.measured_at -= 100
+        response = self.client.get('/api/v1/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(load_monitor.inflight, 0)
+
+    def test_one_slow_response_does_not_shed(self):
+        load_monitor.inflight += 1
+        load_monitor.exit(60000)
+        response = self.client.get('/api/v1/categories/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_slow_by_design_views_not_sampled(self):
+        self.client.force_authenticate(self.admin)
+        with mock.patch.object(
+            load_monitor, 'exit', wraps=load_monitor.exit
+        ) as exit:
+            self.client.post(
+                '/api/v1/genres/bulk/',
+                [{'op': 'create', 'name': 'Комедия', 'slug': 'comedy'}],
+                format='json',
+            )
+            self.client.post(
+                '/api/v1/moderation/',
+                {'target': 'reviews', 'action': 'hide', 'dry_run': True},
+                format='json',
+            )
+            self.client.get('/api/v1/categories/')
+        self.assertEqual(
+            [call.args[1] for call in exit.call_args_list],
+            [False, False, True],
+        )
@@ -0,0 +1,111 @@
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.catalogue import get_catalogue
+from reviews.models import Category, Genre, Review, Title
+
+from tests.base import APIBaseTestCase
+
+
+class TitleUpdateTests(APIBaseTestCase):
+
+    def test_response_matches_read(self):
+        Genre.objects.create(name='Фантастика', slug='sci-fi')
+        Title.refresh_rating([self.title.pk])
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(
+            self.title_url(self.title),
+            {'genre': ['drama', 'sci-fi'], 'year': 1980},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data['rating'], 5)
+        self.assertEqual(
+            [genre['slug'] for genre in data['genre']], ['drama', 'sci-fi']
+        )
+        self.assertEqual(data, self.client.get(
+            self.title_url(self.title)
+        ).json())
+
+
+class StaleCatalogueTests(APIBaseTestCase):
+    """Жанр создан в обход кэша справочников этого процесса."""
+
+    def setUp(self):
+        patcher = mock.patch('api.catalogue.get_version', return_value=1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_catalogue(refresh=True)
+        Genre.objects.bulk_create([Genre(name='Фантастика', slug='sci-fi')])
+        self.addCleanup(get_catalogue, refresh=True)
+        self.client.force_authenticate(self.admin)
+
+    def test_update(self):
+        response = self.client.patch(
+            self.title_url(self.title), {'genre': ['sci-fi']}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['genre'][0]['slug'], 'sci-fi')
+
+    def test_bulk_create(self):
+        operations = [
+            {
+                'op': 'create', 'name': name, 'year': 1980,
+                'category': 'movie', 'genre': ['sci-fi', 'unknown'],
+            }
+            for name in ('Сталкер 2', 'Солярис 2')
+        ]
+        operations[1]['genre'].pop()
+        response = self.client.post(
+            '/api/v1/titles/bulk/', operations, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        first, second = response.json()['results']
+        self.assertEqual(first['status'], 400)
+        self.assertIn('unknown', str(first['errors']['genre']))
+        self.assertEqual(second['status'], 201, second)
+
+
+class TitleSaveTests(APIBaseTestCase):
+
+    def test_full_save_keeps_rating(self):
+        # Отзыв добавлен после загрузки произведения.
+        title = Title.objects.get(pk=self.title.pk)
+        Review.objects.create(
+            title=self.title, author=self.admin, text='Отлично', score=10
+        )
+        title.name = 'Сталкер (1979)'
+        title.save()
+        self.assertEqual(title.rating, 20 / 3)
+        self.assertEqual(Title.objects.get(pk=self.title.pk).rating, 20 / 3)
+
+    def test_update_fields_without_rating(self):
+        Title.refresh_rating([self.title.pk])
+        title = Title.objects.get(pk=self.title.pk)
+        title.name, title.rating = 'Сталкер (1979)', 1
+        title.save(update_fields=('name', 'rating'))
+        title = Title.objects.get(pk=self.title.pk)
+        self.assertEqual(title.name, 'Сталкер (1979)')
+        self.assertEqual(title.rating, 5)
+
+
+class LoadDataTests(APIBaseTestCase):
+
+    @mock.patch('api.signals.invalidate_catalogue')
+    def test_catalogue_invalidated(self, invalidate_catalogue):
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, 'category.csv').write_text(
+                'id,name,slug\n10,Книга,book\n', encoding='utf-8'
+            )
+            with override_settings(CSV_DATA_DIR=directory), \
+                    self.captureOnCommitCallbacks(execute=True), \
+                    mock.patch('sys.stdout', io.StringIO()):
+                call_command('load_data_from_csv')
+        self.assertTrue(Category.objects.filter(slug='book').exists())
+        invalidate_catalogue.assert_called_once_with()
@@ -2,12 +2,14 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from core.admin import ScalableAdminMixin
+
 
 User = get_user_model()
 
 
 @admin.register(User)
-class CustomUserAdmin(BaseUserAdmin):
+class CustomUserAdmin(ScalableAdminMixin, BaseUserAdmin):
     fieldsets = (
         (
             'Standard info',
@@ -7,3 +7,6 @@ BIO_MAX_LENGTH = 500
 ROLE_USER = 'user'
 ROLE_ADMIN = 'admin'
 ROLE_MODERATOR = 'moderator'
+
+USERNAME_SEARCH_TABLE = 'user_username_search'
+USERNAME_SEARCH_MIN_LENGTH = 3
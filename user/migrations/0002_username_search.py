@@ -0,0 +1,66 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:16
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+from user.constants import USERNAME_SEARCH_TABLE
+
+# Внешнее содержимое: таблица FTS5 хранит только триграммный индекс,
+# а строки берёт из user_user. Триггеры поддерживают индекс при любом
+# сохранении и удалении, в том числе при bulk_create.
+CREATE_SEARCH = (
+    f"CREATE VIRTUAL TABLE {USERNAME_SEARCH_TABLE} USING fts5("
+    f"username, content='user_user', content_rowid='id', "
+    f"tokenize='trigram')",
+    f"CREATE TRIGGER {USERNAME_SEARCH_TABLE}_insert AFTER INSERT "
+    f"ON user_user BEGIN "
+    f"INSERT INTO {USERNAME_SEARCH_TABLE} (rowid, username) "
+    f"VALUES (new.id, new.username); END",
+    f"CREATE TRIGGER {USERNAME_SEARCH_TABLE}_delete AFTER DELETE "
+    f"ON user_user BEGIN "
+    f"INSERT INTO {USERNAME_SEARCH_TABLE} "
+    f"({USERNAME_SEARCH_TABLE}, rowid, username) "
+    f"VALUES ('delete', old.id, old.username); END",
+    f"CREATE TRIGGER {USERNAME_SEARCH_TABLE}_update AFTER UPDATE OF username "
+    f"ON user_user BEGIN "
+    f"INSERT INTO {USERNAME_SEARCH_TABLE} "
+    f"({USERNAME_SEARCH_TABLE}, rowid, username) "
+    f"VALUES ('delete', old.id, old.username); "
+    f"INSERT INTO {USERNAME_SEARCH_TABLE} (rowid, username) "
+    f"VALUES (new.id, new.username); END",
+    f"INSERT INTO {USERNAME_SEARCH_TABLE} ({USERNAME_SEARCH_TABLE}) "
+    f"VALUES ('rebuild')",
+)
+
+DROP_SEARCH = (
+    f'DROP TRIGGER IF EXISTS {USERNAME_SEARCH_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {USERNAME_SEARCH_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {USERNAME_SEARCH_TABLE}_update',
+    f'DROP TABLE IF EXISTS {USERNAME_SEARCH_TABLE}',
+)
+
+
+def execute_sqlite(statements):
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='user_username_lower_idx'),
+        ),
+        migrations.RunPython(
+            execute_sqlite(CREATE_SEARCH), execute_sqlite(DROP_SEARCH)
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
@@ -48,6 +49,10 @@ class User(AbstractUser):
 
     class Meta(AbstractUser.Meta):
         ordering = ('username',)
+        indexes = (
+            # Поиск пользователей по префиксу короче трёх символов.
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        )
 
     @property
     def is_admin(self):
@@ -0,0 +1,29 @@
+from django.db.models import Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat, Lower
+
+from .constants import USERNAME_SEARCH_MIN_LENGTH, USERNAME_SEARCH_TABLE
+
+# Больше любого символа в UTF-8: верхняя граница диапазона по префиксу.
+MAX_CHAR = chr(0x10FFFF)
+
+
+def filter_username(queryset, term):
+    """
+    Пользователи, чьё имя содержит term, без полного просмотра таблицы
+    (только SQLite). Запрос от трёх символов ищется как подстрока по
+    триграммному индексу FTS5, более короткий — как префикс по индексу
+    Lower(username).
+    """
+    if len(term) >= USERNAME_SEARCH_MIN_LENGTH:
+        phrase = '"{}"'.format(term.replace('"', '""'))
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {USERNAME_SEARCH_TABLE} '
+            f'WHERE {USERNAME_SEARCH_TABLE} MATCH %s',
+            (phrase,),
+        ))
+    prefix = Lower(Value(term))
+    return queryset.alias(username_lower=Lower('username')).filter(
+        username_lower__gte=prefix,
+        username_lower__lt=Concat(prefix, Value(MAX_CHAR)),
+    )